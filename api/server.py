@@ -0,0 +1,293 @@
+"""
+server.py
+Headless HTTP API over the same engine, scheduler, job manager and tracker
+used by the Gradio templates.
+
+Run standalone:
+    python -m api.server
+Or serve a Gradio app from the same process (one copy of every model):
+    python -m api.server --gradio apps.text_to_image.app:demo
+
+Tenancy is not authenticated here: `X-Tenant` is trusted as sent (it picks
+the fair-share queue and the history bucket), and `/v1/history/{id}` and
+`DELETE /v1/sessions/{id}` are open to any caller. Only the admin routes
+check a token (ADMIN_TOKEN). Expose the API behind a gateway that
+authenticates callers and sets `X-Tenant` itself.
+"""
+
+import argparse
+import asyncio
+import importlib
+import json
+import logging
+from contextlib import asynccontextmanager
+from typing import Any, Dict, List, Optional
+
+import psutil
+from fastapi import FastAPI, Header, HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel, Field
+
+from config.settings import AppConfig
+from model.assisted import get_assisted_metrics
+from model.jobs import job_manager
+from model.loader import model_loader
+from model.prompt import optimize_prompt
+from model.registry import list_models
+from model.reloader import config_reloader
+from model.scheduler import scheduler
+from model.sessions import session_cache
+from model.streaming import new_output_path
+from model.workers import worker_pool
+from utils.history import get_history, record_request
+from utils.tracker import get_task_status
+
+try:
+    # orjson is the fast path; FastAPI falls back to the stdlib encoder without it
+    import orjson  # noqa: F401
+    from fastapi.responses import ORJSONResponse as DefaultResponse
+except ImportError:
+    DefaultResponse = JSONResponse
+
+logger = logging.getLogger("api-server")
+
+
+# ──────────────────────────────────────────────────────────────
+# Schemas
+# ──────────────────────────────────────────────────────────────
+
+class InferenceRequest(BaseModel):
+    input: Any
+    params: Dict[str, Any] = Field(default_factory=dict)
+    priority: Optional[str] = None
+
+
+class WorkerRegistration(BaseModel):
+    worker_id: str
+    url: str
+    models: List[str]
+    capacity: float = 1.0
+
+
+class PromptRequest(BaseModel):
+    prompt: str
+    metadata: Dict[str, str] = Field(default_factory=dict)
+    priority: Optional[str] = None
+
+
+# ──────────────────────────────────────────────────────────────
+# Helpers
+# ──────────────────────────────────────────────────────────────
+
+def _jsonable(result):
+    """Make pipeline outputs JSON-safe; images are written to the output store."""
+    if hasattr(result, "save") and hasattr(result, "size"):  # PIL.Image
+        path = new_output_path(suffix=".png")
+        result.save(path)
+        return path
+    if isinstance(result, (bytes, bytearray, memoryview)):
+        path = new_output_path()
+        with open(path, "wb") as f:
+            f.write(result)
+        return path
+    if isinstance(result, (list, tuple)):
+        return [_jsonable(r) for r in result]
+    if isinstance(result, dict):
+        return {k: _jsonable(v) for k, v in result.items()}
+    if hasattr(result, "tolist"):  # numpy / torch
+        return result.tolist()
+    return jsonable_encoder(result)
+
+
+def _require_admin(token: Optional[str]):
+    """Admin endpoints are closed unless ADMIN_TOKEN is configured and matches."""
+    if not AppConfig.ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled (ADMIN_TOKEN is not set)")
+    if token != AppConfig.ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+
+def _ndjson(item: Dict) -> bytes:
+    return (json.dumps(item, default=str) + "\n").encode()
+
+
+# ──────────────────────────────────────────────────────────────
+# App factory
+# ──────────────────────────────────────────────────────────────
+
+def create_app(demo=None) -> FastAPI:
+    """
+    Build the FastAPI app. If a Gradio `demo` is given it is mounted at "/",
+    so UI and API share the loaded models, caches and scheduler.
+    """
+    @asynccontextmanager
+    async def lifespan(_app: FastAPI):
+        # Resume journaled jobs at startup instead of waiting for the first submit
+        await asyncio.to_thread(job_manager.start)
+        yield
+        await asyncio.to_thread(job_manager.stop)
+
+    app = FastAPI(title=f"{AppConfig.APP_NAME} API", version=AppConfig.VERSION,
+                  default_response_class=DefaultResponse, lifespan=lifespan)
+
+    @app.get("/health")
+    async def health():
+        return {
+            "status": "ok",
+            "loaded": list(model_loader.models.keys()),
+            "queued": scheduler.queue_depth(),
+            "rss_mb": round(psutil.Process().memory_info().rss / 2**20, 1),
+        }
+
+    @app.get("/v1/models")
+    async def models(task: Optional[str] = None):
+        return [spec.to_loader_config() for spec in list_models(task=task)]
+
+    @app.post("/v1/{task}/infer")
+    async def infer(task: str, body: InferenceRequest, x_tenant: str = Header("anonymous")):
+        try:
+            scheduler.validate(task, body.priority)
+        except ValueError as e:  # unknown task / priority class
+            raise HTTPException(status_code=400, detail=str(e))
+        try:
+            await asyncio.to_thread(model_loader.load_model, task)
+            if model_loader.configs.get(task, {}).get("job_api"):
+                # Only the submission takes a scheduler worker; the wait is on the job loop
+                future = scheduler.submit_job(task, body.input, tenant=x_tenant, priority=body.priority, **body.params)
+                result = await job_manager.wait(await asyncio.wrap_future(future))
+            else:
+                future = scheduler.submit(task, body.input, tenant=x_tenant, priority=body.priority, **body.params)
+                result = await asyncio.wrap_future(future)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        except Exception as e:
+            logger.error(f"[x] {task} inference failed: {e}")
+            await asyncio.to_thread(record_request, x_tenant, task, body.input, str(e), status="error")
+            raise HTTPException(status_code=500, detail=str(e))
+        result = await asyncio.to_thread(_jsonable, result)
+        request_id = await asyncio.to_thread(record_request, x_tenant, task, body.input, result)
+        return {"task": task, "request_id": request_id, "result": result}
+
+    @app.post("/v1/{task}/stream")
+    async def stream(task: str, body: InferenceRequest, x_tenant: str = Header("anonymous")):
+        """NDJSON stream of status updates ending with the result."""
+        try:
+            scheduler.validate(task, body.priority)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+        async def events():
+            await asyncio.to_thread(model_loader.load_model, task)
+            cfg = model_loader.configs.get(task, {})
+            if cfg.get("job_api"):
+                # Submission is queued in the tenant's fair share; polling holds no worker
+                future = scheduler.submit_job(task, body.input, tenant=x_tenant, priority=body.priority, **body.params)
+                yield _ndjson({"status": "queued", "queue_depth": scheduler.queue_depth(task)})
+                try:
+                    job_id = await asyncio.wrap_future(future)
+                except Exception as e:
+                    yield _ndjson({"status": "error", "error": str(e)})
+                    return
+                async for snap in job_manager.stream(job_id):
+                    yield _ndjson(await asyncio.to_thread(_jsonable, snap))
+                return
+
+            future = scheduler.submit(task, body.input, tenant=x_tenant, priority=body.priority, **body.params)
+            yield _ndjson({"status": "queued", "queue_depth": scheduler.queue_depth(task)})
+            try:
+                result = await asyncio.wrap_future(future)
+                yield _ndjson({"status": "success", "result": await asyncio.to_thread(_jsonable, result)})
+            except Exception as e:
+                yield _ndjson({"status": "error", "error": str(e)})
+
+        return StreamingResponse(events(), media_type="application/x-ndjson")
+
+    @app.post("/v1/prompt/optimize")
+    async def prompt_optimize(body: PromptRequest, x_tenant: str = Header("anonymous")):
+        optimized = await asyncio.to_thread(
+            optimize_prompt, body.prompt, body.metadata, tenant=x_tenant, priority=body.priority
+        )
+        return {"prompt": body.prompt, "optimized_prompt": optimized}
+
+    @app.get("/v1/tasks/{task_id}")
+    async def task_status(task_id: str):
+        job = job_manager.get(task_id)
+        if job["status"] != "not_found":
+            return _jsonable(job)
+        return get_task_status(task_id)
+
+    @app.get("/v1/history/{session_id}")
+    async def history(session_id: str, limit: int = AppConfig.HISTORY_MAX_PER_SESSION):
+        """Unauthenticated, like X-Tenant itself (see module docstring)."""
+        return await asyncio.to_thread(get_history, session_id, limit)
+
+    @app.get("/v1/metrics/scheduler")
+    async def scheduler_metrics():
+        return scheduler.get_metrics()
+
+    @app.get("/v1/metrics/assisted")
+    async def assisted_metrics():
+        return get_assisted_metrics()
+
+    @app.get("/v1/metrics/sessions")
+    async def session_metrics():
+        return session_cache.stats()
+
+    @app.delete("/v1/sessions/{session_id}")
+    async def end_session(session_id: str):
+        """Frees a conversation's cached key/values (its next turn re-prefills). Unauthenticated."""
+        session_cache.drop(session_id)
+        return {"dropped": session_id}
+
+    @app.post("/v1/admin/reload")
+    async def admin_reload(x_admin_token: Optional[str] = Header(None)):
+        _require_admin(x_admin_token)
+        return await asyncio.to_thread(config_reloader.reload)
+
+    @app.get("/v1/workers")
+    async def workers():
+        return worker_pool.workers()
+
+    @app.post("/v1/workers/register")
+    async def register_worker(body: WorkerRegistration, x_admin_token: Optional[str] = Header(None)):
+        _require_admin(x_admin_token)
+        worker_pool.register(body.worker_id, body.url, body.models, body.capacity)
+        return {"registered": body.worker_id}
+
+    @app.delete("/v1/workers/{worker_id}")
+    async def deregister_worker(worker_id: str, x_admin_token: Optional[str] = Header(None)):
+        _require_admin(x_admin_token)
+        worker_pool.deregister(worker_id)
+        return {"deregistered": worker_id}
+
+    if demo is not None:
+        import gradio as gr
+        app = gr.mount_gradio_app(app, demo, path="/")
+
+    return app
+
+
+def _load_demo(target: Optional[str]):
+    if not target:
+        return None
+    module_name, _, attr = target.partition(":")
+    return getattr(importlib.import_module(module_name), attr or "demo")
+
+
+# ───── Launch Server ───── #
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Headless inference API")
+    parser.add_argument("--host", default=AppConfig.API_HOST)
+    parser.add_argument("--port", type=int, default=AppConfig.API_PORT)
+    parser.add_argument("--gradio", help="Mount a Gradio Blocks app, e.g. apps.text_to_image.app:demo")
+    args = parser.parse_args()
+
+    uvicorn.run(
+        create_app(_load_demo(args.gradio)),
+        host=args.host,
+        port=args.port,
+        timeout_keep_alive=AppConfig.API_KEEP_ALIVE,
+    )
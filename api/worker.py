@@ -0,0 +1,127 @@
+"""
+worker.py
+Inference worker process for the remote worker pool (ModelSpec source="worker").
+
+Loads the given registry models, serves them over HTTP and keeps itself
+registered with a frontend (api/server.py) by re-registering periodically
+(the frontend's ADMIN_TOKEN must be set in the worker's environment too).
+
+    python -m api.worker --port 9001 --models mistral-7b-instruct \\
+        --frontend http://127.0.0.1:8000
+"""
+
+import argparse
+import asyncio
+import base64
+import io
+import logging
+import os
+import socket
+import threading
+import time
+from typing import Any, Dict, Optional
+
+import requests
+from fastapi import FastAPI, HTTPException
+from pydantic import BaseModel, Field
+
+from api.server import _jsonable
+from config.settings import AppConfig
+from model.loader import model_loader
+from model.registry import worker_load_config
+
+logger = logging.getLogger("inference-worker")
+
+
+class WorkerRequest(BaseModel):
+    input: Any
+    params: Dict[str, Any] = Field(default_factory=dict)
+
+
+def _encode(result):
+    """
+    Results cross hosts, so images and bytes travel inline as base64 data URIs
+    (the frontend's streaming reader decodes large ones into its own output
+    store) instead of as paths on this worker's disk.
+    """
+    if hasattr(result, "save") and hasattr(result, "size"):  # PIL.Image
+        buffer = io.BytesIO()
+        result.save(buffer, format="PNG")
+        return f"data:image/png;base64,{base64.b64encode(buffer.getvalue()).decode()}"
+    if isinstance(result, (bytes, bytearray, memoryview)):
+        return f"data:application/octet-stream;base64,{base64.b64encode(bytes(result)).decode()}"
+    if isinstance(result, (list, tuple)):
+        return [_encode(r) for r in result]
+    if isinstance(result, dict):
+        return {k: _encode(v) for k, v in result.items()}
+    return _jsonable(result)
+
+
+def create_worker_app(worker_id: str, model_names, capacity: int = 1) -> FastAPI:
+    """Load `model_names` and build the worker's HTTP app."""
+    models = {}
+    for name in model_names:
+        cfg = worker_load_config(name)
+        models[name] = model_loader.build(cfg, cfg["task"])
+        logger.info(f"[✓] Worker '{worker_id}' loaded {name}")
+
+    app = FastAPI(title=f"worker {worker_id}")
+    slots = asyncio.Semaphore(capacity)
+    state = {"inflight": 0}
+
+    @app.get("/health")
+    async def health():
+        return {"worker_id": worker_id, "models": list(models), "capacity": capacity,
+                "inflight": state["inflight"]}
+
+    @app.post("/infer/{model_name}")
+    async def infer(model_name: str, body: WorkerRequest):
+        model = models.get(model_name)
+        if model is None:
+            raise HTTPException(status_code=404, detail=f"Model '{model_name}' not held by {worker_id}")
+        async with slots:
+            state["inflight"] += 1
+            try:
+                result = await asyncio.to_thread(model, body.input, **body.params)
+            finally:
+                state["inflight"] -= 1
+        return {"result": await asyncio.to_thread(_encode, result)}
+
+    return app
+
+
+def _announce(frontend: str, worker_id: str, url: str, models, capacity: int):
+    """Register with the frontend now and on every interval (rejoins after restarts)."""
+    while True:
+        try:
+            requests.post(f"{frontend.rstrip('/')}/v1/workers/register", json={
+                "worker_id": worker_id, "url": url, "models": list(models), "capacity": capacity,
+            }, headers={"X-Admin-Token": AppConfig.ADMIN_TOKEN or ""}, timeout=5)
+        except Exception as e:
+            logger.warning(f"⚠️ Could not reach frontend {frontend}: {e}")
+        time.sleep(AppConfig.WORKER_HEALTH_INTERVAL * 2)
+
+
+# ───── Launch Worker ───── #
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Remote inference worker")
+    parser.add_argument("--models", nargs="+", required=True, help="Registry model names to load")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9001)
+    parser.add_argument("--worker-id", default=None)
+    parser.add_argument("--capacity", type=int, default=1, help="Concurrent requests (routing weight)")
+    parser.add_argument("--frontend", default=os.getenv("WORKER_FRONTEND_URL"))
+    args = parser.parse_args()
+
+    worker_id: Optional[str] = args.worker_id or f"{socket.gethostname()}-{args.port}"
+    app = create_worker_app(worker_id, args.models, args.capacity)
+
+    if args.frontend:
+        url = f"http://{args.host}:{args.port}"
+        threading.Thread(
+            target=_announce, args=(args.frontend, worker_id, url, args.models, args.capacity), daemon=True
+        ).start()
+
+    uvicorn.run(app, host=args.host, port=args.port)
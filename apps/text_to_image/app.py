@@ -1,12 +1,16 @@
 import gradio as gr
 import logging
-from model.loader import get_mistral_client
-from model.inference import build_prompt_instruction
-from config.ui_config import UI_CONFIG
-from config.settings import MODEL_OPTIONS
+from apps.text_to_image.model.inference import build_prompt_instruction, get_embedding_client, get_mistral_client
+from apps.text_to_image.config.ui_config import UI_CONFIG
+from apps.text_to_image.config.settings import DEFAULT_MODEL, MODEL_OPTIONS, SEMANTIC_CACHE_ENABLED
+from apps.text_to_image.utils.semantic_cache import SemanticPromptCache
 
 logger = logging.getLogger("gradio-template")
 
+# ───── Semantic Prompt Cache (near-duplicate prompts skip the Mistral call) ───── #
+_encoder = get_embedding_client() if SEMANTIC_CACHE_ENABLED else None
+prompt_cache = SemanticPromptCache(_encoder) if _encoder is not None else None
+
 # ───── Function: Process Prompt and Generate ───── #
 def generate_image(user_prompt, mood, prompt_type, art_style, image_type, frame, model_choice):
     # Step 1: Create metadata
@@ -18,10 +22,16 @@ def generate_image(user_prompt, mood, prompt_type, art_style, image_type, frame,
         "frame": frame
     }
 
-    # Step 2: Build instruction prompt
+    # Step 2: Reuse the optimized prompt of a near-identical earlier request
+    if prompt_cache is not None:
+        cached = prompt_cache.lookup(user_prompt, metadata)
+        if cached is not None:
+            return f"🔁 Optimized Prompt:\n{cached}"
+
+    # Step 3: Build instruction prompt
     instruction = build_prompt_instruction(user_prompt, metadata)
 
-    # Step 3: Get Mistral client and generate optimized prompt
+    # Step 4: Get Mistral client and generate optimized prompt
     mistral = get_mistral_client()
     if mistral is None:
         return "Error loading Mistral."
@@ -29,6 +39,8 @@ def generate_image(user_prompt, mood, prompt_type, art_style, image_type, frame,
     try:
         result = mistral(instruction, max_new_tokens=150, do_sample=True, temperature=0.7)
         optimized_prompt = result[0]['generated_text'].split("Optimized Prompt:")[-1].strip()
+        if prompt_cache is not None:
+            prompt_cache.insert(user_prompt, metadata, optimized_prompt)
     except Exception as e:
         logger.error(f"Prompt transformation failed: {e}")
         optimized_prompt = user_prompt  # fallback
@@ -45,14 +57,14 @@ with gr.Blocks(title="Gradio Image Prompt Optimizer") as demo:
         user_prompt = gr.Textbox(label="Describe Your Image", placeholder="e.g. A dragon flying over a neon city at night")
 
     with gr.Row():
-        mood = gr.Dropdown(choices=UI_CONFIG["mood"], label="Mood", value=UI_CONFIG["mood"][0])
-        prompt_type = gr.Dropdown(choices=UI_CONFIG["type"], label="Prompt Type", value=UI_CONFIG["type"][0])
-        art_style = gr.Dropdown(choices=UI_CONFIG["art_style"], label="Art Style", value=UI_CONFIG["art_style"][0])
+        mood = gr.Dropdown(choices=UI_CONFIG["moods"], label="Mood", value=UI_CONFIG["moods"][0])
+        prompt_type = gr.Dropdown(choices=UI_CONFIG["image_types"], label="Prompt Type", value=UI_CONFIG["image_types"][0])
+        art_style = gr.Dropdown(choices=UI_CONFIG["art_styles"], label="Art Style", value=UI_CONFIG["art_styles"][0])
     
     with gr.Row():
-        image_type = gr.Dropdown(choices=UI_CONFIG["image_type"], label="Image Type", value=UI_CONFIG["image_type"][0])
-        frame = gr.Dropdown(choices=UI_CONFIG["frame"], label="Frame", value=UI_CONFIG["frame"][0])
-        model_choice = gr.Dropdown(choices=list(MODEL_OPTIONS.keys()), label="Model", value=list(MODEL_OPTIONS.keys())[0])
+        image_type = gr.Dropdown(choices=UI_CONFIG["image_types"], label="Image Type", value=UI_CONFIG["image_types"][0])
+        frame = gr.Dropdown(choices=UI_CONFIG["frames"], label="Frame", value=UI_CONFIG["frames"][0])
+        model_choice = gr.Dropdown(choices=list(MODEL_OPTIONS.keys()), label="Model", value=DEFAULT_MODEL)
 
     generate_btn = gr.Button("⚡ Generate Optimized Prompt")
 
@@ -66,4 +78,4 @@ with gr.Blocks(title="Gradio Image Prompt Optimizer") as demo:
 
 # ───── Launch App ───── #
 if __name__ == "__main__":
-    demo.launch()
+    demo.launch()  # python -m apps.text_to_image.app (from the repo root)
@@ -0,0 +1,69 @@
+import os
+import runpy
+from pathlib import Path
+
+# ───── Base Directories ───── #
+BASE_DIR = Path(__file__).resolve().parent.parent
+TEMPLATES_DIR = BASE_DIR / "templates"
+MODELS_DIR = BASE_DIR / "model_assets"
+MODELS_DIR.mkdir(parents=True, exist_ok=True)
+
+# ───── Theme Config (Dynamic) ───── #
+THEMES = {
+    os.path.splitext(f)[0].replace("_", " ").title(): TEMPLATES_DIR / f
+    for f in os.listdir(TEMPLATES_DIR)
+    if f.endswith(".css")
+}
+DEFAULT_THEME = "Classic Dark"
+
+# ───── Model Config (Dynamic) ───── #
+MODEL_OPTIONS = {
+    os.path.splitext(f)[0]: MODELS_DIR / f
+    for f in os.listdir(MODELS_DIR)
+    if f.endswith(".pkl")
+}
+DEFAULT_MODEL = list(MODEL_OPTIONS.keys())[0] if MODEL_OPTIONS else None
+
+# ───── Security ───── #
+ALLOWED_EXTENSIONS = {"png", "jpg", "jpeg", "webp"}
+
+# ───── General Settings ───── #
+OUTPUT_DIR = BASE_DIR / "outputs"
+OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+
+SHOW_PROGRESS_BAR = True  # optional toggle for UI feedback
+
+# ───── Semantic Prompt Cache ───── #
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "true").lower() == "true"
+SEMANTIC_CACHE_MODEL = os.getenv("SEMANTIC_CACHE_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", 0.88))  # cosine similarity
+SEMANTIC_CACHE_MAX_ENTRIES = 5000
+SEMANTIC_CACHE_PATH = BASE_DIR / "cache" / "semantic_prompts.npz"
+SEMANTIC_CACHE_SAVE_EVERY = 25  # inserts between disk snapshots
+SEMANTIC_CACHE_SAVE_INTERVAL = 60.0  # seconds between saves of unsaved inserts (also saved at exit)
+
+# ───── Prompt Optimizer LLM ───── #
+# Root registry entry (hub id and draft pairing: MISTRAL_DRAFT_MODEL, see model/registry.py)
+MISTRAL_MODEL = os.getenv("MISTRAL_MODEL", "mistral-7b-instruct")
+
+
+# ───── Hot Reload (root model/reloader.py) ───── #
+def reload_settings():
+    """
+    Re-executes this file and applies it in place: dicts (THEMES,
+    MODEL_OPTIONS) are updated rather than rebound so modules that imported
+    them see new entries; other values are rebound here. Returns the names
+    whose value changed.
+    """
+    fresh = runpy.run_path(__file__)
+    changed = []
+    for name, value in fresh.items():
+        if not name.isupper() or globals().get(name) == value:
+            continue
+        if isinstance(value, dict) and isinstance(globals().get(name), dict):
+            globals()[name].clear()
+            globals()[name].update(value)
+        else:
+            globals()[name] = value
+        changed.append(name)
+    return sorted(changed)
@@ -1,5 +1,7 @@
 # config/ui_config.py
 
+from apps.text_to_image.config.settings import MODEL_OPTIONS
+
 UI_CONFIG = {
     "moods": [
         "Ethereal", "Cyberpunk", "Melancholy", "Whimsical", "Futuristic",
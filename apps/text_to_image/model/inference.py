@@ -0,0 +1,94 @@
+import os
+import logging
+import joblib
+import torch
+from functools import lru_cache
+from transformers import AutoModel, AutoModelForCausalLM, AutoTokenizer, pipeline
+from apps.text_to_image.config.settings import MISTRAL_MODEL, MODEL_OPTIONS, SEMANTIC_CACHE_MODEL
+from apps.text_to_image.config.ui_config import UI_CONFIG  # 🔥 NEW
+from apps.text_to_image.model.prompt_template import build_prompt_instruction  # re-exported for app.py
+from model.assisted import attach_draft
+from model.registry import get_model_spec
+from model.snapshot import load_snapshotted
+
+logger = logging.getLogger("gradio-template")
+
+# ───── Load Traditional Joblib Model ───── #
+def load_model_by_name(model_name: str):
+    try:
+        if model_name not in MODEL_OPTIONS:
+            raise ValueError(f"Model '{model_name}' not found in settings.")
+
+        model_path = MODEL_OPTIONS[model_name]
+        if not model_path.endswith(".pkl"):
+            raise ValueError("Invalid model type. Only .pkl supported here.")
+
+        model = joblib.load(model_path)
+        logger.info(f"[✓] Loaded joblib model: {model_name}")
+        return model
+
+    except Exception as e:
+        logger.error(f"[x] Failed to load model '{model_name}': {e}")
+        return None
+
+# ───── Hugging Face Transformer Loader ───── #
+@lru_cache(maxsize=1)
+def get_mistral_client(model_name=MISTRAL_MODEL):
+    """
+    Mistral pipeline for the root registry entry `model_name`: restored from a
+    snapshot when available and decoding with its registry draft model
+    (assisted decoding, see root model/assisted.py) when one is paired.
+    """
+    try:
+        spec = get_model_spec(model_name)
+        if spec is None:
+            raise ValueError(f"'{model_name}' is not in the model registry")
+        model_id = spec.hf_id
+        logger.info(f"🔁 Loading Hugging Face model: {model_id}")
+
+        def build():
+            tokenizer = AutoTokenizer.from_pretrained(model_id)
+            model = AutoModelForCausalLM.from_pretrained(model_id, device_map="auto", torch_dtype="auto")
+            return pipeline("text-generation", model=model, tokenizer=tokenizer)
+
+        # Same snapshot store, draft pairing and assisted metrics as the root app
+        cfg = dict(spec.to_loader_config(), torch_dtype="auto")
+        pipe = attach_draft(load_snapshotted(cfg, build), cfg)
+        logger.info("✅ Mistral client initialized.")
+        return pipe
+
+    except Exception as e:
+        logger.error(f"🚨 Failed to load Hugging Face model '{model_name}': {e}")
+        return None
+
+# ───── Sentence Encoder (Semantic Prompt Cache) ───── #
+@lru_cache(maxsize=1)
+def get_embedding_client(model_id=SEMANTIC_CACHE_MODEL):
+    """
+    Returns encode(texts) -> L2-normalized mean-pooled embeddings (np.ndarray),
+    or None if the encoder cannot be loaded.
+    """
+    try:
+        logger.info(f"🔁 Loading sentence encoder: {model_id}")
+        tokenizer = AutoTokenizer.from_pretrained(model_id)
+        model = AutoModel.from_pretrained(model_id).eval()
+
+        def encode(texts):
+            batch = tokenizer(texts, padding=True, truncation=True, max_length=128, return_tensors="pt")
+            with torch.no_grad():
+                hidden = model(**batch).last_hidden_state
+            mask = batch["attention_mask"].unsqueeze(-1).to(hidden.dtype)
+            pooled = (hidden * mask).sum(1) / mask.sum(1).clamp(min=1e-9)
+            return torch.nn.functional.normalize(pooled, dim=-1).numpy()
+
+        logger.info("✅ Sentence encoder initialized.")
+        return encode
+
+    except Exception as e:
+        logger.error(f"🚨 Failed to load sentence encoder '{model_id}': {e}")
+        return None
+
+# ───── Model Summary ───── #
+def list_available_models():
+    return list(MODEL_OPTIONS.keys())
+
@@ -10,7 +10,7 @@ from transformers import (
     AutoModelForSeq2SeqLM,
 )
 
-from config.settings import MODEL_OPTIONS
+from apps.text_to_image.config.settings import MODEL_OPTIONS
 
 logger = logging.getLogger("gradio-template")
 
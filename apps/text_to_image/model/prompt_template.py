@@ -0,0 +1,41 @@
+"""
+prompt_template.py
+Prompt instruction template for the LLM prompt optimizer.
+
+Dependency-free on purpose: the root project's model/prompt.py loads this
+file by path, so both apps build the exact same instruction.
+"""
+
+import logging
+
+logger = logging.getLogger("gradio-template")
+
+
+# ───── Prompt Instruction Template ───── #
+def build_prompt_instruction(raw_prompt: str, metadata: dict) -> str:
+    """
+    Build a structured prompt instruction using the enhanced metadata.
+    """
+    try:
+        mood = metadata.get("mood", "Default")
+        art_style = metadata.get("art_style", "Realism")
+        image_type = metadata.get("image_type", "Icon")
+        frame = metadata.get("frame", "Square")
+        prompt_type = metadata.get("type", "General")
+
+        instruction = (
+            f"Transform the following prompt for a generative image model.\n"
+            f"Ensure it's concise, highly descriptive, and tailored to this context:\n"
+            f"- Mood: {mood}\n"
+            f"- Type: {prompt_type}\n"
+            f"- Art Style: {art_style}\n"
+            f"- Image Type: {image_type}\n"
+            f"- Frame: {frame}\n\n"
+            f"User Prompt: {raw_prompt}\n\n"
+            f"Optimized Prompt:"
+        )
+        return instruction
+
+    except Exception as e:
+        logger.error(f"[x] Failed to build instruction: {e}")
+        return f"User Prompt: {raw_prompt}\nOptimized Prompt:"
@@ -0,0 +1,241 @@
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from apps.text_to_image.config.settings import (
+    SEMANTIC_CACHE_MAX_ENTRIES,
+    SEMANTIC_CACHE_PATH,
+    SEMANTIC_CACHE_SAVE_EVERY,
+    SEMANTIC_CACHE_SAVE_INTERVAL,
+    SEMANTIC_CACHE_THRESHOLD,
+)
+
+logger = logging.getLogger("gradio-template")
+
+META_FIELDS = ("mood", "type", "art_style", "image_type", "frame")
+
+
+# ───── Partition (one per metadata tuple) ───── #
+class _Partition:
+    """Row-major embedding matrix + parallel prompt/value/recency arrays, indexed by prompt."""
+
+    def __init__(self, dim: int, capacity: int = 64):
+        self.vectors = np.zeros((capacity, dim), dtype=np.float32)
+        self.last_used = np.zeros(capacity, dtype=np.int64)
+        self.prompts: List[str] = []
+        self.values: List[str] = []
+        self.rows: Dict[str, int] = {}  # prompt -> row, for exact-match lookups
+
+    @property
+    def size(self) -> int:
+        return len(self.prompts)
+
+    def search(self, query: np.ndarray) -> Tuple[int, float]:
+        scores = self.vectors[:self.size] @ query  # rows are L2-normalized → cosine similarity
+        best = int(np.argmax(scores))
+        return best, float(scores[best])
+
+    def add(self, prompt: str, vector: np.ndarray, value: str, tick: int):
+        row = self.rows.get(prompt)
+        if row is not None:  # same prompt again: refresh its entry in place
+            self.vectors[row] = vector
+            self.last_used[row] = tick
+            self.values[row] = value
+            return
+        if self.size == len(self.vectors):
+            grow = len(self.vectors)
+            self.vectors = np.vstack([self.vectors, np.zeros_like(self.vectors[:grow])])
+            self.last_used = np.concatenate([self.last_used, np.zeros(grow, dtype=np.int64)])
+        row = self.size
+        self.vectors[row] = vector
+        self.last_used[row] = tick
+        self.prompts.append(prompt)
+        self.values.append(value)
+        self.rows[prompt] = row
+
+    def load(self, vectors: np.ndarray, last_used: np.ndarray, prompts: List[str], values: List[str]):
+        self.vectors[:len(vectors)] = vectors
+        self.last_used[:len(vectors)] = last_used
+        self.prompts, self.values = prompts, values
+        self.rows = {prompt: row for row, prompt in enumerate(prompts)}
+
+    def remove(self, row: int):
+        """Swap-remove so the matrix stays dense."""
+        last = self.size - 1
+        del self.rows[self.prompts[row]]
+        if row != last:
+            self.vectors[row] = self.vectors[last]
+            self.last_used[row] = self.last_used[last]
+            self.prompts[row] = self.prompts[last]
+            self.values[row] = self.values[last]
+            self.rows[self.prompts[row]] = row
+        self.prompts.pop()
+        self.values.pop()
+
+
+# ───── Semantic Cache ───── #
+class SemanticPromptCache:
+    """
+    Near-duplicate cache for optimized prompts.
+    Entries are partitioned by metadata tuple; lookups are one matrix-vector
+    product per partition. Bounded by `max_entries` with global LRU eviction.
+    Unsaved inserts are written every SEMANTIC_CACHE_SAVE_EVERY inserts, every
+    SEMANTIC_CACHE_SAVE_INTERVAL seconds and at interpreter exit.
+    """
+
+    def __init__(self, encoder, threshold: float = SEMANTIC_CACHE_THRESHOLD,
+                 max_entries: int = SEMANTIC_CACHE_MAX_ENTRIES, path=SEMANTIC_CACHE_PATH):
+        self.encoder = encoder  # callable: List[str] -> np.ndarray (n, dim), L2-normalized
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.path = str(path)
+        self._partitions: Dict[Tuple, _Partition] = {}
+        self._lock = threading.Lock()
+        self._tick = 0
+        self._dirty = 0
+        self.stats = {"hits": 0, "misses": 0, "exact_hits": 0, "evictions": 0, "hit_similarity_sum": 0.0}
+        self.load()
+        atexit.register(self.flush)
+        threading.Thread(target=self._flush_loop, name="semantic-cache-flush", daemon=True).start()
+
+    @staticmethod
+    def _key(metadata: dict) -> Tuple:
+        return tuple(metadata.get(f) for f in META_FIELDS)
+
+    @staticmethod
+    def _normalize(prompt: str) -> str:
+        return " ".join(prompt.lower().split())
+
+    def _embed(self, prompt: str) -> np.ndarray:
+        return np.asarray(self.encoder([self._normalize(prompt)]), dtype=np.float32)[0]
+
+    # ───── Lookup / Insert ───── #
+    def lookup(self, prompt: str, metadata: dict) -> Optional[str]:
+        key = self._key(metadata)
+        normalized = self._normalize(prompt)
+        with self._lock:
+            part = self._partitions.get(key)
+            if part is None or part.size == 0:
+                self.stats["misses"] += 1
+                return None
+            row = part.rows.get(normalized)
+            if row is not None:
+                self._touch(part, row, 1.0, exact=True)
+                return part.values[row]
+
+        vector = self._embed(prompt)
+        with self._lock:
+            part = self._partitions.get(key)
+            if part is not None and part.size:
+                row, score = part.search(vector)
+                if score >= self.threshold:
+                    self._touch(part, row, score)
+                    return part.values[row]
+            self.stats["misses"] += 1
+        return None
+
+    def insert(self, prompt: str, metadata: dict, optimized_prompt: str):
+        vector = self._embed(prompt)
+        key = self._key(metadata)
+        with self._lock:
+            part = self._partitions.get(key)
+            if part is None:
+                part = self._partitions[key] = _Partition(dim=vector.shape[0])
+            self._tick += 1
+            part.add(self._normalize(prompt), vector, optimized_prompt, self._tick)
+            while self._total() > self.max_entries:
+                self._evict_lru()
+            self._dirty += 1
+            should_save = self._dirty >= SEMANTIC_CACHE_SAVE_EVERY
+        if should_save:
+            self.save()
+
+    def _touch(self, part: _Partition, row: int, score: float, exact: bool = False):
+        self._tick += 1
+        part.last_used[row] = self._tick
+        self.stats["hits"] += 1
+        self.stats["exact_hits"] += int(exact)
+        self.stats["hit_similarity_sum"] += score
+
+    def _total(self) -> int:
+        return sum(p.size for p in self._partitions.values())
+
+    def _evict_lru(self):
+        key, row = min(
+            ((k, int(np.argmin(p.last_used[:p.size]))) for k, p in self._partitions.items() if p.size),
+            key=lambda kr: self._partitions[kr[0]].last_used[kr[1]],
+        )
+        part = self._partitions[key]
+        part.remove(row)
+        if part.size == 0:
+            del self._partitions[key]
+        self.stats["evictions"] += 1
+
+    # ───── Metrics ───── #
+    def get_metrics(self) -> Dict:
+        with self._lock:
+            lookups = self.stats["hits"] + self.stats["misses"]
+            return {
+                **{k: v for k, v in self.stats.items() if k != "hit_similarity_sum"},
+                "entries": self._total(),
+                "partitions": len(self._partitions),
+                "hit_rate": round(self.stats["hits"] / lookups, 4) if lookups else 0.0,
+                "avg_hit_similarity": round(self.stats["hit_similarity_sum"] / self.stats["hits"], 4)
+                if self.stats["hits"] else None,
+            }
+
+    # ───── Persistence ───── #
+    def flush(self):
+        """Save only if there are unsaved inserts."""
+        with self._lock:
+            dirty = self._dirty
+        if dirty:
+            self.save()
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(SEMANTIC_CACHE_SAVE_INTERVAL)
+            self.flush()
+
+    def save(self):
+        with self._lock:
+            arrays, index = {}, []
+            for i, (key, part) in enumerate(self._partitions.items()):
+                # Copies: inserts/evictions may rewrite these rows while the file is written
+                arrays[f"vectors_{i}"] = part.vectors[:part.size].copy()
+                arrays[f"last_used_{i}"] = part.last_used[:part.size].copy()
+                index.append({"key": list(key), "prompts": list(part.prompts), "values": list(part.values)})
+            arrays["index"] = np.array(json.dumps({"tick": self._tick, "partitions": index}))
+            self._dirty = 0
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = f"{self.path}.tmp.npz"
+            np.savez(tmp_path, **arrays)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            logger.error(f"[x] Failed to save semantic cache: {e}")
+            return
+        logger.info(f"📊 Semantic cache saved: {self.get_metrics()}")
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with np.load(self.path) as data:
+                index = json.loads(str(data["index"]))
+                self._tick = index["tick"]
+                for i, entry in enumerate(index["partitions"]):
+                    vectors = data[f"vectors_{i}"]
+                    part = _Partition(dim=vectors.shape[1], capacity=max(64, len(vectors)))
+                    part.load(vectors, data[f"last_used_{i}"], entry["prompts"], entry["values"])
+                    self._partitions[tuple(entry["key"])] = part
+            logger.info(f"[✓] Loaded semantic cache: {self._total()} entries")
+        except Exception as e:
+            logger.error(f"[x] Failed to load semantic cache, starting empty: {e}")
+            self._partitions = {}
@@ -27,6 +27,13 @@ class AppConfig:
     WALLPAPERS_DIR = COMMON_DIR / "wallpapers"
     ICONS_DIR = COMMON_DIR / "icons"
     FONTS_DIR = COMMON_DIR / "fonts"
+    RUNTIME_DIR = BASE_DIR / "runtime"
+    JOBS_JOURNAL = RUNTIME_DIR / "jobs.jsonl"
+    TASKS_JOURNAL = RUNTIME_DIR / "tasks.jsonl"
+    HISTORY_JOURNAL = RUNTIME_DIR / "history.jsonl"
+    OUTPUTS_DIR = BASE_DIR / "outputs"
+    COMPILED_DIR = BASE_DIR / "model_assets" / "compiled"
+    SNAPSHOTS_DIR = BASE_DIR / "model_assets" / "snapshots"
 
     # ===============================
     # 🔹 Themes
@@ -81,6 +88,175 @@ class AppConfig:
         }
     }
 
+    # ===============================
+    # 🔹 Async Job APIs (submit-then-poll)
+    # ===============================
+    JOB_POLL_MIN_INTERVAL = float(os.getenv("JOB_POLL_MIN_INTERVAL", 1.0))   # seconds
+    JOB_POLL_MAX_INTERVAL = float(os.getenv("JOB_POLL_MAX_INTERVAL", 15.0))  # seconds
+    JOB_POLL_BACKOFF = 1.5
+    JOB_TIMEOUT = float(os.getenv("JOB_TIMEOUT", 30 * 60))                   # seconds
+
+    # ===============================
+    # 🔹 Streaming Outputs (model/streaming.py)
+    # ===============================
+    STREAM_CHUNK_SIZE = 1024 * 1024                # bytes read per chunk
+    STREAM_BUFFER_LIMIT = 1024 * 1024              # bodies up to this size are parsed in memory
+    STREAM_INLINE_STRING_LIMIT = 64 * 1024         # longer JSON strings are spilled to files
+
+    # ===============================
+    # 🔹 Scheduling (model/scheduler.py)
+    # ===============================
+    PRIORITY_CLASSES = {"interactive": 0, "batch": 1}  # lower runs first
+    DEFAULT_PRIORITY = "interactive"
+    TASK_CONCURRENCY = {"default": 1}                  # concurrent requests per loaded model
+    REMOTE_CONCURRENCY = int(os.getenv("REMOTE_CONCURRENCY", 8))  # default for API/worker-backed tasks (they wait on the network)
+    TENANT_WEIGHTS = {"default": 1.0}                  # weighted fair share per tenant
+    TENANT_IDLE_SECONDS = 3600                         # per-tenant stats of idle tenants are dropped after this
+    METRICS_WINDOW = 500                               # latency samples kept per tenant
+
+    # ===============================
+    # 🔹 Headless API (api/server.py)
+    # ===============================
+    API_HOST = os.getenv("API_HOST", "0.0.0.0")
+    API_PORT = int(os.getenv("API_PORT", 8000))
+    API_KEEP_ALIVE = int(os.getenv("API_KEEP_ALIVE", 75))  # seconds idle connections stay open
+
+    # ===============================
+    # 🔹 Remote Workers (model/workers.py, api/worker.py)
+    # ===============================
+    WORKER_URLS = [u for u in os.getenv("WORKER_URLS", "").split(",") if u]  # static seeds
+    WORKER_VNODES = 64                 # ring points per unit of worker capacity
+    WORKER_HEALTH_INTERVAL = 5.0       # seconds between frontend health checks
+    WORKER_MAX_FAILURES = 3            # failed checks before a worker leaves the ring
+    WORKER_TIMEOUT = float(os.getenv("WORKER_TIMEOUT", 300))
+
+    # ===============================
+    # 🔹 Hot Reload (model/reloader.py)
+    # ===============================
+    RELOAD_WATCH = os.getenv("RELOAD_WATCH", "false").lower() == "true"
+    RELOAD_POLL_INTERVAL = 2.0        # seconds between config file checks
+    RELOAD_DRAIN_TIMEOUT = 300.0      # max seconds to wait for in-flight requests on a retired model
+    ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")  # admin endpoints (reload, worker registration) are off when unset
+
+    # ===============================
+    # 🔹 CPU Auto-Tuning (model/tuner.py)
+    # ===============================
+    TUNE_THREADS = [1, 2, 4, 8, 16]      # intra-op candidates (capped at os.cpu_count())
+    TUNE_INTEROP_THREADS = [1, 2]
+    TUNE_CONCURRENCY = [1, 2, 4]
+    TUNE_BATCH_SIZES = [1, 2, 4, 8]
+    TUNE_REQUESTS = 8                    # measured requests per grid point (after warmup)
+
+    # ===============================
+    # 🔹 Compiled Backends (model/compiled.py)
+    # ===============================
+    BACKEND_VALIDATION_ATOL = 1e-2     # max score drift accepted vs. the eager model
+
+    # ===============================
+    # 🔹 Model Snapshots (model/snapshot.py)
+    # ===============================
+    MODEL_SNAPSHOTS = os.getenv("MODEL_SNAPSHOTS", "false").lower() == "true"  # costs one weights copy on disk
+
+    # ===============================
+    # 🔹 Diffusion (model/diffusion.py)
+    # ===============================
+    DIFFUSION_STEPS = 30               # full-quality denoising steps
+    DIFFUSION_PREVIEW_EVERY = 5        # stream a latent preview every K steps (0 = off)
+    DIFFUSION_DRAFT_STEPS = 8
+    DIFFUSION_DRAFT_SCALE = 0.5        # draft resolution relative to the model's native size
+    DIFFUSION_REFINE_STRENGTH = 0.45   # img2img strength when refining a chosen draft
+    DIFFUSION_MAX_BATCH = 4            # images denoised together in one local batched call
+    MAX_IMAGES_PER_REQUEST = 5
+
+    # ===============================
+    # 🔹 Long Audio Transcription (model/audio.py)
+    # ===============================
+    AUDIO_SAMPLE_RATE = 16000          # Whisper's input rate
+    AUDIO_DECODE_BLOCK_SECONDS = 10.0  # decoded per read from the ffmpeg pipe
+    AUDIO_CHUNK_SECONDS = 30.0         # max chunk length (Whisper's window)
+    AUDIO_OVERLAP_SECONDS = 2.0        # audio repeated at chunk boundaries, deduplicated in text
+    AUDIO_SILENCE_SEARCH_SECONDS = 5.0 # cut at the quietest frame within this tail of each window
+    AUDIO_BATCH_SIZE = 4               # chunks per engine call
+    AUDIO_TRANSCRIBE_WORKERS = 2       # batches in flight (also bounds decode read-ahead)
+
+    # ===============================
+    # 🔹 Video Captioning (model/video.py)
+    # ===============================
+    VIDEO_SAMPLE_FPS = 2.0             # frames decoded per second of video
+    VIDEO_FRAME_SIZE = 384             # decoded frame long side (captioner input)
+    VIDEO_SCENE_THRESHOLD = 12.0       # mean abs thumbnail difference (0-255) that marks a new scene
+    VIDEO_MIN_KEYFRAME_GAP = 1.0       # seconds between scene-change keyframes
+    VIDEO_MAX_KEYFRAME_GAP = 10.0      # a keyframe at least this often, even without scene changes
+    VIDEO_FRAME_WINDOW = 8             # keyframes held and captioned per batch
+    VIDEO_CAPTION_MERGE_SIMILARITY = 0.6  # word-overlap above which consecutive segments merge
+
+    # ===============================
+    # 🔹 Tiled Image Processing (model/tiling.py)
+    # ===============================
+    IMAGE_TILE_MEMORY_BUDGET_MB = float(os.getenv("IMAGE_TILE_MEMORY_BUDGET_MB", 2048))
+    IMAGE_TILE_BYTES_PER_PIXEL = 2048  # estimated model working memory per input pixel
+    IMAGE_TILE_MIN = 128
+    IMAGE_TILE_MAX = 1024
+    IMAGE_TILE_OVERLAP = 32            # input pixels shared by neighbouring tiles (feather-blended)
+    IMAGE_TILE_BATCH = 2               # tiles per engine call
+    IMAGE_TILE_WORKERS = 2             # engine calls in parallel (capped at os.cpu_count())
+
+    # ===============================
+    # 🔹 Streaming Speech Synthesis (model/speech.py)
+    # ===============================
+    TTS_FIRST_SEGMENT_CHARS = 80       # short first segment keeps time-to-first-audio low
+    TTS_MAX_SEGMENT_CHARS = 240
+    TTS_PREFETCH = 2                   # segments synthesized ahead of playback
+    TTS_SENTENCE_PAUSE = 0.15          # seconds of silence after each segment
+    TTS_CACHE_MAX_MB = 256             # synthesized segment cache (LRU by text hash)
+
+    # ===============================
+    # 🔹 Batched Image Captioning (model/vision.py)
+    # ===============================
+    IMAGE_TEXT_INPUT_SIZE = 384        # model input side (BLIP); images are resized once, at decode
+    IMAGE_DECODE_WORKERS = 4           # parallel decode/resize threads
+    IMAGE_CACHE_MAX_MB = float(os.getenv("IMAGE_CACHE_MAX_MB", 256))  # preprocessed images (LRU by content hash)
+
+    # ===============================
+    # 🔹 Session KV Cache (model/sessions.py)
+    # ===============================
+    KV_CACHE_MAX_MB = float(os.getenv("KV_CACHE_MAX_MB", 2048))  # past key/values kept across all sessions
+    KV_IDLE_SECONDS = 900              # sessions idle longer are evicted (or spilled)
+    KV_SPILL = os.getenv("KV_SPILL", "false").lower() == "true"
+    KV_SPILL_DIR = RUNTIME_DIR / "kv"
+    KV_SPILL_MAX_MB = float(os.getenv("KV_SPILL_MAX_MB", 8192))
+
+    # ===============================
+    # 🔹 Journals (utils/journal.py)
+    # ===============================
+    JOURNAL_FSYNC_BATCH = 64           # fsync after this many unsynced writes...
+    JOURNAL_FSYNC_INTERVAL = 1.0       # ...or this many seconds, whichever comes first
+    JOURNAL_COMPACT_MIN_RECORDS = 1000 # don't compact small journals
+    JOURNAL_COMPACT_RATIO = 0.5        # compact once this share of lines is superseded
+    JOURNAL_MAX_RECORDS = int(os.getenv("JOURNAL_MAX_RECORDS", 100_000))   # task/history retention: newest records kept...
+    JOURNAL_MAX_AGE = float(os.getenv("JOURNAL_MAX_AGE", 30 * 24 * 3600))   # ...and max seconds since last write
+    JOURNAL_EXPIRE_EVERY = 256         # enforce retention every this many writes (and on the fsync timer)
+    HISTORY_MAX_PER_SESSION = 200      # newest entries returned per session lookup
+
+    # ===============================
+    # 🔹 Traffic Traces & Load Testing (model/traces.py, model/loadgen.py)
+    # ===============================
+    TRACE_RECORD = os.getenv("TRACE_RECORD", "false").lower() == "true"
+    TRACES_DIR = RUNTIME_DIR / "traces"
+    LOADGEN_REPORTS_DIR = RUNTIME_DIR / "loadtests"
+    LOADGEN_HISTORY_JOURNAL = LOADGEN_REPORTS_DIR / "history.jsonl"  # local replays keep out of HISTORY_JOURNAL
+    LOADGEN_SAMPLE_INTERVAL = 0.5      # seconds between queue depth / memory samples
+    LOADGEN_MAX_CLIENTS = 256          # concurrent in-flight replayed requests
+    LOADGEN_MAX_PAYLOAD = 256 * 1024   # synthetic inputs are capped at this many bytes
+    LOADGEN_STUB_LATENCY = {           # task -> (median seconds, log-normal sigma) when a trace has too few samples
+        "default": (0.5, 0.4),
+        "text_to_text": (1.5, 0.5),
+        "text_to_image": (6.0, 0.3),
+        "text_to_video": (45.0, 0.4),
+        "audio_to_text": (4.0, 0.6),
+        "image_to_text": (0.8, 0.3),
+    }
+
     # ===============================
     # 🔹 Utility Methods
     # ===============================
@@ -108,3 +284,10 @@ class AppConfig:
         if not models:
             return None
         return model_name or models["default"]
+
+
+# ===============================
+# 🔹 Heartbeat (utils/tracker.py)
+# ===============================
+HEARTBEAT_ENABLED = os.getenv("HEARTBEAT_ENABLED", "false").lower() == "true"
+HEARTBEAT_INTERVAL = int(os.getenv("HEARTBEAT_INTERVAL", 60))
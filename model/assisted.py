@@ -0,0 +1,162 @@
+"""
+assisted.py
+Assisted (speculative) decoding for text-generation pipelines.
+
+A small draft model proposes tokens and the target model verifies them in a
+single forward pass (transformers `assistant_model`). Pairings come from the
+registry (ModelSpec.draft_model). Drafts sharing the target's vocabulary use
+standard assisted generation; other drafts use universal assisted decoding
+(transformers >= 4.46) when available. Otherwise the plain pipeline is kept.
+
+Acceptance metrics are estimated from the forward passes of successful
+assisted calls only (plain, batched and session calls are not counted):
+    accepted ≈ new_tokens - target_passes,  acceptance_rate = accepted / draft_tokens
+
+The pairing is checked once when the draft is attached (one tiny assisted
+generation); a draft transformers rejects is never attached. After that, a
+failed assisted call falls back to plain decoding for that call only.
+"""
+
+import logging
+import threading
+import time
+from typing import Dict, Optional
+
+from packaging import version
+
+logger = logging.getLogger("assisted-decoding")
+
+# model key -> AssistedGenerator (for metrics)
+ASSISTED_GENERATORS: Dict[str, "AssistedGenerator"] = {}
+
+
+class AssistedGenerator:
+    """Callable drop-in for a text-generation pipeline that decodes with a draft model."""
+
+    def __init__(self, key: str, pipe, draft_model, draft_tokenizer, universal: bool):
+        self.key = key
+        self.pipe = pipe
+        self.draft_model = draft_model
+        self.draft_tokenizer = draft_tokenizer
+        self.universal = universal
+        self._lock = threading.Lock()
+        self._stats = {"calls": 0, "fallbacks": 0, "new_tokens": 0, "target_passes": 0,
+                       "draft_tokens": 0, "seconds": 0.0}
+        self._passes = threading.local()  # per-thread counters of the assisted call in progress
+        pipe.model.register_forward_hook(lambda *_: self._count_pass("target_passes"))
+        draft_model.register_forward_hook(lambda *_: self._count_pass("draft_tokens"))
+
+    def __getattr__(self, name):
+        # Behave like the wrapped pipeline (tokenizer, model, task, ...)
+        return getattr(self.pipe, name)
+
+    def _count(self, field: str, amount=1):
+        with self._lock:
+            self._stats[field] += amount
+
+    def _count_pass(self, field: str):
+        passes = getattr(self._passes, "current", None)
+        if passes is not None:  # only inside an assisted call on this thread
+            passes[field] += 1
+
+    def __call__(self, text_inputs, **kwargs):
+        # Assisted generation is single-sequence only; batches use plain decoding
+        if isinstance(text_inputs, (list, tuple)) or kwargs.get("num_return_sequences", 1) > 1:
+            return self.pipe(text_inputs, **kwargs)
+
+        started = time.perf_counter()
+        passes = self._passes.current = {"target_passes": 0, "draft_tokens": 0}
+        try:
+            result = self.pipe(text_inputs, **self._assisted_kwargs(kwargs))
+        except Exception as e:
+            logger.warning(f"⚠️ Assisted decoding failed for {self.key}, using plain decoding for this call: {e}")
+            self._count("fallbacks")
+            return self.pipe(text_inputs, **kwargs)
+        finally:
+            self._passes.current = None
+
+        output = result[0].get("generated_text", "") if isinstance(result, list) else ""
+        if isinstance(text_inputs, str) and output.startswith(text_inputs):
+            output = output[len(text_inputs):]  # return_full_text=True (pipeline default)
+        new_tokens = len(self.pipe.tokenizer(output, add_special_tokens=False)["input_ids"])
+        with self._lock:
+            self._stats["calls"] += 1
+            self._stats["new_tokens"] += new_tokens
+            self._stats["target_passes"] += passes["target_passes"]
+            self._stats["draft_tokens"] += passes["draft_tokens"]
+            self._stats["seconds"] += time.perf_counter() - started
+        return result
+
+    def _assisted_kwargs(self, kwargs: Dict) -> Dict:
+        assisted = dict(kwargs, assistant_model=self.draft_model)
+        if self.universal:
+            assisted.update(tokenizer=self.pipe.tokenizer, assistant_tokenizer=self.draft_tokenizer)
+        return assisted
+
+    def check_pairing(self):
+        """
+        Runs one two-token assisted generation. generate() validates the
+        pairing up front and raises ValueError / TypeError /
+        NotImplementedError for a draft it cannot use with this target.
+        """
+        self.pipe("Hello", **self._assisted_kwargs({"max_new_tokens": 2, "do_sample": False}))
+
+    def metrics(self) -> Dict:
+        with self._lock:
+            s = dict(self._stats)
+        accepted = max(0, s["new_tokens"] - s["target_passes"])
+        return {
+            **s,
+            "universal": self.universal,
+            "acceptance_rate": round(accepted / s["draft_tokens"], 4) if s["draft_tokens"] else None,
+            "tokens_per_target_pass": round(s["new_tokens"] / s["target_passes"], 3) if s["target_passes"] else None,
+            "tokens_per_second": round(s["new_tokens"] / s["seconds"], 2) if s["seconds"] else None,
+        }
+
+
+def _universal_supported() -> bool:
+    import transformers
+    return version.parse(transformers.__version__) >= version.parse("4.46.0")
+
+
+def attach_draft(pipe, cfg: dict):
+    """
+    Wrap `pipe` with its registry draft model if one is configured and
+    compatible; otherwise return `pipe` unchanged (normal decoding).
+    """
+    draft_cfg: Optional[dict] = cfg.get("draft")
+    if not draft_cfg or cfg.get("pipeline") != "text-generation":
+        return pipe
+
+    try:
+        from transformers import AutoModelForCausalLM, AutoTokenizer
+
+        source = draft_cfg.get("path") or draft_cfg["name"]
+        draft_tokenizer = AutoTokenizer.from_pretrained(source)
+        same_vocab = draft_tokenizer.get_vocab() == pipe.tokenizer.get_vocab()
+        if not same_vocab and not _universal_supported():
+            logger.warning(f"⚠️ Draft '{draft_cfg['key']}' has a different vocabulary and universal "
+                           f"assisted decoding needs transformers>=4.46; using normal decoding")
+            return pipe
+
+        draft_model = AutoModelForCausalLM.from_pretrained(source, torch_dtype=pipe.model.dtype)
+        draft_model.to(pipe.model.device)
+        draft_model.eval()
+        generator = AssistedGenerator(cfg["key"], pipe, draft_model, draft_tokenizer, universal=not same_vocab)
+        generator.check_pairing()
+    except (ValueError, TypeError, NotImplementedError) as e:
+        logger.warning(f"⚠️ Draft '{draft_cfg['key']}' is incompatible with {cfg.get('key')}, using normal decoding: {e}")
+        return pipe
+    except Exception as e:
+        # e.g. missing weights, or an ONNX-backed target without torch hooks
+        logger.warning(f"⚠️ Could not attach draft model for {cfg.get('key')}, using normal decoding: {e}")
+        return pipe
+
+    ASSISTED_GENERATORS[cfg["key"]] = generator
+    logger.info(f"[✓] Assisted decoding enabled: {cfg['key']} ← draft {draft_cfg['key']}"
+                f"{' (universal)' if generator.universal else ''}")
+    return generator
+
+
+def get_assisted_metrics() -> Dict[str, Dict]:
+    return {key: gen.metrics() for key, gen in ASSISTED_GENERATORS.items()}
@@ -0,0 +1,262 @@
+"""
+audio.py
+Streaming decode + chunked, parallel transcription for long audio (audio_to_text).
+
+- `decode_stream()` decodes and resamples an upload to mono float32 at
+  AUDIO_SAMPLE_RATE block by block (ffmpeg pipe; stdlib `wave` fallback for
+  PCM WAV), so an hour-long file is never held in memory as a whole.
+- `split_chunks()` cuts the stream into ~AUDIO_CHUNK_SECONDS windows, ending
+  each at the quietest frame near the window end (silence if there is any),
+  and starts the next chunk AUDIO_OVERLAP_SECONDS earlier so words on the
+  boundary are not lost.
+- `transcribe_stream()` sends chunks to the engine in batches, several
+  batches in flight, and yields the stitched transcript as soon as the next
+  chunk in order is done. Overlapping words are deduplicated by matching the
+  previous chunk's tail against the next chunk's head.
+"""
+
+import base64
+import io
+import logging
+import re
+import shutil
+import subprocess
+import wave
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Dict, Iterator, List, Tuple
+
+import numpy as np
+
+from config.settings import AppConfig
+
+logger = logging.getLogger("audio")
+
+FRAME_SECONDS = 0.03  # energy frame for silence search
+
+
+# ──────────────────────────────────────────────────────────────
+# Decoding
+# ──────────────────────────────────────────────────────────────
+
+def decode_stream(path: str, sample_rate: int = AppConfig.AUDIO_SAMPLE_RATE,
+                  block_seconds: float = AppConfig.AUDIO_DECODE_BLOCK_SECONDS) -> Iterator[np.ndarray]:
+    """Yields mono float32 blocks in [-1, 1] at `sample_rate`."""
+    if shutil.which("ffmpeg"):
+        yield from _ffmpeg_blocks(path, sample_rate, block_seconds)
+    else:
+        logger.warning("⚠️ ffmpeg not found, decoding with the stdlib wave reader (PCM WAV only)")
+        yield from _wave_blocks(path, sample_rate, block_seconds)
+
+
+def _ffmpeg_blocks(path: str, sample_rate: int, block_seconds: float) -> Iterator[np.ndarray]:
+    cmd = ["ffmpeg", "-nostdin", "-loglevel", "error", "-i", path,
+           "-f", "f32le", "-ac", "1", "-ar", str(sample_rate), "pipe:1"]
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    block_bytes = int(sample_rate * block_seconds) * 4
+    try:
+        while True:
+            data = proc.stdout.read(block_bytes)
+            if not data:
+                break
+            yield np.frombuffer(data[:len(data) // 4 * 4], dtype=np.float32)
+        if proc.wait() != 0:
+            raise RuntimeError(f"ffmpeg failed to decode {path}: {proc.stderr.read().decode(errors='ignore')[-300:]}")
+    finally:
+        if proc.poll() is None:
+            proc.kill()
+        proc.stdout.close()
+        proc.stderr.close()
+
+
+def _wave_blocks(path: str, sample_rate: int, block_seconds: float) -> Iterator[np.ndarray]:
+    with wave.open(path, "rb") as wav:
+        width, channels, source_rate = wav.getsampwidth(), wav.getnchannels(), wav.getframerate()
+        if width not in (1, 2, 4):
+            raise ValueError(f"Unsupported WAV sample width: {width * 8} bit")
+        dtype = {1: np.uint8, 2: np.int16, 4: np.int32}[width]
+        scale = float(2 ** (8 * width - 1))
+        frames = int(source_rate * block_seconds)
+        position = 0.0  # output sample position in source time, carried across blocks
+        while True:
+            data = wav.readframes(frames)
+            if not data:
+                break
+            block = np.frombuffer(data, dtype=dtype).reshape(-1, channels).mean(axis=1)
+            block = (block - 128.0) / 128.0 if width == 1 else block / scale
+            if source_rate != sample_rate:
+                # Linear resampling; ffmpeg (when installed) does proper filtering
+                step = source_rate / sample_rate
+                positions = np.arange(position, len(block), step)
+                position = positions[-1] + step - len(block) if len(positions) else position - len(block)
+                block = np.interp(positions, np.arange(len(block)), block)
+            yield block.astype(np.float32)
+
+
+def to_wav_base64(samples: np.ndarray, sample_rate: int = AppConfig.AUDIO_SAMPLE_RATE) -> str:
+    """16-bit PCM WAV as base64, for API backends that can't take raw arrays."""
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes((np.clip(samples, -1.0, 1.0) * 32767).astype(np.int16).tobytes())
+    return base64.b64encode(buffer.getvalue()).decode()
+
+
+# ──────────────────────────────────────────────────────────────
+# Chunking
+# ──────────────────────────────────────────────────────────────
+
+def _quietest_cut(samples: np.ndarray, start: int, end: int, sample_rate: int) -> int:
+    """Sample index of the lowest-energy frame in samples[start:end]."""
+    frame = max(1, int(FRAME_SECONDS * sample_rate))
+    region = samples[start:end]
+    frames = len(region) // frame
+    if frames < 2:
+        return end
+    energy = np.square(region[:frames * frame].reshape(frames, frame)).mean(axis=1)
+    return start + int(np.argmin(energy)) * frame + frame // 2
+
+
+def split_chunks(blocks: Iterator[np.ndarray], sample_rate: int = AppConfig.AUDIO_SAMPLE_RATE,
+                 chunk_seconds: float = AppConfig.AUDIO_CHUNK_SECONDS,
+                 overlap_seconds: float = AppConfig.AUDIO_OVERLAP_SECONDS,
+                 search_seconds: float = AppConfig.AUDIO_SILENCE_SEARCH_SECONDS) -> Iterator[Tuple[float, np.ndarray]]:
+    """
+    Yields (start seconds, chunk) windows of at most `chunk_seconds`.
+    Memory stays bounded by one window plus one decode block.
+    """
+    window = int(chunk_seconds * sample_rate)
+    overlap = int(overlap_seconds * sample_rate)
+    search = min(int(search_seconds * sample_rate), window // 2)
+    buffer = np.zeros(0, dtype=np.float32)
+    offset = 0  # absolute sample index of buffer[0]
+
+    for block in blocks:
+        buffer = np.concatenate([buffer, block])
+        while len(buffer) >= window:
+            cut = _quietest_cut(buffer, window - search, window, sample_rate)
+            yield offset / sample_rate, buffer[:cut].copy()
+            advance = max(cut - overlap, 1)
+            buffer = buffer[advance:]
+            offset += advance
+    if len(buffer) > overlap or (offset == 0 and len(buffer)):
+        yield offset / sample_rate, buffer
+
+
+# ──────────────────────────────────────────────────────────────
+# Stitching
+# ──────────────────────────────────────────────────────────────
+
+def _norm(word: str) -> str:
+    return re.sub(r"[^\w']", "", word.lower())
+
+
+def merge_overlap(previous: str, following: str, max_words: int) -> str:
+    """
+    Drops the head of `following` that repeats the tail of `previous`
+    (longest exact match of normalized words, up to `max_words`).
+    """
+    prev_words, next_words = previous.split(), following.split()
+    prev_norm = [_norm(w) for w in prev_words[-max_words:]]
+    next_norm = [_norm(w) for w in next_words[:max_words]]
+    for size in range(min(len(prev_norm), len(next_norm)), 0, -1):
+        if prev_norm[-size:] == next_norm[:size] and (size > 1 or len(next_norm[0]) > 3):
+            return " ".join(next_words[size:])
+    return following
+
+
+class TranscriptStitcher:
+    """Collects out-of-order chunk transcripts and exposes the in-order stitched prefix."""
+
+    def __init__(self, overlap_seconds: float = AppConfig.AUDIO_OVERLAP_SECONDS):
+        self.max_words = max(3, int(overlap_seconds * 4))  # ~3-4 spoken words per second, with slack
+        self.pending: Dict[int, str] = {}
+        self.parts: List[str] = []
+        self.previous = ""
+
+    def add(self, index: int, text: str) -> bool:
+        """Returns True if the stitched transcript grew."""
+        self.pending[index] = text.strip()
+        grew = False
+        while len(self.parts) in self.pending:
+            text = self.pending.pop(len(self.parts))
+            merged = merge_overlap(self.previous, text, self.max_words) if self.previous else text
+            self.parts.append(merged)
+            self.previous = text or self.previous
+            grew = True
+        return grew
+
+    @property
+    def text(self) -> str:
+        return " ".join(p for p in self.parts if p)
+
+
+# ──────────────────────────────────────────────────────────────
+# Transcription
+# ──────────────────────────────────────────────────────────────
+
+def _result_text(result) -> str:
+    if isinstance(result, dict):
+        return result.get("text", "")
+    if isinstance(result, list) and result and isinstance(result[0], dict):
+        return result[0].get("text", "")
+    return str(result or "")
+
+
+def transcribe_stream(path: str, transcribe_batch, batch_size: int = AppConfig.AUDIO_BATCH_SIZE,
+                      max_inflight: int = AppConfig.AUDIO_TRANSCRIBE_WORKERS) -> Iterator[Dict]:
+    """
+    Decodes, chunks and transcribes `path`, yielding
+    {"text": stitched transcript so far, "chunks_done": n, "chunks_total": n or None, "done": bool}.
+    `transcribe_batch(list of (start, samples)) -> list of texts` runs on a worker thread.
+    Decoding only runs ahead of transcription by `max_inflight` batches.
+    """
+    stitcher = TranscriptStitcher()
+    inflight = {}
+    done_chunks = 0
+    chunks = enumerate(split_chunks(decode_stream(path)))
+
+    def progress(finished: bool):
+        return {"text": stitcher.text, "chunks_done": done_chunks,
+                "chunks_total": done_chunks if finished else None, "done": finished}
+
+    def collect(futures) -> bool:
+        nonlocal done_chunks
+        grew = False
+        for future in futures:
+            indices = inflight.pop(future)
+            for index, text in zip(indices, future.result()):
+                grew |= stitcher.add(index, text)
+            done_chunks += len(indices)
+        return grew
+
+    with ThreadPoolExecutor(max_workers=max_inflight, thread_name_prefix="transcribe") as pool:
+        exhausted = False
+        while not exhausted or inflight:
+            while not exhausted and len(inflight) < max_inflight:
+                batch = [item for _, item in zip(range(batch_size), chunks)]
+                exhausted = len(batch) < batch_size
+                if batch:
+                    inflight[pool.submit(transcribe_batch, [c for _, c in batch])] = [i for i, _ in batch]
+            if inflight:
+                finished, _ = wait(list(inflight), return_when=FIRST_COMPLETED)
+                if collect(finished):
+                    yield progress(False)
+    yield progress(True)
+
+
+def engine_batch_transcriber(engine, task: str = "audio_to_text", **params):
+    """`transcribe_batch` callable that goes through the InferenceEngine (batched for local pipelines)."""
+    from model.loader import model_loader
+
+    def transcribe_batch(chunks: List[Tuple[float, np.ndarray]]) -> List[str]:
+        model_loader.load_model(task)
+        if isinstance(model_loader.models.get(task), str):  # API endpoint: one WAV per request
+            return [_result_text(engine.run_inference(task, to_wav_base64(samples), **params))
+                    for _, samples in chunks]
+        inputs = [{"raw": samples, "sampling_rate": AppConfig.AUDIO_SAMPLE_RATE} for _, samples in chunks]
+        results = engine.run_inference(task, inputs, batch_size=len(inputs), **params)
+        return [_result_text(r) for r in results]
+
+    return transcribe_batch
@@ -0,0 +1,195 @@
+"""
+compiled.py
+Optional compiled backends for Hugging Face / local pipelines (ModelSpec.backend).
+
+- "onnx": exports the model once to ONNX through optimum.onnxruntime, caches the
+  artifact under model_assets/compiled/<model>/<version>/ and serves an
+  ONNX Runtime-backed pipeline with the same call interface.
+- "compile": wraps the model's forward with torch.compile; inductor's kernel
+  cache lives in one shared folder (model_assets/compiled/inductor) so compiled
+  kernels persist across restarts.
+
+A compiled pipeline is validated against the eager one on a fixed probe input
+the first time it is built for the installed library versions; later builds
+trust the marker. Export or validation failures fall back to eager.
+"""
+
+import hashlib
+import json
+import logging
+import os
+from importlib import metadata
+from pathlib import Path
+
+from config.settings import AppConfig
+
+logger = logging.getLogger("compiled-backend")
+
+ORT_MODEL_CLASSES = {
+    "text-generation": "ORTModelForCausalLM",
+    "text2text-generation": "ORTModelForSeq2SeqLM",
+    "summarization": "ORTModelForSeq2SeqLM",
+    "translation": "ORTModelForSeq2SeqLM",
+    "text-classification": "ORTModelForSequenceClassification",
+    "feature-extraction": "ORTModelForFeatureExtraction",
+    "image-classification": "ORTModelForImageClassification",
+}
+IMAGE_PIPELINES = {"image-classification"}
+VALIDATED_MARKER = "validated.json"
+INDUCTOR_CACHE_DIR = AppConfig.COMPILED_DIR / "inductor"
+
+
+def _probe(pipeline_tag: str):
+    """Fixed, deterministic input + call kwargs used to compare backends."""
+    if pipeline_tag in IMAGE_PIPELINES:
+        from PIL import Image
+        return Image.new("RGB", (224, 224), (120, 80, 200)), {}
+    if pipeline_tag in ("text-generation", "text2text-generation", "summarization", "translation"):
+        return "Describe a quiet harbor at dawn.", {"max_new_tokens": 8, "do_sample": False}
+    return "Describe a quiet harbor at dawn.", {}
+
+
+def _library_versions() -> dict:
+    versions = {}
+    for lib in ("torch", "transformers", "optimum", "onnxruntime"):
+        try:
+            versions[lib] = metadata.version(lib)
+        except metadata.PackageNotFoundError:
+            versions[lib] = None
+    return versions
+
+
+def artifact_dir(cfg: dict) -> Path:
+    """Cache folder keyed by model id and a version hash (source, backend, library versions)."""
+    fingerprint = json.dumps({
+        "model": cfg["name"],
+        "path": cfg.get("path"),
+        "pipeline": cfg["pipeline"],
+        "backend": cfg["backend"],
+        "versions": _library_versions(),
+    }, sort_keys=True)
+    version = hashlib.sha256(fingerprint.encode()).hexdigest()[:12]
+    return AppConfig.COMPILED_DIR / cfg["key"] / version
+
+
+def _is_validated(target: Path) -> bool:
+    """True if `target` was validated under the currently installed library versions."""
+    try:
+        with open(target / VALIDATED_MARKER, encoding="utf-8") as f:
+            return json.load(f).get("versions") == _library_versions()
+    except (OSError, ValueError):
+        return False
+
+
+def _outputs_match(a, b, atol: float) -> bool:
+    if isinstance(a, (list, tuple)) and isinstance(b, (list, tuple)):
+        return len(a) == len(b) and all(_outputs_match(x, y, atol) for x, y in zip(a, b))
+    if isinstance(a, dict) and isinstance(b, dict):
+        return a.keys() == b.keys() and all(_outputs_match(a[k], b[k], atol) for k in a)
+    if isinstance(a, float) or isinstance(b, float):
+        return abs(float(a) - float(b)) <= atol
+    if hasattr(a, "tolist") and hasattr(b, "tolist"):
+        return _outputs_match(a.tolist(), b.tolist(), atol)
+    return a == b
+
+
+class _Lazy:
+    """Builds the eager pipeline at most once, whichever path needs it first."""
+
+    def __init__(self, factory):
+        self.factory = factory
+        self.value = None
+
+    def get(self):
+        if self.value is None:
+            self.value = self.factory()
+        return self.value
+
+
+# ──────────────────────────────────────────────────────────────
+# Backends
+# ──────────────────────────────────────────────────────────────
+
+def _load_onnx(cfg: dict, eager: _Lazy, pipe_kwargs: dict):
+    from optimum import onnxruntime as ort
+    from transformers import AutoImageProcessor, AutoTokenizer, pipeline
+
+    cls = getattr(ort, ORT_MODEL_CLASSES[cfg["pipeline"]])
+    source = cfg.get("path") or cfg["name"]
+    target = artifact_dir(cfg)
+    validated = _is_validated(target)
+
+    if validated:
+        logger.info(f"⚡ Loading cached ONNX artifact for {cfg['key']} from {target}")
+        model = cls.from_pretrained(target)
+    else:
+        logger.info(f"🛠️ Exporting {cfg['key']} to ONNX → {target}")
+        model = cls.from_pretrained(source, export=True)
+        model.save_pretrained(target)
+
+    if cfg["pipeline"] in IMAGE_PIPELINES:
+        preprocess = {"image_processor": AutoImageProcessor.from_pretrained(source)}
+    else:
+        preprocess = {"tokenizer": AutoTokenizer.from_pretrained(source)}
+    pipe = pipeline(cfg["pipeline"], model=model, **preprocess, **pipe_kwargs)
+
+    if not validated:
+        probe, kwargs = _probe(cfg["pipeline"])
+        _validate(cfg, target, eager.get()(probe, **kwargs), pipe(probe, **kwargs))
+    return pipe
+
+
+def _load_torch_compile(cfg: dict, eager: _Lazy):
+    import torch
+
+    # Process-wide and read when inductor first compiles: set once, shared by all models
+    INDUCTOR_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    os.environ.setdefault("TORCHINDUCTOR_CACHE_DIR", str(INDUCTOR_CACHE_DIR))
+
+    target = artifact_dir(cfg)
+    pipe = eager.get()
+    if _is_validated(target):
+        pipe.model.forward = torch.compile(pipe.model.forward)  # compiles on first call
+        logger.info(f"⚡ {cfg['key']} compiled backend already validated, skipping probe")
+        return pipe
+
+    probe, kwargs = _probe(cfg["pipeline"])
+    reference = pipe(probe, **kwargs)
+
+    eager_forward = pipe.model.forward
+    pipe.model.forward = torch.compile(eager_forward)
+    try:
+        _validate(cfg, target, reference, pipe(probe, **kwargs))  # First call compiles
+    except Exception:
+        pipe.model.forward = eager_forward
+        raise
+    return pipe
+
+
+def _validate(cfg: dict, target: Path, reference, candidate):
+    if not _outputs_match(reference, candidate, AppConfig.BACKEND_VALIDATION_ATOL):
+        raise ValueError(f"{cfg['backend']} output diverges from eager: {candidate!r} vs {reference!r}")
+    target.mkdir(parents=True, exist_ok=True)
+    with open(target / VALIDATED_MARKER, "w", encoding="utf-8") as f:
+        json.dump({"backend": cfg["backend"], "versions": _library_versions()}, f, indent=4)
+    logger.info(f"[✓] {cfg['backend']} backend validated for {cfg['key']}")
+
+
+def load_backend(cfg: dict, build_eager, pipe_kwargs: dict):
+    """
+    Returns a pipeline for cfg["backend"], or the eager pipeline from
+    `build_eager()` if export, compilation or validation fails.
+    """
+    eager = _Lazy(build_eager)
+    backend = cfg.get("backend")
+    try:
+        if backend == "onnx":
+            if cfg["pipeline"] not in ORT_MODEL_CLASSES:
+                raise ValueError(f"No ONNX Runtime model class for pipeline '{cfg['pipeline']}'")
+            return _load_onnx(cfg, eager, pipe_kwargs)
+        if backend == "compile":
+            return _load_torch_compile(cfg, eager)
+        raise ValueError(f"Unknown backend: {backend}")
+    except Exception as e:
+        logger.warning(f"⚠️ {backend} backend unavailable for {cfg.get('key')}, falling back to eager: {e}")
+        return eager.get()
@@ -0,0 +1,314 @@
+"""
+diffusion.py
+Diffusers-backed text_to_image with progressive previews and draft-then-refine.
+
+- Calling the generator with `on_preview` reports a cheap RGB preview every K
+  steps, decoded from the latents with a fixed linear projection (no VAE
+  pass). `stream_events()` turns such a call, wherever it runs (the fair
+  scheduler's worker, or a thread via `DiffusionGenerator.stream()`), into a
+  generator of previews followed by the final images.
+- "draft" mode uses few steps at reduced resolution; `refine()` (also
+  `mode="refine"`, so it can be queued like any call) upscales a chosen draft
+  and runs an img2img pass built from the same components, so full cost is
+  only paid once.
+- Works with any diffusers text-to-image pipeline, including a tiny randomly
+  initialized one (`tiny_random_pipeline`) for tests.
+"""
+
+import logging
+import queue
+import random
+import threading
+from concurrent.futures import Future
+from typing import Callable, Optional
+
+import numpy as np
+
+from config.settings import AppConfig
+
+logger = logging.getLogger("diffusion")
+
+# Linear latent → RGB approximations (rows: latent channels, cols: R, G, B)
+LATENT_RGB_FACTORS = {
+    "sd": (np.array([[0.3512, 0.2297, 0.3227],
+                     [0.3250, 0.4974, 0.2350],
+                     [-0.2829, 0.1762, 0.2721],
+                     [-0.2120, -0.2616, -0.7177]], dtype=np.float32),
+           np.zeros(3, dtype=np.float32)),
+    "sdxl": (np.array([[0.3651, 0.4232, 0.4341],
+                       [-0.2533, -0.0042, 0.1068],
+                       [0.1076, 0.1111, -0.0362],
+                       [-0.3165, -0.2492, -0.2188]], dtype=np.float32),
+             np.array([0.1084, -0.0175, -0.0011], dtype=np.float32)),
+}
+
+
+def latents_to_rgb(latents, family: str = "sd"):
+    """Approximate decode of (B, C, h, w) latents to a PIL image of the first sample."""
+    from PIL import Image
+
+    array = latents[0].detach().float().cpu().numpy()  # (C, h, w)
+    factors, bias = LATENT_RGB_FACTORS.get(family, LATENT_RGB_FACTORS["sd"])
+    if array.shape[0] == factors.shape[0]:
+        rgb = np.einsum("chw,cr->hwr", array, factors) + bias
+    else:
+        # Unknown latent layout: show the first three channels, normalized
+        rgb = np.moveaxis(array[:3], 0, -1)
+        rgb = rgb / (np.abs(rgb).max() or 1.0)
+    rgb = ((np.clip(rgb, -1.0, 1.0) + 1.0) * 127.5).astype(np.uint8)
+    return Image.fromarray(rgb)
+
+
+class DiffusionGenerator:
+    """Callable wrapper around a diffusers text-to-image pipeline."""
+
+    def __init__(self, pipe, family: Optional[str] = None):
+        self.pipe = pipe
+        self.family = family or ("sdxl" if "XL" in type(pipe).__name__ else "sd")
+        self._img2img = None
+        self._lock = threading.Lock()  # diffusers pipelines are not safe for concurrent calls
+
+    # ───── Sizes ───── #
+    @property
+    def native_size(self) -> int:
+        return self.pipe.unet.config.sample_size * self.pipe.vae_scale_factor
+
+    def draft_size(self) -> int:
+        draft = max(64, int(self.native_size * AppConfig.DIFFUSION_DRAFT_SCALE) // 8 * 8)
+        return min(draft, self.native_size)  # never above native, even for tiny models
+
+    def _params(self, mode: str, seed, kwargs: dict) -> dict:
+        """Call kwargs for a mode; `seed` may be a list for a batched call (one generator per image)."""
+        import torch
+
+        params = dict(kwargs)
+        if mode == "draft":
+            size = self.draft_size()
+            params.setdefault("num_inference_steps", AppConfig.DIFFUSION_DRAFT_STEPS)
+            params.setdefault("height", size)
+            params.setdefault("width", size)
+        else:
+            params.setdefault("num_inference_steps", AppConfig.DIFFUSION_STEPS)
+        if isinstance(seed, (list, tuple)):
+            params["num_images_per_prompt"] = len(seed)
+            params["generator"] = [torch.Generator(device="cpu").manual_seed(int(s)) for s in seed]
+        else:
+            params["generator"] = torch.Generator(device="cpu").manual_seed(seed)
+        return params
+
+    # ───── Engine Interface ───── #
+    def __call__(self, prompt, mode: str = "full", seed: Optional[int] = None, num_images: int = 1,
+                 on_preview: Optional[Callable] = None, preview_every: Optional[int] = None,
+                 stop: Optional[threading.Event] = None, **kwargs):
+        """
+        Images for `prompt`. `on_preview(image)` is called every `preview_every`
+        steps and setting `stop` interrupts at the next step (single-image
+        calls). mode="refine" refines `image=` (see `refine`).
+        """
+        if mode == "refine":
+            return self.refine(kwargs.pop("image"), prompt, seed=seed, **kwargs)
+        if num_images > 1:
+            return [image for image, _ in self.generate_batch(prompt, num_images, seed=seed, mode=mode, **kwargs)]
+        seed = random.randrange(2**31) if seed is None else seed
+        params = self._params(mode, seed, kwargs)
+        if on_preview is not None or stop is not None:
+            params.update(callback_on_step_end=self._on_step_end(on_preview, preview_every, stop),
+                          callback_on_step_end_tensor_inputs=["latents"])
+        with self._lock:
+            return self.pipe(prompt, **params).images
+
+    def _on_step_end(self, on_preview: Optional[Callable], preview_every: Optional[int],
+                     stop: Optional[threading.Event]):
+        preview_every = AppConfig.DIFFUSION_PREVIEW_EVERY if preview_every is None else preview_every
+
+        def on_step_end(pipe, step, timestep, callback_kwargs):
+            if stop is not None and stop.is_set():
+                pipe._interrupt = True
+            elif on_preview is not None and preview_every and (step + 1) % preview_every == 0:
+                on_preview(latents_to_rgb(callback_kwargs["latents"], self.family))
+            return callback_kwargs
+
+        return on_step_end
+
+    def iter_batches(self, prompt, num_images: int, seed: Optional[int] = None, mode: str = "full", **kwargs):
+        """
+        Generate `num_images` with one batched call per DIFFUSION_MAX_BATCH chunk,
+        yielding [(image, seed), ...] as each chunk finishes. The prompt is
+        encoded once per call (num_images_per_prompt) and image i uses seed
+        `seed + i`, so any single image can be reproduced alone.
+        """
+        base = random.randrange(2**31 - num_images) if seed is None else seed
+        seeds = (base + np.arange(num_images)).tolist()
+        for start in range(0, num_images, AppConfig.DIFFUSION_MAX_BATCH):
+            chunk = seeds[start:start + AppConfig.DIFFUSION_MAX_BATCH]
+            with self._lock:
+                images = self.pipe(prompt, **self._params(mode, chunk, kwargs)).images
+            yield list(zip(images, chunk))
+
+    def generate_batch(self, prompt, num_images: int, seed: Optional[int] = None, mode: str = "full", **kwargs):
+        """All of `iter_batches` as one list of (image, seed)."""
+        return [pair for chunk in self.iter_batches(prompt, num_images, seed, mode, **kwargs) for pair in chunk]
+
+    # ───── Streaming ───── #
+    def stream(self, prompt, mode: str = "full", preview_every: Optional[int] = None,
+               seed: Optional[int] = None, **kwargs):
+        """
+        `stream_events` over a call on a background thread. To queue the call
+        in the fair scheduler instead, use `stream_events` with a
+        scheduler.submit runner (see templates/text_to_image/handler.py).
+        """
+        seed = random.randrange(2**31) if seed is None else seed
+
+        def run(on_preview, stop) -> Future:
+            future: Future = Future()
+
+            def target():
+                if not future.set_running_or_notify_cancel():
+                    return
+                try:
+                    future.set_result(self(prompt, mode=mode, seed=seed, on_preview=on_preview,
+                                           preview_every=preview_every, stop=stop, **kwargs))
+                except Exception as e:
+                    future.set_exception(e)
+
+            threading.Thread(target=target, name="diffusion-stream", daemon=True).start()
+            return future
+
+        return stream_events(run, seed, mode)
+
+    # ───── Refine ───── #
+    def refine(self, image, prompt, seed: Optional[int] = None,
+               strength: Optional[float] = None, **kwargs):
+        """
+        Upscale a chosen draft to native size and run an img2img pass on it.
+        A strength too low for a single denoising step (e.g. 0) returns the
+        upscaled draft as is.
+        """
+        import torch
+        from PIL import Image
+        from diffusers import AutoPipelineForImage2Image
+
+        size = self.native_size
+        image = image.convert("RGB").resize((size, size), Image.LANCZOS)
+        strength = AppConfig.DIFFUSION_REFINE_STRENGTH if strength is None else strength
+        steps = kwargs.pop("num_inference_steps", AppConfig.DIFFUSION_STEPS)
+        if int(steps * strength) == 0:  # img2img would run zero steps and fail
+            return [image]
+
+        if self._img2img is None:
+            self._img2img = AutoPipelineForImage2Image.from_pipe(self.pipe)  # Shares weights
+            self._img2img.set_progress_bar_config(disable=True)
+        seed = random.randrange(2**31) if seed is None else seed
+        with self._lock:
+            return self._img2img(
+                prompt,
+                image=image,
+                strength=strength,
+                num_inference_steps=steps,
+                generator=torch.Generator(device="cpu").manual_seed(seed),
+                **kwargs,
+            ).images
+
+
+def stream_events(run: Callable[[Callable, threading.Event], Future], seed: int, mode: str = "full"):
+    """
+    Generator over a diffusion call started by `run(on_preview, stop)`, which
+    returns a Future of its images: yields ("preview", image) as previews
+    arrive, then ("final", {"images": [...], "seed": seed, "mode": mode}).
+    Closing the generator sets `stop` (the pipeline stops at its next step)
+    and cancels the call if it has not started yet.
+    """
+    events: queue.Queue = queue.Queue()
+    stop = threading.Event()
+    future = run(events.put, stop)
+    future.add_done_callback(lambda _: events.put(None))  # after the call's last preview
+    try:
+        while True:
+            preview = events.get()
+            if preview is None:
+                break
+            yield "preview", preview
+        yield "final", {"images": future.result(), "seed": seed, "mode": mode}
+    finally:
+        stop.set()
+        future.cancel()
+
+
+# ──────────────────────────────────────────────────────────────
+# Builders
+# ──────────────────────────────────────────────────────────────
+
+def load_diffusion_pipeline(cfg: dict) -> DiffusionGenerator:
+    """Build a diffusers pipeline for a huggingface/local text-to-image spec."""
+    import torch
+    from diffusers import AutoPipelineForText2Image
+
+    source = cfg.get("path") or cfg["name"]
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+    dtype = torch.float16 if device == "cuda" else torch.float32
+    logger.info(f"🎨 Loading diffusers pipeline: {source} on {device}")
+    pipe = AutoPipelineForText2Image.from_pretrained(source, torch_dtype=dtype).to(device)
+    pipe.set_progress_bar_config(disable=True)
+    return DiffusionGenerator(pipe)
+
+
+def _tiny_clip_tokenizer():
+    """Byte-level CLIP tokenizer with no merges, written locally (no hub access)."""
+    import json
+    import tempfile
+    from transformers import CLIPTokenizer
+
+    # GPT-2/CLIP byte -> printable unicode table
+    printable = list(range(ord("!"), ord("~") + 1)) + list(range(ord("¡"), ord("¬") + 1)) \
+        + list(range(ord("®"), ord("ÿ") + 1))
+    chars, extra = [], 0
+    for b in range(256):
+        if b in printable:
+            chars.append(chr(b))
+        else:
+            chars.append(chr(256 + extra))
+            extra += 1
+    tokens = ["<|startoftext|>", "<|endoftext|>"] + chars + [c + "</w>" for c in chars]
+
+    folder = tempfile.mkdtemp(prefix="tiny-clip-")
+    with open(f"{folder}/vocab.json", "w", encoding="utf-8") as f:
+        json.dump({token: i for i, token in enumerate(tokens)}, f)
+    with open(f"{folder}/merges.txt", "w", encoding="utf-8") as f:
+        f.write("#version: 0.2\n")
+    return CLIPTokenizer.from_pretrained(folder, model_max_length=77)
+
+
+def tiny_random_pipeline(seed: int = 0) -> DiffusionGenerator:
+    """
+    Randomly initialized, few-KB StableDiffusionPipeline (diffusers test configs)
+    for exercising previews/draft/refine fully offline: no weights or
+    tokenizer files are downloaded.
+    """
+    import torch
+    from diffusers import AutoencoderKL, DDIMScheduler, StableDiffusionPipeline, UNet2DConditionModel
+    from transformers import CLIPTextConfig, CLIPTextModel
+
+    torch.manual_seed(seed)
+    unet = UNet2DConditionModel(
+        block_out_channels=(4, 8), layers_per_block=1, sample_size=16, in_channels=4, out_channels=4,
+        down_block_types=("DownBlock2D", "CrossAttnDownBlock2D"),
+        up_block_types=("CrossAttnUpBlock2D", "UpBlock2D"),
+        cross_attention_dim=8, norm_num_groups=2,
+    )
+    vae = AutoencoderKL(
+        block_out_channels=(4, 8), in_channels=3, out_channels=3, latent_channels=4, norm_num_groups=2,
+        down_block_types=("DownEncoderBlock2D", "DownEncoderBlock2D"),
+        up_block_types=("UpDecoderBlock2D", "UpDecoderBlock2D"),
+    )
+    text_encoder = CLIPTextModel(CLIPTextConfig(
+        bos_token_id=0, eos_token_id=2, hidden_size=8, intermediate_size=16, layer_norm_eps=1e-05,
+        num_attention_heads=2, num_hidden_layers=2, pad_token_id=1, vocab_size=1000,
+    ))
+    tokenizer = _tiny_clip_tokenizer()
+    pipe = StableDiffusionPipeline(
+        unet=unet, vae=vae, text_encoder=text_encoder, tokenizer=tokenizer,
+        scheduler=DDIMScheduler(), safety_checker=None, feature_extractor=None,
+        requires_safety_checker=False,
+    )
+    pipe.set_progress_bar_config(disable=True)
+    return DiffusionGenerator(pipe, family="sd")
@@ -5,38 +5,72 @@ Supports text, image, video, and audio based on templates.
 """
 
 from model.loader import model_loader
+from model.jobs import job_manager
+from model.streaming import read_response
+from model.traces import trace_recorder
+from model.sessions import session_cache, supports_sessions
+from model.workers import RemoteModel
 import requests
+from typing import Optional
 
 class InferenceEngine:
     def __init__(self):
         pass
 
-    def run_inference(self, task: str, input_data, **kwargs):
+    def run_inference(self, task: str, input_data, tenant: Optional[str] = None, **kwargs):
         """
         Runs inference based on the task.
         task: str - one of "text_to_text", "text_to_image", etc.
         input_data: varies (str, image, audio, etc.)
+        tenant: who the request is for (set by the scheduler); routes remote workers
         kwargs: additional parameters (e.g., prompt settings, generation length, etc.)
         """
-        model = model_loader.load_model(task)
-        cfg = model_loader.models.get(task)
+        with model_loader.lease(task) as (model, cfg), \
+                trace_recorder.record(task, cfg, input_data, kwargs) as outcome:
+            outcome["result"] = self._dispatch(task, model, cfg, input_data, tenant=tenant, **kwargs)
+            return outcome["result"]
 
+    def _dispatch(self, task: str, model, cfg: dict, input_data, tenant: Optional[str] = None, **kwargs):
         # HuggingFace / Local model pipeline
         if callable(model):
+            session_id = kwargs.pop("session_id", None)
+            if isinstance(model, RemoteModel):
+                # Sticky per conversation, else per tenant (consistent-hash ring)
+                return model(input_data, route_key=session_id or tenant, **kwargs)
+            if session_id and supports_sessions(model, cfg):
+                return session_cache.generate(model, cfg, session_id, input_data, **kwargs)  # KV reuse across turns
             result = model(input_data, **kwargs)
             return result
 
+        # Submit-then-poll API: block this caller only (prefer submit_job + job_manager.stream in UIs)
+        elif isinstance(model, str) and cfg.get("job_api"):
+            job_id = self.submit_job(task, input_data, **kwargs)
+            return job_manager.result(job_id)
+
         # API-based model call
         elif isinstance(model, str):  # API endpoint stored as string
+            # Streamed: binary/base64 outputs land in the output store as file paths
             response = requests.post(
                 model,
-                json={"input": input_data, "params": kwargs}
+                json={"input": input_data, "params": kwargs},
+                stream=True
             )
-            return response.json()
+            return read_response(response)
 
         else:
             raise ValueError(f"Unsupported model type for task {task}")
 
+    def submit_job(self, task: str, input_data, **kwargs) -> str:
+        """
+        Submits a long-running API job and returns its job id without waiting.
+        Progress is reported through the task tracker under the same id.
+        """
+        endpoint = model_loader.load_model(task)
+        cfg = model_loader.configs.get(task, {})
+        if not isinstance(endpoint, str):
+            raise ValueError(f"Task {task} is not backed by an API endpoint")
+        return job_manager.submit(task, endpoint, input_data, auth_env=cfg.get("auth_env"), **kwargs)
+
 # Singleton inference instance
 inference_engine = InferenceEngine()
 
@@ -0,0 +1,338 @@
+"""
+jobs.py
+Async job manager for submit-then-poll generation APIs (text_to_video, some image APIs).
+
+A single background event loop tracks every outstanding job with adaptive poll
+intervals, mirrors progress into the task tracker and journals outstanding jobs
+(utils/journal.py) so they are resumed after a process restart.
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import Future
+from dataclasses import dataclass, asdict, field
+from typing import Any, Dict, Optional, Tuple
+
+import requests
+
+from config.settings import AppConfig
+from utils.exceptions import JobError
+from utils.journal import JournalStore
+from utils.tracker import create_task, update_task, complete_task, error_task
+
+logger = logging.getLogger("job-manager")
+
+SUCCESS_STATES = {"succeeded", "success", "completed", "complete", "done", "finished"}
+FAILED_STATES = {"failed", "error", "cancelled", "canceled", "rejected"}
+RETRYABLE_STATUS = {408, 425, 429}  # plus every 5xx
+
+
+# ──────────────────────────────────────────────────────────────
+# Data structures
+# ──────────────────────────────────────────────────────────────
+
+@dataclass
+class Job:
+    """Outstanding (or finished) job against a submit-then-poll API."""
+    job_id: str                      # Local id, also used as the tracker task id
+    task: str
+    endpoint: str
+    auth_env: Optional[str] = None
+    payload: Optional[Dict] = None   # Submission body; dropped once the provider accepted it
+    remote_id: Optional[str] = None
+    status_url: Optional[str] = None
+    status: str = "pending"
+    progress: int = 0
+    result: Any = None
+    error: Optional[str] = None
+    interval: float = AppConfig.JOB_POLL_MIN_INTERVAL
+    created_at: float = field(default_factory=time.time)
+
+    @property
+    def done(self) -> bool:
+        return self.status in ("success", "error")
+
+    def snapshot(self) -> Dict:
+        return {
+            "job_id": self.job_id,
+            "task": self.task,
+            "status": self.status,
+            "progress": self.progress,
+            "result": self.result,
+            "error": self.error,
+        }
+
+
+# ──────────────────────────────────────────────────────────────
+# Provider response helpers
+# ──────────────────────────────────────────────────────────────
+
+def _auth_headers(auth_env: Optional[str]) -> Dict[str, str]:
+    token = os.getenv(auth_env) if auth_env else None
+    return {"Authorization": f"Bearer {token}"} if token else {}
+
+
+def _parse_submit(endpoint: str, payload: Dict) -> Tuple[str, str]:
+    """
+    Extract (remote_id, status_url) from a provider's submit response.
+    Falls back to `<endpoint>/<id>` when no explicit polling URL is returned.
+    """
+    remote_id = next(
+        (payload[k] for k in ("id", "job_id", "task_id", "uuid") if payload.get(k)), None
+    )
+    if not remote_id:
+        raise JobError(f"Submit response has no job id: {payload}")
+
+    urls = payload.get("urls") if isinstance(payload.get("urls"), dict) else {}
+    status_url = payload.get("status_url") or payload.get("polling_url") or urls.get("get")
+    return str(remote_id), status_url or f"{endpoint.rstrip('/')}/{remote_id}"
+
+
+def _is_transient(error: Exception) -> bool:
+    """Network hiccups and provider-side (5xx / rate limit) errors are worth retrying."""
+    if isinstance(error, (requests.Timeout, requests.ConnectionError)):
+        return True
+    if isinstance(error, requests.HTTPError) and error.response is not None:
+        code = error.response.status_code
+        return code >= 500 or code in RETRYABLE_STATUS
+    return False
+
+
+def _parse_status(payload: Dict) -> Tuple[str, Optional[int], Any]:
+    """
+    Normalize a provider's poll response to (state, progress 0-100 | None, output).
+    """
+    state = str(payload.get("status") or payload.get("state") or "").lower()
+    progress = payload.get("progress")
+    if isinstance(progress, (int, float)):
+        progress = int(progress * 100) if progress <= 1 else int(progress)
+    else:
+        progress = None
+    output = payload.get("output") or payload.get("outputs") or payload.get("result")
+    return state, progress, output
+
+
+# ──────────────────────────────────────────────────────────────
+# Job manager
+# ──────────────────────────────────────────────────────────────
+
+class JobManager:
+    def __init__(self, store_path=AppConfig.JOBS_JOURNAL):
+        self.store_path = str(store_path)
+        self._store: Optional[JournalStore] = None
+        self._jobs: Dict[str, Job] = {}
+        self._futures: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+
+    # ───── Lifecycle ───── #
+    def start(self):
+        """Start the background event loop and resume persisted jobs."""
+        with self._lock:
+            if self._loop is not None:
+                return
+            self._store = JournalStore(self.store_path)
+            self._loop = asyncio.new_event_loop()
+            self._thread = threading.Thread(target=self._loop.run_forever, name="job-manager", daemon=True)
+            self._thread.start()
+        self._resume()
+
+    def stop(self):
+        """Cancels the pending poll loops (jobs stay journaled and resume on next start)."""
+        if self._loop is None:
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(self._cancel_runs(), self._loop).result(timeout=5)
+        except Exception as e:
+            logger.warning(f"⚠️ Job loops did not stop cleanly: {e}")
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
+        self._loop = None
+        self._store.close()
+
+    # ───── Public API ───── #
+    def submit(self, task: str, endpoint: str, input_data, auth_env: Optional[str] = None,
+               label: Optional[str] = None, **params) -> str:
+        """
+        Submit a job and return its local id immediately.
+        The job is submitted and polled on the background loop.
+        """
+        self.start()
+        job_id = str(uuid.uuid4())
+        job = Job(
+            job_id=job_id,
+            task=task,
+            endpoint=endpoint,
+            auth_env=auth_env,
+            payload={"input": input_data, "params": params},
+        )
+        create_task(label or f"{task} job", task_id=job_id)
+        self._schedule(job)
+        return job_id
+
+    def get(self, job_id: str) -> Dict:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return job.snapshot() if job else {"job_id": job_id, "status": "not_found"}
+
+    def result(self, job_id: str, timeout: Optional[float] = None):
+        """Block until the job finishes. Raises JobError on failure."""
+        return self._future(job_id).result(timeout=timeout)
+
+    async def wait(self, job_id: str):
+        """Await the job result from any event loop (e.g. a Gradio async handler)."""
+        return await asyncio.wrap_future(self._future(job_id))
+
+    async def stream(self, job_id: str, interval: float = 0.5):
+        """
+        Async generator yielding job snapshots whenever status/progress changes.
+        The last snapshot yielded is terminal ("success" or "error").
+        """
+        last = None
+        while True:
+            snap = self.get(job_id)
+            key = (snap["status"], snap.get("progress"))
+            if key != last:
+                last = key
+                yield snap
+            if snap["status"] in ("success", "error", "not_found"):
+                return
+            await asyncio.sleep(interval)
+
+    def cancel(self, job_id: str) -> bool:
+        """Stop tracking a job locally (providers are not notified)."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if not job or job.done:
+            return False
+        self._finish(job, error="Cancelled by user.")
+        return True
+
+    # ───── Internals ───── #
+    def _future(self, job_id: str) -> Future:
+        with self._lock:
+            future = self._futures.get(job_id)
+        if future is None:
+            raise JobError(f"Unknown job: {job_id}")
+        return future
+
+    def _schedule(self, job: Job):
+        with self._lock:
+            self._jobs[job.job_id] = job
+            self._futures[job.job_id] = Future()
+        self._persist(job)
+        asyncio.run_coroutine_threadsafe(self._run(job), self._loop)
+
+    @staticmethod
+    async def _cancel_runs():
+        runs = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+        for run in runs:
+            run.cancel()
+        await asyncio.gather(*runs, return_exceptions=True)
+
+    async def _run(self, job: Job):
+        try:
+            if job.remote_id is None:
+                await self._submit_remote(job)
+            while not job.done:
+                if time.time() - job.created_at > AppConfig.JOB_TIMEOUT:
+                    raise JobError(f"Job timed out after {AppConfig.JOB_TIMEOUT:.0f}s")
+                await asyncio.sleep(job.interval)
+                try:
+                    await self._poll(job)
+                except Exception as e:
+                    if not _is_transient(e):
+                        raise
+                    # Keep polling until JOB_TIMEOUT; only a terminal remote status fails the job
+                    job.interval = min(max(job.interval, AppConfig.JOB_POLL_MIN_INTERVAL) * AppConfig.JOB_POLL_BACKOFF,
+                                       AppConfig.JOB_POLL_MAX_INTERVAL)
+                    logger.warning(f"⚠️ Poll of job {job.job_id} failed ({type(e).__name__}: {e}), retrying in {job.interval:.1f}s")
+        except Exception as e:
+            logger.error(f"[x] Job {job.job_id} ({job.task}) failed: {e}")
+            self._finish(job, error=str(e))
+
+    async def _submit_remote(self, job: Job):
+        response = await asyncio.to_thread(
+            requests.post, job.endpoint, json=job.payload,
+            headers=_auth_headers(job.auth_env), timeout=30,
+        )
+        response.raise_for_status()
+        job.remote_id, job.status_url = _parse_submit(job.endpoint, response.json())
+        job.payload = None
+        job.status = "in_progress"
+        update_task(job.job_id, 5, "Submitted, waiting for provider...", "in_progress")
+        self._persist(job)
+        logger.info(f"🌐 Submitted {job.task} job {job.job_id} → {job.remote_id}")
+
+    async def _poll(self, job: Job):
+        response = await asyncio.to_thread(
+            requests.get, job.status_url, headers=_auth_headers(job.auth_env), timeout=30,
+        )
+        response.raise_for_status()
+        state, progress, output = _parse_status(response.json())
+
+        if state in SUCCESS_STATES:
+            self._finish(job, result=output)
+        elif state in FAILED_STATES:
+            self._finish(job, error=f"Provider reported '{state}'")
+        else:
+            # Adaptive interval: poll fast while the provider reports movement, back off when idle
+            if progress is not None and progress != job.progress:
+                job.progress = progress
+                job.interval = AppConfig.JOB_POLL_MIN_INTERVAL
+                update_task(job.job_id, progress, f"{state or 'running'} ({progress}%)", "in_progress")
+            else:
+                job.interval = min(job.interval * AppConfig.JOB_POLL_BACKOFF, AppConfig.JOB_POLL_MAX_INTERVAL)
+
+    def _finish(self, job: Job, result: Any = None, error: Optional[str] = None):
+        with self._lock:
+            if job.done:
+                return
+            job.result, job.error = result, error
+            job.status = "error" if error else "success"
+            job.progress = 100
+            future = self._futures.get(job.job_id)
+
+        if error:
+            error_task(job.job_id, f"Failed: {error}")
+            if future and not future.done():
+                future.set_exception(JobError(error))
+        else:
+            complete_task(job.job_id, "Completed successfully.")
+            if future and not future.done():
+                future.set_result(result)
+        self._persist(job)
+
+    # ───── Persistence ───── #
+    def _persist(self, job: Job):
+        """One journal append per state change: outstanding jobs are stored, finished ones deleted."""
+        try:
+            if job.done:
+                self._store.delete(job.job_id)
+            else:
+                self._store.put(job.job_id, asdict(job))
+        except Exception as e:
+            logger.error(f"[x] Failed to persist job {job.job_id}: {e}")
+
+    def _resume(self):
+        resumed = 0
+        for job_id, record in list(self._store.items()):
+            job = Job(**record)
+            if job.remote_id is None and job.payload is None:
+                self._store.delete(job_id)
+                continue
+            create_task(f"{job.task} job (resumed)", task_id=job.job_id)
+            update_task(job.job_id, job.progress, "Resumed after restart.", "in_progress")
+            self._schedule(job)
+            resumed += 1
+        if resumed:
+            logger.info(f"🔁 Resumed {resumed} outstanding job(s)")
+
+
+# Singleton job manager (started with the API server, or lazily on first submit)
+job_manager = JobManager()
@@ -1,17 +1,57 @@
 """
 loader.py
-Responsible for loading AI models dynamically based on config/settings.py
-Supports local models, Hugging Face, and API endpoints.
+Responsible for loading AI models dynamically based on model/registry.py
+Supports local models, Hugging Face, API endpoints and remote workers.
 """
 
 import os
-from config.settings import MODEL_CONFIG
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+import model.registry as registry
 from transformers import pipeline, AutoTokenizer, AutoModelForCausalLM
 import torch
+from model.workers import RemoteModel
+from model.compiled import load_backend
+from model.assisted import attach_draft
+from model.diffusion import load_diffusion_pipeline
+from model.snapshot import load_snapshotted
+
+def apply_tuning(tuning: dict):
+    """
+    Applies tuned torch thread counts (see model/tuner.py). Thread pools are
+    process-wide, so the last loaded model's tuning wins; inter-op threads can
+    only be set before torch starts its first parallel region.
+    """
+    if tuning.get("intra_op_threads"):
+        torch.set_num_threads(tuning["intra_op_threads"])
+    if tuning.get("inter_op_threads"):
+        try:
+            torch.set_num_interop_threads(tuning["inter_op_threads"])
+        except RuntimeError:
+            pass  # already initialized in this process
+
+
+def ensure_pad_token(pipe):
+    """
+    Batched generation (a tuned batch_size > 1) needs a pad token. Decoder-only
+    tokenizers often have none: pad with EOS, on the left so every prompt ends
+    right where generation starts.
+    """
+    tokenizer = getattr(pipe, "tokenizer", None)
+    if tokenizer is not None and tokenizer.pad_token is None and tokenizer.eos_token is not None:
+        tokenizer.pad_token = tokenizer.eos_token
+        tokenizer.padding_side = "left"
+    return pipe
+
 
 class ModelLoader:
     def __init__(self):
         self.models = {}
+        self.configs = {}
+        self._lock = threading.RLock()
+        self._inflight = defaultdict(int)  # id(model) -> requests currently using it
+        self._build_locks = defaultdict(threading.Lock)  # task -> lock held while its model is built
 
     def load_model(self, task: str):
         """
@@ -20,32 +60,114 @@ class ModelLoader:
         if task in self.models:
             return self.models[task]
 
-        if task not in MODEL_CONFIG:
+        if task not in registry.MODEL_CONFIG:
             raise ValueError(f"No model configuration found for task: {task}")
 
-        cfg = MODEL_CONFIG[task]
+        with self._lock:
+            build_lock = self._build_locks[task]
+        with build_lock:  # concurrent first requests build the model once
+            if task in self.models:
+                return self.models[task]
+            cfg = registry.MODEL_CONFIG[task]
+            model = self.build(cfg, task)
+
+            with self._lock:
+                self.models = {**self.models, task: model}
+                self.configs = {**self.configs, task: cfg}
+        return model
+
+    @contextmanager
+    def lease(self, task: str):
+        """
+        Yields (model, cfg) for a task and counts it as in-flight, so a hot
+        reload can drain a replaced model before unloading it.
+        """
+        with self._lock:
+            model, cfg = self.models.get(task), self.configs.get(task)
+        if model is None:
+            model = self.load_model(task)
+            cfg = self.configs.get(task, {})
+        with self._lock:
+            self._inflight[id(model)] += 1
+        try:
+            yield model, cfg
+        finally:
+            with self._lock:
+                self._inflight[id(model)] -= 1
+                if not self._inflight[id(model)]:
+                    del self._inflight[id(model)]
+
+    def inflight(self, model) -> int:
+        with self._lock:
+            return self._inflight.get(id(model), 0)
+
+    def swap(self, updates: dict, removed=()) -> list:
+        """
+        Atomically installs {task: (model, cfg)} and drops `removed` tasks.
+        Returns the models that were replaced or removed (to be drained).
+        """
+        with self._lock:
+            models, configs = dict(self.models), dict(self.configs)
+            retired = []
+            for task, (model, cfg) in updates.items():
+                if task in models:
+                    retired.append(models[task])
+                models[task], configs[task] = model, cfg
+            for task in removed:
+                if task in models:
+                    retired.append(models.pop(task))
+                    configs.pop(task, None)
+            self.models, self.configs = models, configs
+        return retired
+
+    def build(self, cfg: dict, task: str = ""):
+        """
+        Instantiates a model from a loader config dict (see ModelSpec.to_loader_config).
+        """
+        if cfg["source"] in ("huggingface", "local"):
+            tuning = cfg.get("tuning") or {}
+            apply_tuning(tuning)
+            pipe_kwargs = {"batch_size": tuning["batch_size"]} if tuning.get("batch_size") else {}
+
+            def build_eager():
+                # Restores from a snapshot when available (see model/snapshot.py)
+                return load_snapshotted(cfg, lambda: self._build_pipeline(cfg, task, pipe_kwargs), pipe_kwargs)
+
+            if cfg.get("backend", "eager") != "eager":
+                model = load_backend(cfg, build_eager, pipe_kwargs)  # Falls back to eager on failure
+            else:
+                model = build_eager()
+            if cfg["pipeline"] == "text-generation":
+                ensure_pad_token(model)
+            return attach_draft(model, cfg)  # No-op without a compatible draft model
 
-        if cfg["source"] == "huggingface":
-            print(f"🔄 Loading HuggingFace model: {cfg['name']} for task {task}")
-            model = pipeline(
-                cfg["pipeline"],
-                model=cfg["name"],
-                device=0 if torch.cuda.is_available() else -1
-            )
-        elif cfg["source"] == "local":
-            print(f"📂 Loading local model from {cfg['path']}")
-            tokenizer = AutoTokenizer.from_pretrained(cfg["path"])
-            model = AutoModelForCausalLM.from_pretrained(cfg["path"])
-            model = pipeline(cfg["pipeline"], model=model, tokenizer=tokenizer)
         elif cfg["source"] == "api":
             print(f"🌐 Using API endpoint for task {task}")
             model = cfg["endpoint"]  # Will be handled in inference.py
+        elif cfg["source"] == "worker":
+            print(f"🧩 Routing task {task} to worker pool model {cfg['key']}")
+            model = RemoteModel(cfg["key"])  # Callable, served by api/worker.py processes
         else:
             raise ValueError(f"Unknown model source: {cfg['source']}")
 
-        self.models[task] = model
         return model
 
+    def _build_pipeline(self, cfg: dict, task: str, pipe_kwargs: dict):
+        if cfg["pipeline"] == "text-to-image":
+            return load_diffusion_pipeline(cfg)  # diffusers, not a transformers pipeline
+        if cfg["source"] == "huggingface":
+            print(f"🔄 Loading HuggingFace model: {cfg['name']} for task {task}")
+            return pipeline(
+                cfg["pipeline"],
+                model=cfg["name"],
+                device=0 if torch.cuda.is_available() else -1,
+                **pipe_kwargs
+            )
+        print(f"📂 Loading local model from {cfg['path']}")
+        tokenizer = AutoTokenizer.from_pretrained(cfg["path"])
+        model = AutoModelForCausalLM.from_pretrained(cfg["path"])
+        return pipeline(cfg["pipeline"], model=model, tokenizer=tokenizer, **pipe_kwargs)
+
 # Singleton loader instance
 model_loader = ModelLoader()
 
@@ -0,0 +1,329 @@
+"""
+loadgen.py
+End-to-end load generator that replays recorded traffic traces (model/traces.py).
+
+Launches the app in-process (api/server.py on a free local port) with stub
+models whose latency, error rate and output size are fitted from the trace,
+then replays the trace's arrival pattern against it over HTTP:
+
+- `--speed 4` compresses time 4x (same requests, arrivals 4x closer together)
+- `--scale 2.5` multiplies traffic (each request replayed 2-3 times, copies
+  spread over the following inter-arrival gap)
+
+Latency is measured from each request's *scheduled* send time, so a saturated
+app is not hidden by the client falling behind. The report (throughput,
+latency percentiles overall and per task, error rate, and a timeline of queue
+depth, in-flight requests and app memory) is written to runtime/loadtests/.
+
+    python -m model.loadgen runtime/traces/2024-06-10.jsonl --speed 10
+    python -m model.loadgen trace.jsonl --scale 3 --concurrency 4
+    python -m model.loadgen trace.jsonl --url http://gpu-box:8000   # existing app, real models
+"""
+
+import argparse
+import json
+import logging
+import random
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import requests
+from requests.adapters import HTTPAdapter
+
+from config.settings import AppConfig
+from model.traces import build_stub_models, iter_trace_files, load_trace, trace_recorder
+from utils.history import use_journal
+
+logger = logging.getLogger("load-generator")
+
+
+# ──────────────────────────────────────────────────────────────
+# Replay schedule
+# ──────────────────────────────────────────────────────────────
+
+def build_schedule(records: List[Dict], speed: float = 1.0, scale: float = 1.0,
+                   seed: Optional[int] = None) -> List[Tuple[float, Dict]]:
+    """(offset seconds from start, record) pairs for a time-compressed and/or scaled replay."""
+    if not records:
+        return []
+    rng = random.Random(seed)
+    first = records[0]["arrival"]
+    offsets = [(r["arrival"] - first) / speed for r in records]
+    gaps = np.diff(offsets + [offsets[-1]]).tolist()
+
+    schedule = []
+    for offset, gap, record in zip(offsets, gaps, records):
+        copies = int(scale) + (rng.random() < scale - int(scale))
+        for copy in range(copies):
+            # The original keeps its arrival time; extra copies fall inside the next gap
+            schedule.append((offset + (rng.uniform(0, gap) if copy else 0.0), record))
+    return sorted(schedule, key=lambda item: item[0])
+
+
+def synthetic_input(size: int) -> str:
+    """Text payload of the recorded input size (capped)."""
+    size = min(max(size, 1), AppConfig.LOADGEN_MAX_PAYLOAD)
+    words = "the quick brown fox jumps over the lazy dog "
+    return (words * (size // len(words) + 1))[:size]
+
+
+# ──────────────────────────────────────────────────────────────
+# In-process app with stub models
+# ──────────────────────────────────────────────────────────────
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def install_stub_models(records: List[Dict], seed: Optional[int] = None) -> Dict[str, Dict]:
+    """Swap a fitted StubModel in for every task in the trace; returns each stub's parameters."""
+    from model.loader import model_loader
+
+    stubs = build_stub_models(records, seed=seed)
+    model_loader.swap({
+        task: (stub, {"key": f"stub-{task}", "source": "stub", "task": task})
+        for task, stub in stubs.items()
+    })
+    return {
+        task: {**stub.latency.as_dict(), "error_rate": round(stub.error_rate, 4), "output_size": stub.output_size}
+        for task, stub in stubs.items()
+    }
+
+
+def launch_local_app():
+    """Serves api/server.py on a free localhost port from a background thread."""
+    import uvicorn
+    from api.server import create_app
+
+    port = _free_port()
+    server = uvicorn.Server(uvicorn.Config(
+        create_app(), host="127.0.0.1", port=port, log_level="warning",
+        timeout_keep_alive=AppConfig.API_KEEP_ALIVE,
+    ))
+    thread = threading.Thread(target=server.run, name="loadgen-app", daemon=True)
+    thread.start()
+    while not server.started:
+        if not thread.is_alive():
+            raise RuntimeError("Local app failed to start")
+        time.sleep(0.05)
+    return f"http://127.0.0.1:{port}", server
+
+
+# ──────────────────────────────────────────────────────────────
+# Replay
+# ──────────────────────────────────────────────────────────────
+
+class _Sampler:
+    """Polls the app's /health for queue depth and memory while the replay runs."""
+
+    def __init__(self, url: str, started: float, counters: Dict):
+        self.url = url
+        self.started = started
+        self.counters = counters
+        self.timeline: List[Dict] = []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._loop, name="loadgen-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _loop(self):
+        while not self._stop.wait(AppConfig.LOADGEN_SAMPLE_INTERVAL):
+            sample = {"t": round(time.perf_counter() - self.started, 2), **self.counters}
+            try:
+                health = requests.get(f"{self.url}/health", timeout=5).json()
+                sample.update(queue_depth=health.get("queued"), rss_mb=health.get("rss_mb"))
+            except (requests.RequestException, ValueError):
+                sample.update(queue_depth=None, rss_mb=None)
+            self.timeline.append(sample)
+
+
+def replay(records: List[Dict], url: str, speed: float = 1.0, scale: float = 1.0, stubbed: bool = True,
+           timeout: float = AppConfig.WORKER_TIMEOUT, seed: Optional[int] = None) -> Dict:
+    """Replays `records` against the app at `url` and returns the raw per-request results and timeline."""
+    schedule = build_schedule(records, speed, scale, seed)
+    results: List[Dict] = []
+    counters = {"sent": 0, "in_flight": 0, "completed": 0, "errors": 0}
+    lock = threading.Lock()
+    session = requests.Session()
+    session.mount("http://", HTTPAdapter(pool_maxsize=AppConfig.LOADGEN_MAX_CLIENTS))
+
+    def send(scheduled_at: float, record: Dict):
+        params = dict(record.get("params") or {})
+        if stubbed:
+            params.update(_input_size=record.get("input_size", 0), _output_size=record.get("output_size"))
+        body = {"input": synthetic_input(record.get("input_size", 0)), "params": params}
+        try:
+            response = session.post(f"{url}/v1/{record['task']}/infer", json=body,
+                                    headers={"X-Tenant": "loadgen"}, timeout=timeout)
+            ok, error = response.ok, None if response.ok else f"HTTP {response.status_code}"
+        except requests.RequestException as e:
+            ok, error = False, type(e).__name__
+        finished = time.perf_counter()
+        with lock:
+            counters["in_flight"] -= 1
+            counters["completed" if ok else "errors"] += 1
+            results.append({
+                "task": record["task"],
+                "scheduled": round(scheduled_at - started, 4),
+                "latency": round(finished - scheduled_at, 4),
+                "ok": ok,
+                "error": error,
+            })
+
+    started = time.perf_counter()
+    sampler = _Sampler(url, started, counters)
+    sampler.start()
+    with ThreadPoolExecutor(max_workers=AppConfig.LOADGEN_MAX_CLIENTS, thread_name_prefix="loadgen") as pool:
+        for offset, record in schedule:
+            delay = started + offset - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            with lock:
+                counters["sent"] += 1
+                counters["in_flight"] += 1
+            pool.submit(send, started + offset, record)
+    elapsed = time.perf_counter() - started
+    sampler.stop()
+    session.close()
+    return {"results": results, "timeline": sampler.timeline, "elapsed": elapsed}
+
+
+# ──────────────────────────────────────────────────────────────
+# Report
+# ──────────────────────────────────────────────────────────────
+
+def _latency_stats(latencies: List[float]) -> Dict:
+    if not latencies:
+        return {}
+    values = np.array(latencies)
+    p50, p90, p95, p99 = np.percentile(values, [50, 90, 95, 99])
+    return {
+        "mean": round(float(values.mean()), 4),
+        "p50": round(float(p50), 4),
+        "p90": round(float(p90), 4),
+        "p95": round(float(p95), 4),
+        "p99": round(float(p99), 4),
+        "max": round(float(values.max()), 4),
+    }
+
+
+def summarize(run: Dict) -> Dict:
+    results, elapsed = run["results"], run["elapsed"]
+    ok = [r for r in results if r["ok"]]
+    by_task = {}
+    for task in sorted({r["task"] for r in results}):
+        task_results = [r for r in results if r["task"] == task]
+        task_ok = [r["latency"] for r in task_results if r["ok"]]
+        by_task[task] = {
+            "requests": len(task_results),
+            "error_rate": round(1 - len(task_ok) / len(task_results), 4),
+            "latency": _latency_stats(task_ok),
+        }
+    queue_depths = [s["queue_depth"] for s in run["timeline"] if s.get("queue_depth") is not None]
+    memory = [s["rss_mb"] for s in run["timeline"] if s.get("rss_mb") is not None]
+    return {
+        "requests": len(results),
+        "duration": round(elapsed, 2),
+        "throughput": round(len(ok) / elapsed, 3) if elapsed else None,  # successful requests / s
+        "error_rate": round(1 - len(ok) / len(results), 4) if results else None,
+        "latency": _latency_stats([r["latency"] for r in ok]),
+        "max_queue_depth": max(queue_depths, default=None),
+        "peak_rss_mb": max(memory, default=None),
+        "tasks": by_task,
+    }
+
+
+def run_loadtest(trace_path, speed: float = 1.0, scale: float = 1.0, url: Optional[str] = None,
+                 concurrency: Optional[int] = None, seed: Optional[int] = None) -> Dict:
+    """
+    Replays a trace file and writes the report to runtime/loadtests/.
+    Without `url`, the app is launched locally with stub models.
+    """
+    records = load_trace(trace_path)
+    if not records:
+        raise ValueError(f"Trace {trace_path} has no records")
+
+    stubs, server, saved = None, None, None
+    if url is None:
+        from model.loader import model_loader
+        from model.scheduler import scheduler
+
+        # Process-wide state the local replay changes, restored below
+        saved = {
+            "tracing": trace_recorder.enabled,
+            "concurrency": AppConfig.TASK_CONCURRENCY,
+            "models": {t: (m, model_loader.configs.get(t, {})) for t, m in model_loader.models.items()},
+        }
+        trace_recorder.enabled = False  # Don't record the replay itself...
+        saved["journal"] = use_journal(AppConfig.LOADGEN_HISTORY_JOURNAL)  # ...nor mix it into real request history
+        if concurrency:
+            AppConfig.TASK_CONCURRENCY = {**AppConfig.TASK_CONCURRENCY, "default": concurrency}
+            scheduler.restart_workers()  # applies to pools already running too
+
+    logger.info(f"🚦 Replaying {len(records)} requests from {trace_path} against "
+                f"{url or 'a local app with stub models'} (speed x{speed}, scale x{scale})")
+    try:
+        if url is None:
+            stubs = install_stub_models(records, seed=seed)
+            url, server = launch_local_app()
+        run = replay(records, url, speed=speed, scale=scale, stubbed=stubs is not None, seed=seed)
+    finally:
+        if server is not None:
+            server.should_exit = True
+        if saved is not None:
+            trace_recorder.enabled = saved["tracing"]
+            use_journal(saved["journal"])
+            AppConfig.TASK_CONCURRENCY = saved["concurrency"]
+            model_loader.swap(saved["models"], removed=[t for t in stubs or () if t not in saved["models"]])
+            if concurrency:
+                scheduler.restart_workers()  # back to the configured pool sizes
+
+    report = {
+        "trace": str(trace_path),
+        "target": url if stubs is None else "local (stub models)",
+        "speed": speed,
+        "scale": scale,
+        "concurrency": concurrency,
+        "stubs": stubs,
+        "summary": summarize(run),
+        "timeline": run["timeline"],
+        "requests": run["results"],
+    }
+    AppConfig.LOADGEN_REPORTS_DIR.mkdir(parents=True, exist_ok=True)
+    path = AppConfig.LOADGEN_REPORTS_DIR / f"{Path(trace_path).stem}-{time.strftime('%Y%m%d-%H%M%S')}.json"
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=4)
+    logger.info(f"[✓] Load test report saved to {path}")
+    report["path"] = str(path)
+    return report
+
+
+# ───── CLI ───── #
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay a recorded traffic trace against the app")
+    parser.add_argument("trace", nargs="?", help="JSONL trace (default: latest in runtime/traces/)")
+    parser.add_argument("--speed", type=float, default=1.0, help="Time compression factor")
+    parser.add_argument("--scale", type=float, default=1.0, help="Traffic multiplier")
+    parser.add_argument("--url", help="Replay against a running app with its real models instead of stubs")
+    parser.add_argument("--concurrency", type=int, help="Scheduler workers per task for the local app")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    trace = args.trace or next(reversed(list(iter_trace_files())), None)
+    if trace is None:
+        parser.error("No trace given and none recorded yet (run the app with TRACE_RECORD=true)")
+    result = run_loadtest(trace, args.speed, args.scale, args.url, args.concurrency, args.seed)
+    print(json.dumps(result["summary"], indent=2))
@@ -0,0 +1,30 @@
+"""
+prompt.py
+LLM prompt optimizer shared by the Gradio templates and the headless API.
+Rewrites a raw user prompt + UI metadata into a generation-ready prompt
+using the registry's text_to_text model (through the fair scheduler).
+"""
+
+import logging
+from typing import Optional
+
+from apps.text_to_image.model.prompt_template import build_prompt_instruction
+from model.scheduler import scheduler
+
+logger = logging.getLogger("prompt-optimizer")
+
+GENERATION_PARAMS = {"max_new_tokens": 150, "do_sample": True, "temperature": 0.7}
+
+
+def optimize_prompt(user_prompt: str, metadata: Optional[dict] = None,
+                    tenant: str = "anonymous", priority: Optional[str] = None) -> str:
+    """
+    Returns the optimized prompt, or the raw prompt if the LLM call fails.
+    """
+    instruction = build_prompt_instruction(user_prompt, metadata or {})
+    try:
+        result = scheduler.run("text_to_text", instruction, tenant=tenant, priority=priority, **GENERATION_PARAMS)
+        return result[0]["generated_text"].split("Optimized Prompt:")[-1].strip()
+    except Exception as e:
+        logger.error(f"Prompt transformation failed: {e}")
+        return user_prompt  # fallback
@@ -11,6 +11,7 @@ from __future__ import annotations
 from dataclasses import dataclass, asdict
 from pathlib import Path
 from typing import Dict, List, Optional
+import json
 import os
 import logging
 
@@ -31,22 +32,26 @@ except Exception:
 class ModelSpec:
     """Declarative description of a model."""
     name: str                 # Human-friendly name / key
-    task: str                 # e.g. "text_to_text", "text_to_image", "text_to_video"
-    source: str               # "huggingface" | "api" | "local"
+    task: str                 # e.g. "text_to_text", "text_to_image", "text_to_video" (DRAFT_TASK: drafts only)
+    source: str               # "huggingface" | "api" | "local" | "worker"
     pipeline: str             # HF pipeline task or symbolic tag (e.g. "text-generation", "text-to-image", "custom")
     # One of the following should be provided depending on source:
-    hf_id: Optional[str] = None     # huggingface repo id
-    path: Optional[str] = None      # local path for "local"
+    hf_id: Optional[str] = None     # huggingface repo id (also for "worker": what workers load)
+    path: Optional[str] = None      # local path for "local" (or "worker")
     endpoint: Optional[str] = None  # API base/endpoint for "api"
     auth_env: Optional[str] = None  # env var that stores API key/token
     enabled: bool = True
     tags: Optional[List[str]] = None
+    job_api: bool = False           # API is submit-then-poll (see model/jobs.py)
+    backend: str = "eager"          # "eager" | "onnx" | "compile" for huggingface/local (see model/compiled.py)
+    draft_model: Optional[str] = None  # registry name of a small draft for assisted decoding (see model/assisted.py)
 
     def to_loader_config(self) -> Dict:
         """
         Transform to the dict shape expected by loader.py
         """
         return {
+            "key": self.name,
             "source": self.source,
             "pipeline": self.pipeline,
             "name": self.hf_id or self.name,
@@ -56,15 +61,30 @@ class ModelSpec:
             "enabled": self.enabled,
             "task": self.task,
             "tags": self.tags or [],
+            "job_api": self.job_api,
+            "tuning": MODEL_TUNING.get(self.name),
+            "backend": self.backend,
+            "draft": _draft_config(self.draft_model),
         }
 
 
+def _draft_config(name: Optional[str]) -> Optional[Dict]:
+    spec = MODEL_REGISTRY.get(name) if name else None
+    if not spec or not spec.enabled:
+        return None
+    return spec.to_loader_config()
+
+
 # ──────────────────────────────────────────────────────────────
 # Registry (populate with safe defaults; extend as needed)
 # ──────────────────────────────────────────────────────────────
 
 MODEL_REGISTRY: Dict[str, ModelSpec] = {}
 
+# Task of draft models for assisted decoding: no endpoint serves it, so drafts
+# never show up in listings or become a task's fallback default.
+DRAFT_TASK = "draft"
+
 def register_model(spec: ModelSpec) -> None:
     if spec.name in MODEL_REGISTRY:
         logger.warning(f"Overriding existing model spec: {spec.name}")
@@ -82,7 +102,8 @@ register_model(ModelSpec(
     source="huggingface",
     pipeline="text-generation",
     hf_id="mistralai/Mistral-7B-Instruct-v0.2",
-    tags=["llm", "instruct"]
+    tags=["llm", "instruct"],
+    draft_model=os.getenv("MISTRAL_DRAFT_MODEL", "tinyllama-draft")
 ))
 
 register_model(ModelSpec(
@@ -91,7 +112,27 @@ register_model(ModelSpec(
     source="huggingface",
     pipeline="text-generation",
     hf_id="meta-llama/Meta-Llama-3-8B-Instruct",
-    tags=["llm", "instruct"]
+    tags=["llm", "instruct"],
+    draft_model="llama3.2-1b-draft"
+))
+
+# Draft models for assisted decoding (small, fast; paired via draft_model above)
+register_model(ModelSpec(
+    name="tinyllama-draft",
+    task=DRAFT_TASK,
+    source="huggingface",
+    pipeline="text-generation",
+    hf_id="TinyLlama/TinyLlama-1.1B-Chat-v1.0",
+    tags=["llm", "draft"]
+))
+
+register_model(ModelSpec(
+    name="llama3.2-1b-draft",
+    task=DRAFT_TASK,
+    source="huggingface",
+    pipeline="text-generation",
+    hf_id="meta-llama/Llama-3.2-1B-Instruct",
+    tags=["llm", "draft"]
 ))
 
 # Text → Image (API placeholder; wire to your preferred provider)
@@ -105,12 +146,12 @@ register_model(ModelSpec(
     tags=["sd", "image-gen", "api"]
 ))
 
-# (Optional) Text → Image via HF Diffusers backend name placeholder (requires diffusers-based loader)
+# (Optional) Text → Image via HF Diffusers (built by model/diffusion.py)
 register_model(ModelSpec(
     name="sdxl-hf",
     task="text_to_image",
     source="huggingface",
-    pipeline="text-to-image",  # your loader should branch to diffusers for this
+    pipeline="text-to-image",  # loader branches to diffusers (model/diffusion.py)
     hf_id="stabilityai/stable-diffusion-xl-base-1.0",
     tags=["sdxl", "diffusers"]
 ))
@@ -123,7 +164,8 @@ register_model(ModelSpec(
     pipeline="text-to-video",
     endpoint=os.getenv("RUNWAY_API_URL", "https://api.runwayml.com/v1/generate"),
     auth_env="RUNWAY_API_KEY",
-    tags=["video-gen", "api"]
+    tags=["video-gen", "api"],
+    job_api=True
 ))
 
 # Alternative T2V API (example)
@@ -134,7 +176,48 @@ register_model(ModelSpec(
     pipeline="text-to-video",
     endpoint=os.getenv("PIKA_API_URL", "https://api.pika.art/v1/generate"),
     auth_env="PIKA_API_KEY",
-    tags=["video-gen", "api"]
+    tags=["video-gen", "api"],
+    job_api=True
+))
+
+# Audio → Text (Hugging Face; long uploads are chunked by model/audio.py)
+register_model(ModelSpec(
+    name="whisper-small",
+    task="audio_to_text",
+    source="huggingface",
+    pipeline="automatic-speech-recognition",
+    hf_id="openai/whisper-small",
+    tags=["asr", "whisper"]
+))
+
+# Image → Text (Hugging Face; also captions video keyframes for video_to_text, see model/video.py)
+register_model(ModelSpec(
+    name="blip-captioning-base",
+    task="image_to_text",
+    source="huggingface",
+    pipeline="image-to-text",
+    hf_id="Salesforce/blip-image-captioning-base",
+    tags=["caption", "vision"]
+))
+
+# Image → Image (Hugging Face super-resolution; large inputs are tiled by model/tiling.py)
+register_model(ModelSpec(
+    name="swin2sr-x2",
+    task="image_to_image",
+    source="huggingface",
+    pipeline="image-to-image",
+    hf_id="caidas/swin2SR-classical-sr-x2-64",
+    tags=["upscale", "vision"]
+))
+
+# Text → Audio (Hugging Face TTS; long text is streamed sentence by sentence by model/speech.py)
+register_model(ModelSpec(
+    name="mms-tts-eng",
+    task="text_to_audio",
+    source="huggingface",
+    pipeline="text-to-speech",
+    hf_id="facebook/mms-tts-eng",
+    tags=["tts", "speech"]
 ))
 
 # Local example (if you have a local fine-tuned model)
@@ -161,10 +244,65 @@ TASK_DEFAULTS: Dict[str, str] = {
     "text_to_text": os.getenv("DEFAULT_T2T_MODEL", "mistral-7b-instruct"),
     "text_to_image": os.getenv("DEFAULT_T2I_MODEL", "stability-sd-api"),
     "text_to_video": os.getenv("DEFAULT_T2V_MODEL", "runway-gen3-api"),
+    "audio_to_text": os.getenv("DEFAULT_A2T_MODEL", "whisper-small"),
+    "image_to_text": os.getenv("DEFAULT_I2T_MODEL", "blip-captioning-base"),
+    "image_to_image": os.getenv("DEFAULT_I2I_MODEL", "swin2sr-x2"),
+    "text_to_audio": os.getenv("DEFAULT_T2A_MODEL", "mms-tts-eng"),
     # Add other tasks here as you enable them
 }
 
 
+# ──────────────────────────────────────────────────────────────
+# File overrides (JSON, picked up by hot reload in model/reloader.py)
+#   { "models": [ {ModelSpec fields...} ], "defaults": { task: model_name } }
+# ──────────────────────────────────────────────────────────────
+
+MODEL_OVERRIDES_FILE = Path(os.getenv(
+    "MODEL_OVERRIDES_FILE", Path(__file__).resolve().parent.parent / "config" / "models.json"
+))
+
+def _apply_overrides(path: Path) -> None:
+    if not path.exists():
+        return
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            overrides = json.load(f)
+        for fields in overrides.get("models", []):
+            register_model(ModelSpec(**fields))
+        TASK_DEFAULTS.update(overrides.get("defaults", {}))
+        logger.info(f"Applied model overrides from {path}")
+    except Exception as e:
+        logger.error(f"Failed to apply model overrides from {path}: {e}")
+
+_apply_overrides(MODEL_OVERRIDES_FILE)
+
+
+# ──────────────────────────────────────────────────────────────
+# Tuned runtime settings per model (written by model/tuner.py)
+#   { model_name: { intra_op_threads, inter_op_threads, concurrency, batch_size, ... } }
+# ──────────────────────────────────────────────────────────────
+
+MODEL_TUNING_FILE = Path(os.getenv(
+    "MODEL_TUNING_FILE", Path(__file__).resolve().parent.parent / "config" / "tuning.json"
+))
+MODEL_TUNING: Dict[str, Dict] = {}
+if MODEL_TUNING_FILE.exists():
+    try:
+        with open(MODEL_TUNING_FILE, "r", encoding="utf-8") as f:
+            MODEL_TUNING.update(json.load(f))
+    except Exception as e:
+        logger.error(f"Failed to read tuning file {MODEL_TUNING_FILE}: {e}")
+
+def save_tuning(name: str, tuning: Dict) -> None:
+    if name not in MODEL_REGISTRY:
+        raise ValueError(f"Model '{name}' not found in registry.")
+    MODEL_TUNING[name] = tuning
+    MODEL_TUNING_FILE.parent.mkdir(parents=True, exist_ok=True)
+    with open(MODEL_TUNING_FILE, "w", encoding="utf-8") as f:
+        json.dump(MODEL_TUNING, f, indent=4)
+    logger.info(f"Saved tuning for '{name}': {tuning}")
+
+
 # ──────────────────────────────────────────────────────────────
 # Public helpers
 # ──────────────────────────────────────────────────────────────
@@ -173,6 +311,8 @@ def list_models(task: Optional[str] = None, source: Optional[str] = None, enable
     specs = list(MODEL_REGISTRY.values())
     if task:
         specs = [s for s in specs if s.task == task]
+    else:
+        specs = [s for s in specs if s.task != DRAFT_TASK]
     if source:
         specs = [s for s in specs if s.source == source]
     if enabled is not None:
@@ -182,6 +322,19 @@ def list_models(task: Optional[str] = None, source: Optional[str] = None, enable
 def get_model_spec(name: str) -> Optional[ModelSpec]:
     return MODEL_REGISTRY.get(name)
 
+def worker_load_config(name: str) -> Dict:
+    """
+    Loader config a worker process uses to load a "worker"-sourced model
+    itself: local if the spec has a path, otherwise Hugging Face.
+    """
+    spec = MODEL_REGISTRY.get(name)
+    if not spec:
+        raise ValueError(f"Model '{name}' not found in registry.")
+    cfg = spec.to_loader_config()
+    if spec.source == "worker":
+        cfg["source"] = "local" if spec.path else "huggingface"
+    return cfg
+
 def get_default_spec(task: str) -> Optional[ModelSpec]:
     name = TASK_DEFAULTS.get(task)
     spec = MODEL_REGISTRY.get(name)
@@ -205,7 +358,7 @@ def build_model_config() -> Dict[str, Dict]:
       MODEL_CONFIG[task] -> { source, pipeline, name, path, endpoint, auth_env, ... }
     """
     config: Dict[str, Dict] = {}
-    tasks = {spec.task for spec in MODEL_REGISTRY.values()}
+    tasks = {spec.task for spec in MODEL_REGISTRY.values()} - {DRAFT_TASK}
     for task in tasks:
         spec = get_default_spec(task)
         if spec and spec.enabled:
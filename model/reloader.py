@@ -0,0 +1,171 @@
+"""
+reloader.py
+Hot reload of the model registry and AppConfig without interrupting serving.
+
+A reload (file watch or admin call):
+1. Re-executes config/settings.py and copies the new values onto the live
+   AppConfig class, so every `from config.settings import AppConfig` sees them.
+2. Re-executes model/registry.py (plus config/models.json overrides) and diffs
+   the new MODEL_CONFIG against the live one.
+3. Loads new/changed models for already-loaded tasks in the background,
+   leaving the old ones serving.
+4. Swaps them in atomically once all are ready, then restarts the
+   scheduler's worker pools so tuned/configured concurrency applies, and
+   drains in-flight requests on retired models before unloading them.
+The Text-To-Image app's settings (apps/text_to_image/config/settings.py) are
+watched too and, when that app is loaded in this process, applied in place
+through its reload_settings().
+Unchanged models stay resident; tasks that were never loaded simply pick up
+the new config lazily.
+"""
+
+import gc
+import importlib
+import logging
+import os
+import sys
+import threading
+import time
+from typing import Dict, List
+
+import config.settings as settings
+import model.registry as registry
+from config.settings import AppConfig
+from model.loader import model_loader
+from model.scheduler import scheduler
+
+logger = logging.getLogger("config-reloader")
+
+APP_SETTINGS_MODULE = "apps.text_to_image.config.settings"
+APP_SETTINGS_FILE = settings.BASE_DIR / "apps" / "text_to_image" / "config" / "settings.py"
+
+
+def _settings_snapshot(cls) -> Dict:
+    return {k: v for k, v in vars(cls).items() if k.isupper()}
+
+
+def diff_configs(old: Dict[str, Dict], new: Dict[str, Dict]) -> Dict[str, List[str]]:
+    """Task-level diff of two MODEL_CONFIG dicts."""
+    return {
+        "added": sorted(set(new) - set(old)),
+        "removed": sorted(set(old) - set(new)),
+        "changed": sorted(t for t in set(old) & set(new) if old[t] != new[t]),
+        "unchanged": sorted(t for t in set(old) & set(new) if old[t] == new[t]),
+    }
+
+
+class ConfigReloader:
+    def __init__(self, loader=model_loader):
+        self.loader = loader
+        self._reload_lock = threading.Lock()
+        self._watch_thread = None
+        self._mtimes = self._current_mtimes()
+        self.last_result: Dict = {}
+
+    # ───── Triggers ───── #
+    def watched_files(self) -> List[str]:
+        return [settings.__file__, registry.__file__, str(registry.MODEL_OVERRIDES_FILE), str(APP_SETTINGS_FILE)]
+
+    def start_watching(self):
+        """Poll watched files and reload whenever one of them changes."""
+        if self._watch_thread is not None:
+            return
+        self._watch_thread = threading.Thread(target=self._watch_loop, name="config-watch", daemon=True)
+        self._watch_thread.start()
+        logger.info(f"👀 Watching {self.watched_files()} for changes")
+
+    def _current_mtimes(self) -> Dict[str, float]:
+        return {p: os.path.getmtime(p) if os.path.exists(p) else 0.0 for p in self.watched_files()}
+
+    def _watch_loop(self):
+        while True:
+            time.sleep(AppConfig.RELOAD_POLL_INTERVAL)
+            mtimes = self._current_mtimes()
+            if mtimes != self._mtimes:
+                self._mtimes = mtimes
+                try:
+                    self.reload()
+                except Exception as e:
+                    logger.error(f"[x] Hot reload failed, keeping live config: {e}")
+
+    # ───── Reload ───── #
+    def reload(self, wait: bool = False) -> Dict:
+        """
+        Reload settings and registry. Model loading happens in the background
+        unless `wait` is True. Returns the settings/model diff.
+        """
+        with self._reload_lock:
+            old_settings = _settings_snapshot(AppConfig)
+            old_models = dict(registry.MODEL_CONFIG)
+
+            # Settings: re-execute, then copy onto the live class to keep its identity
+            live_cls = AppConfig
+            importlib.reload(settings)
+            new_settings = _settings_snapshot(settings.AppConfig)
+            for key, value in new_settings.items():
+                setattr(live_cls, key, value)
+            settings.AppConfig = live_cls
+
+            registry_module = importlib.reload(registry)
+            new_models = dict(registry_module.MODEL_CONFIG)
+
+            # Text-To-Image settings: only if that app is loaded in this process
+            app_settings = sys.modules.get(APP_SETTINGS_MODULE)
+            app_changed = app_settings.reload_settings() if app_settings is not None else []
+
+        diff = diff_configs(old_models, new_models)
+        diff["settings_changed"] = sorted(k for k in new_settings if old_settings.get(k) != new_settings[k])
+        diff["app_settings_changed"] = app_changed
+        logger.info(f"🔁 Reload diff: {diff}")
+
+        loaded = set(self.loader.models)
+        to_load = {t: new_models[t] for t in diff["changed"] if t in loaded}
+        to_remove = [t for t in diff["removed"] if t in loaded]
+
+        restart = bool(diff["settings_changed"] or diff["changed"] or diff["added"] or diff["removed"])
+        worker = threading.Thread(target=self._switch_over, args=(to_load, to_remove, restart),
+                                  name="config-reload", daemon=True)
+        worker.start()
+        if wait:
+            worker.join()
+        self.last_result = diff
+        return diff
+
+    def _switch_over(self, to_load: Dict[str, Dict], to_remove: List[str], restart: bool = False):
+        updates = {}
+        for task, cfg in to_load.items():
+            try:
+                updates[task] = (self.loader.build(cfg, task), cfg)
+                logger.info(f"[✓] Preloaded new model for {task}: {cfg.get('key')}")
+            except Exception as e:
+                # Keep serving the old model rather than switching to nothing
+                logger.error(f"[x] Failed to load new model for {task}, keeping old one: {e}")
+
+        retired = self.loader.swap(updates, removed=to_remove)
+        if updates or to_remove:
+            logger.info(f"🔀 Switched over {list(updates)}; removed {to_remove}")
+        if restart:
+            scheduler.restart_workers()  # after the swap: new workers only ever see the new models
+        self._drain(retired)
+
+    def _drain(self, retired: list):
+        deadline = time.time() + AppConfig.RELOAD_DRAIN_TIMEOUT
+        for model in retired:
+            while self.loader.inflight(model) and time.time() < deadline:
+                time.sleep(0.5)
+            if self.loader.inflight(model):
+                logger.warning("⚠️ Drain timeout; retired model still has in-flight requests")
+        del retired[:]
+        gc.collect()
+        try:
+            import torch
+            if torch.cuda.is_available():
+                torch.cuda.empty_cache()
+        except ImportError:
+            pass
+
+
+# Singleton reloader (file watch is opt-in via RELOAD_WATCH)
+config_reloader = ConfigReloader()
+if AppConfig.RELOAD_WATCH:
+    config_reloader.start_watching()
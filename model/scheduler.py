@@ -0,0 +1,301 @@
+"""
+scheduler.py
+Fair-share request scheduler in front of the InferenceEngine.
+
+- One queue per task (each task has a single loaded model) with a small worker
+  pool: TASK_CONCURRENCY (or the tuned concurrency) for local models,
+  REMOTE_CONCURRENCY by default for API / worker-pool backends.
+- Priority classes: "interactive" requests always run before "batch" requests.
+- Within a class, tenants (Gradio sessions, users, API keys) share the model by
+  weighted fair queuing: each request gets a virtual finish tag
+  `max(vtime, tenant_last_tag) + cost / weight` and the smallest tag runs next.
+- Cancelled requests are dropped before they reach the model.
+- Per-tenant wait/latency percentiles and service share are exposed via `get_metrics()`;
+  tenants idle for TENANT_IDLE_SECONDS are forgotten (sessions come and go).
+- `scheduler.engine_for(tenant)` is a drop-in for `inference_engine` so handlers
+  that fan out over their own thread pools still queue fairly.
+"""
+
+import heapq
+import itertools
+import logging
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional
+
+import model.registry as registry
+from config.settings import AppConfig
+from model.inference import inference_engine
+from model.traces import trace_recorder
+
+logger = logging.getLogger("scheduler")
+
+REMOTE_SOURCES = ("api", "worker")
+
+
+# ──────────────────────────────────────────────────────────────
+# Data structures
+# ──────────────────────────────────────────────────────────────
+
+@dataclass
+class ScheduledRequest:
+    task: str
+    input_data: Any
+    kwargs: Dict
+    tenant: str
+    priority: str
+    start_tag: float
+    finish_tag: float
+    future: Future = field(default_factory=Future)
+    enqueued_at: float = field(default_factory=time.time)
+    method: str = "run_inference"    # engine method to call ("submit_job" for job APIs)
+
+
+@dataclass
+class TenantStats:
+    submitted: int = 0
+    completed: int = 0
+    failed: int = 0
+    cancelled: int = 0
+    service_time: float = 0.0
+    waits: deque = field(default_factory=lambda: deque(maxlen=AppConfig.METRICS_WINDOW))
+    latencies: deque = field(default_factory=lambda: deque(maxlen=AppConfig.METRICS_WINDOW))
+    last_seen: float = field(default_factory=time.time)
+
+
+def _percentile(samples, pct: float) -> Optional[float]:
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return round(ordered[index], 4)
+
+
+def tenant_from_request(request) -> str:
+    """Derive a tenant key from a `gr.Request` (username, else session hash)."""
+    if request is None:
+        return "anonymous"
+    return getattr(request, "username", None) or getattr(request, "session_hash", None) or "anonymous"
+
+
+class ScheduledEngine:
+    """`run_inference`-compatible view of the scheduler for one tenant (see FairScheduler.engine_for)."""
+
+    def __init__(self, scheduler: "FairScheduler", tenant: str, priority: Optional[str]):
+        self.scheduler = scheduler
+        self.tenant = tenant
+        self.priority = priority
+
+    def run_inference(self, task: str, input_data, **kwargs):
+        cost = len(input_data) if isinstance(input_data, list) else 1  # batches cost per item
+        return self.scheduler.run(task, input_data, tenant=self.tenant, priority=self.priority,
+                                  cost=max(cost, 1), **kwargs)
+
+
+# ──────────────────────────────────────────────────────────────
+# Scheduler
+# ──────────────────────────────────────────────────────────────
+
+class FairScheduler:
+    def __init__(self, engine=inference_engine):
+        self.engine = engine
+        self._cv = threading.Condition()
+        self._queues: Dict[str, list] = defaultdict(list)                        # task -> heap
+        self._vtime: Dict[str, float] = defaultdict(float)                       # task -> virtual time
+        self._tenant_tags: Dict[str, Dict[str, float]] = defaultdict(dict)       # task -> tenant -> last tag
+        self._workers: Dict[str, list] = {}
+        self._stats: Dict[str, TenantStats] = defaultdict(TenantStats)
+        self._seq = itertools.count()
+        self._generation = 0  # bumped by shutdown(); workers of older generations exit
+        self._last_prune = time.time()
+
+    # ───── Public API ───── #
+    def validate(self, task: str, priority: Optional[str] = None) -> str:
+        """Returns the effective priority; raises ValueError for an unknown task or priority class."""
+        if task not in registry.MODEL_CONFIG:
+            raise ValueError(f"Unknown task: {task}")
+        priority = priority or AppConfig.DEFAULT_PRIORITY
+        if priority not in AppConfig.PRIORITY_CLASSES:
+            raise ValueError(f"Unknown priority class: {priority}")
+        return priority
+
+    def submit(self, task: str, input_data, tenant: str = "anonymous",
+               priority: Optional[str] = None, cost: float = 1.0, **kwargs) -> Future:
+        """
+        Enqueue a request and return a Future for its result.
+        `future.cancel()` drops the request if it has not reached the model yet.
+        """
+        # The engine gets the tenant too: remote workers route on it (see model/workers.py)
+        return self._enqueue(task, input_data, tenant, priority, cost, "run_inference", dict(kwargs, tenant=tenant))
+
+    def submit_job(self, task: str, input_data, tenant: str = "anonymous",
+                   priority: Optional[str] = None, **kwargs) -> Future:
+        """
+        Queue the submission of a submit-then-poll job (see model/jobs.py) in
+        the tenant's fair share. The Future resolves to the job id; polling
+        happens on the job manager and holds no scheduler worker.
+        """
+        return self._enqueue(task, input_data, tenant, priority, 1.0, "submit_job", kwargs)
+
+    def _enqueue(self, task: str, input_data, tenant: str, priority: Optional[str], cost: float,
+                 method: str, kwargs: Dict) -> Future:
+        priority = self.validate(task, priority)
+        weight = AppConfig.TENANT_WEIGHTS.get(tenant, AppConfig.TENANT_WEIGHTS.get("default", 1.0))
+        with self._cv:
+            start = max(self._vtime[task], self._tenant_tags[task].get(tenant, 0.0))
+            finish = start + cost / max(weight, 1e-6)
+            self._tenant_tags[task][tenant] = finish
+
+            request = ScheduledRequest(task, input_data, kwargs, tenant, priority, start, finish, method=method)
+            rank = AppConfig.PRIORITY_CLASSES[priority]
+            heapq.heappush(self._queues[task], (rank, finish, next(self._seq), request))
+            stats = self._stats[tenant]
+            stats.submitted += 1
+            stats.last_seen = time.time()
+            self._ensure_workers(task)
+            self._prune()
+            self._cv.notify_all()
+        return request.future
+
+    def run(self, task: str, input_data, tenant: str = "anonymous",
+            priority: Optional[str] = None, **kwargs):
+        """Blocking convenience wrapper around `submit`."""
+        return self.submit(task, input_data, tenant=tenant, priority=priority, **kwargs).result()
+
+    def engine_for(self, tenant: str = "anonymous", priority: Optional[str] = None) -> ScheduledEngine:
+        """Drop-in for `inference_engine` whose calls are queued under `tenant`."""
+        return ScheduledEngine(self, tenant, priority)
+
+    def queue_depth(self, task: Optional[str] = None) -> int:
+        """Queued requests that can still run (cancelled ones are not counted)."""
+        with self._cv:
+            heaps = [self._queues.get(task, [])] if task else list(self._queues.values())
+            return sum(1 for heap in heaps for *_, request in heap if not request.future.cancelled())
+
+    def get_metrics(self) -> Dict[str, Dict]:
+        """Per-tenant counters, wait/latency percentiles and share of model time."""
+        with self._cv:
+            total = sum(s.service_time for s in self._stats.values()) or 1.0
+            queued = defaultdict(int)
+            for heap in self._queues.values():
+                for *_, request in heap:
+                    if not request.future.cancelled():
+                        queued[request.tenant] += 1
+            return {
+                tenant: {
+                    "submitted": s.submitted,
+                    "completed": s.completed,
+                    "failed": s.failed,
+                    "cancelled": s.cancelled,
+                    "queued": queued[tenant],
+                    "wait_p50": _percentile(s.waits, 50),
+                    "wait_p95": _percentile(s.waits, 95),
+                    "latency_p50": _percentile(s.latencies, 50),
+                    "latency_p95": _percentile(s.latencies, 95),
+                    "share": round(s.service_time / total, 4),
+                }
+                for tenant, s in self._stats.items()
+            }
+
+    def shutdown(self):
+        """Stops the workers after their current request; a later submit starts fresh ones."""
+        with self._cv:
+            self._generation += 1
+            self._workers.clear()
+            self._cv.notify_all()
+
+    def restart_workers(self):
+        """
+        Replaces every task's workers with a pool sized from the current config
+        (after a hot reload). Queued requests stay queued; old workers exit
+        after their current request.
+        """
+        with self._cv:
+            tasks = list(self._workers)
+            self._generation += 1
+            self._workers.clear()
+            for task in tasks:
+                self._ensure_workers(task)
+            self._cv.notify_all()
+
+    # ───── Internals ───── #
+    def _ensure_workers(self, task: str):
+        if task in self._workers:
+            return
+        cfg = registry.MODEL_CONFIG.get(task) or {}
+        tuning = cfg.get("tuning") or {}
+        # Remote backends hold a worker only while waiting on the network: don't serialize them
+        default = (AppConfig.REMOTE_CONCURRENCY if cfg.get("source") in REMOTE_SOURCES
+                   else AppConfig.TASK_CONCURRENCY.get("default", 1))
+        count = tuning.get("concurrency") or AppConfig.TASK_CONCURRENCY.get(task, default)
+        self._workers[task] = []
+        for i in range(count):
+            worker = threading.Thread(target=self._worker_loop, args=(task, self._generation),
+                                      name=f"sched-{task}-{i}", daemon=True)
+            worker.start()
+            self._workers[task].append(worker)
+
+    def _prune(self):
+        """Forgets idle tenants (caller holds the lock); runs at most once a minute."""
+        now = time.time()
+        if now - self._last_prune < 60:
+            return
+        self._last_prune = now
+        queued = {request.tenant for heap in self._queues.values() for *_, request in heap}
+        cutoff = now - AppConfig.TENANT_IDLE_SECONDS
+        idle = {t for t, s in self._stats.items() if s.last_seen < cutoff and t not in queued}
+        for tenant in idle:
+            del self._stats[tenant]
+        for task, tags in self._tenant_tags.items():
+            # A tag at or behind virtual time has no effect on the tenant's next request anyway
+            for tenant in [t for t, tag in tags.items() if t in idle or tag <= self._vtime[task]]:
+                del tags[tenant]
+
+    def _next_request(self, task: str, generation: int) -> Optional[ScheduledRequest]:
+        with self._cv:
+            while generation == self._generation:
+                heap = self._queues[task]
+                while heap:
+                    *_, request = heapq.heappop(heap)
+                    # Drop cancelled requests before they reach the model
+                    if not request.future.set_running_or_notify_cancel():
+                        self._stats[request.tenant].cancelled += 1
+                        continue
+                    self._vtime[task] = max(self._vtime[task], request.start_tag)
+                    return request
+                self._cv.wait()
+            return None
+
+    def _worker_loop(self, task: str, generation: int):
+        while True:
+            request = self._next_request(task, generation)
+            if request is None:
+                return
+
+            started = time.time()
+            try:
+                with trace_recorder.arrived(request.enqueued_at):
+                    result = getattr(self.engine, request.method)(task, request.input_data, **request.kwargs)
+            except Exception as e:
+                logger.error(f"[x] {task} request for tenant '{request.tenant}' failed: {e}")
+                request.future.set_exception(e)
+                outcome = "failed"
+            else:
+                request.future.set_result(result)
+                outcome = "completed"
+
+            finished = time.time()
+            with self._cv:
+                stats = self._stats[request.tenant]
+                stats.last_seen = finished
+                setattr(stats, outcome, getattr(stats, outcome) + 1)
+                stats.service_time += finished - started
+                stats.waits.append(started - request.enqueued_at)
+                stats.latencies.append(finished - request.enqueued_at)
+
+
+# Singleton scheduler instance
+scheduler = FairScheduler()
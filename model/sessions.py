@@ -0,0 +1,321 @@
+"""
+sessions.py
+Per-session KV-cache reuse for multi-turn text_to_text conversations.
+
+A request carrying `session_id` (e.g. `params: {"session_id": ...}`) is
+generated with the session's past key/values from its previous turn. The
+prompt is still the whole conversation (clients stay stateless); it is
+tokenized and compared with the tokens behind the cached keys/values, and
+only the part after their longest common prefix is prefilled. Usually that
+is just the new turn.
+
+- Total KV memory across sessions is bounded by KV_CACHE_MAX_MB; least
+  recently used sessions are evicted first. Sessions idle for more than
+  KV_IDLE_SECONDS are evicted by a background sweep (and on every put).
+- With KV_SPILL=true evicted sessions are written to KV_SPILL_DIR (itself
+  bounded by KV_SPILL_MAX_MB) and loaded back on their next turn.
+- A session that was evicted, or whose prompt no longer matches (edited
+  history, another model after a hot reload), simply gets a full prefill.
+
+A session is checked out for the duration of a turn, so two concurrent
+requests on one session never share a cache: the second one re-prefills.
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from config.settings import AppConfig
+from utils.helpers import hash_string
+
+logger = logging.getLogger("kv-sessions")
+
+
+@dataclass
+class KVSession:
+    model_key: str
+    ids: List[int]                      # tokens whose keys/values are cached
+    layers: List[Tuple[object, object]]  # per layer (keys, values), [batch, heads, seq, dim]
+    nbytes: int = 0
+    last_used: float = field(default_factory=time.time)
+
+
+# ──────────────────────────────────────────────────────────────
+# Cache tensors (transformers Cache objects <-> plain per-layer tensors)
+# ──────────────────────────────────────────────────────────────
+
+def _layers(cache) -> List[Tuple[object, object]]:
+    if hasattr(cache, "layers"):  # transformers >= 4.56
+        return [(layer.keys, layer.values) for layer in cache.layers]
+    if hasattr(cache, "key_cache"):
+        return list(zip(cache.key_cache, cache.value_cache))
+    return [(layer[0], layer[1]) for layer in cache]  # legacy tuples
+
+
+def _build_cache(layers: List[Tuple[object, object]]):
+    from transformers import DynamicCache
+
+    cache = DynamicCache()
+    for index, (keys, values) in enumerate(layers):
+        cache.update(keys, values, index)
+    return cache
+
+
+def _nbytes(layers) -> int:
+    return sum(k.numel() * k.element_size() + v.numel() * v.element_size() for k, v in layers)
+
+
+def _common_prefix(a: List[int], b: List[int]) -> int:
+    n = 0
+    for x, y in zip(a, b):
+        if x != y:
+            break
+        n += 1
+    return n
+
+
+# ──────────────────────────────────────────────────────────────
+# Session store
+# ──────────────────────────────────────────────────────────────
+
+class SessionKVCache:
+    def __init__(self, max_mb: float = AppConfig.KV_CACHE_MAX_MB, idle_seconds: float = AppConfig.KV_IDLE_SECONDS,
+                 spill: bool = AppConfig.KV_SPILL, spill_dir=AppConfig.KV_SPILL_DIR,
+                 spill_max_mb: float = AppConfig.KV_SPILL_MAX_MB):
+        self.max_bytes = int(max_mb * 2**20)
+        self.idle_seconds = idle_seconds
+        self.spill = spill
+        self.spill_dir = spill_dir
+        self.spill_max_bytes = int(spill_max_mb * 2**20)
+        self._sessions: "OrderedDict[str, KVSession]" = OrderedDict()
+        self._spilled: "OrderedDict[str, Tuple[str, int]]" = OrderedDict()  # session -> (path, bytes)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._sweeper: Optional[threading.Thread] = None
+        self._stats = {"turns": 0, "reused_tokens": 0, "prefilled_tokens": 0,
+                       "evictions": 0, "spills": 0, "restores": 0}
+
+    # ── checkout / checkin ──
+
+    def take(self, session_id: str, model_key: str) -> Optional[KVSession]:
+        """Removes and returns the session's cache (from memory or disk), or None."""
+        with self._lock:
+            session = self._sessions.pop(session_id, None)
+            if session is not None:
+                self._bytes -= session.nbytes
+            spilled = self._spilled.pop(session_id, None) if session is None else None
+        if spilled is not None:
+            session = self._load(spilled[0])
+        if session is not None and session.model_key != model_key:
+            return None
+        return session
+
+    def put(self, session_id: str, session: KVSession):
+        session.nbytes = _nbytes(session.layers)
+        if session.nbytes > self.max_bytes:
+            self._evict([(session_id, session)])
+            return
+        session.last_used = time.time()
+        with self._lock:
+            self._sessions[session_id] = session
+            self._bytes += session.nbytes
+            victims = []
+            while self._bytes > self.max_bytes:
+                victim_id, victim = self._sessions.popitem(last=False)
+                self._bytes -= victim.nbytes
+                victims.append((victim_id, victim))
+            victims += self._pop_idle()
+        self._evict(victims)  # disk writes happen outside the lock
+        self._ensure_sweeper()
+
+    def drop(self, session_id: str):
+        """Forgets a session (e.g. when its conversation is deleted)."""
+        with self._lock:
+            session = self._sessions.pop(session_id, None)
+            if session is not None:
+                self._bytes -= session.nbytes
+            spilled = self._spilled.pop(session_id, None)
+        if spilled is not None:
+            self._remove(spilled[0])
+
+    # ── eviction / spill ──
+
+    def sweep(self) -> int:
+        """Evicts sessions idle for more than `idle_seconds`; returns how many."""
+        with self._lock:
+            victims = self._pop_idle()
+        self._evict(victims)
+        return len(victims)
+
+    def _pop_idle(self) -> List[Tuple[str, KVSession]]:
+        """Removes idle sessions, oldest first (caller holds the lock)."""
+        cutoff = time.time() - self.idle_seconds
+        victims = []
+        while self._sessions:
+            oldest_id, oldest = next(iter(self._sessions.items()))
+            if oldest.last_used >= cutoff:
+                break
+            self._sessions.popitem(last=False)
+            self._bytes -= oldest.nbytes
+            victims.append((oldest_id, oldest))
+        return victims
+
+    def _ensure_sweeper(self):
+        with self._lock:
+            if self._sweeper is not None:
+                return
+            self._sweeper = threading.Thread(target=self._sweep_loop, name="kv-sweep", daemon=True)
+        self._sweeper.start()
+
+    def _sweep_loop(self):
+        # Without this, an idle server would hold its last sessions' memory indefinitely
+        while True:
+            time.sleep(max(1.0, min(60.0, self.idle_seconds / 2)))
+            try:
+                self.sweep()
+            except Exception as e:
+                logger.warning(f"⚠️ KV session sweep failed: {e}")
+
+    def _evict(self, victims: List[Tuple[str, KVSession]]):
+        for session_id, session in victims:
+            self._count("evictions")
+            if not self.spill:
+                continue
+            try:
+                path, size = self._save(session_id, session)
+            except Exception as e:
+                logger.warning(f"⚠️ Could not spill KV cache of session {session_id}: {e}")
+                continue
+            self._count("spills")
+            with self._lock:
+                self._spilled[session_id] = (path, size)
+                stale = []
+                while sum(s for _, s in self._spilled.values()) > self.spill_max_bytes:
+                    stale.append(self._spilled.popitem(last=False)[1][0])
+            for stale_path in stale:
+                self._remove(stale_path)
+
+    def _save(self, session_id: str, session: KVSession) -> Tuple[str, int]:
+        import torch
+
+        os.makedirs(self.spill_dir, exist_ok=True)
+        path = os.path.join(self.spill_dir, f"{hash_string(session_id)[:32]}.pt")
+        torch.save({
+            "model_key": session.model_key,
+            "ids": session.ids,
+            "layers": [(k.cpu(), v.cpu()) for k, v in session.layers],
+        }, path)
+        return path, os.path.getsize(path)
+
+    def _load(self, path: str) -> Optional[KVSession]:
+        import torch
+
+        try:
+            data = torch.load(path, map_location="cpu", weights_only=True)
+        except Exception as e:
+            logger.warning(f"⚠️ Could not restore spilled KV cache {path}: {e}")
+            return None
+        finally:
+            self._remove(path)
+        self._count("restores")
+        return KVSession(data["model_key"], data["ids"], data["layers"])
+
+    @staticmethod
+    def _remove(path: str):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    # ── metrics ──
+
+    def _count(self, field_name: str, amount: int = 1):
+        with self._lock:
+            self._stats[field_name] += amount
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {**self._stats, "sessions": len(self._sessions), "spilled": len(self._spilled),
+                    "memory_mb": round(self._bytes / 2**20, 1)}
+
+    # ── generation ──
+
+    def generate(self, pipe, cfg: dict, session_id: str, prompt, **kwargs):
+        """
+        Runs a text-generation turn for `session_id`, prefilling only what the
+        session's cached keys/values do not cover. Returns pipeline-shaped
+        output: [{"generated_text": ...}].
+        """
+        pipe = getattr(pipe, "pipe", pipe)  # assisted generators: plain decoding keeps the cache simple
+        model, tokenizer = pipe.model, pipe.tokenizer
+        model_key = f"{cfg.get('key')}:{id(model)}"
+        return_full_text = kwargs.pop("return_full_text", True)
+        gen_kwargs = dict(kwargs)  # anything unset comes from the model's generation config
+        if tokenizer.pad_token_id is None:
+            gen_kwargs.setdefault("pad_token_id", tokenizer.eos_token_id)
+
+        if isinstance(prompt, str):
+            ids = tokenizer(prompt, return_tensors="pt")["input_ids"][0].tolist()
+        else:  # chat messages
+            encoded = tokenizer.apply_chat_template(prompt, add_generation_prompt=True, tokenize=True)
+            ids = list(encoded["input_ids"] if hasattr(encoded, "keys") else encoded)
+
+        session = self.take(session_id, model_key)
+        reused = 0
+        if session is not None:
+            # Keep at least one prompt token to feed the model
+            reused = min(_common_prefix(session.ids, ids), len(ids) - 1)
+        cache = None
+        if reused > 0:
+            layers = [(k[..., :reused, :], v[..., :reused, :]) for k, v in session.layers]
+            if all(k.shape[-2] == reused for k, _ in layers):  # full-attention layers only
+                cache = _build_cache([(k.to(model.device), v.to(model.device)) for k, v in layers])
+            else:
+                reused = 0
+        session = None  # release the old tensors before generating
+
+        import torch
+
+        input_ids = torch.tensor([ids], device=model.device)
+        output = model.generate(
+            input_ids=input_ids,
+            attention_mask=torch.ones_like(input_ids),
+            past_key_values=cache,
+            return_dict_in_generate=True,
+            **gen_kwargs,
+        )
+        sequence = output.sequences[0].tolist()
+        layers = _layers(output.past_key_values)
+        cached = layers[0][0].shape[-2] if layers else 0
+        if cached and all(k.shape[-2] == cached for k, _ in layers):
+            self.put(session_id, KVSession(model_key, sequence[:cached], layers))
+
+        with self._lock:
+            self._stats["turns"] += 1
+            self._stats["reused_tokens"] += reused
+            self._stats["prefilled_tokens"] += len(ids) - reused
+
+        completion = tokenizer.decode(sequence[len(ids):], skip_special_tokens=True)
+        if not isinstance(prompt, str):
+            text = list(prompt) + [{"role": "assistant", "content": completion}] if return_full_text else completion
+        else:
+            text = prompt + completion if return_full_text else completion
+        return [{"generated_text": text}]
+
+
+def supports_sessions(model, cfg: dict) -> bool:
+    """Local text-generation pipelines with a torch model (not ONNX/remote)."""
+    pipe = getattr(model, "pipe", model)
+    return (cfg.get("pipeline") == "text-generation"
+            and hasattr(getattr(pipe, "model", None), "generate")
+            and getattr(pipe, "tokenizer", None) is not None
+            and getattr(pipe, "framework", "pt") == "pt"
+            and hasattr(pipe.model, "named_parameters"))
+
+
+# Singleton session cache
+session_cache = SessionKVCache()
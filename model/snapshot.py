@@ -0,0 +1,366 @@
+"""
+snapshot.py
+Snapshotted fast cold start for Hugging Face / local pipelines.
+
+The first normal load of a model (hub resolution, tokenizer build, model
+instantiation, dtype conversion) is followed by a background save of the
+fully initialized weights to one safetensors file, plus config, generation
+config and preprocessors, under
+
+    model_assets/snapshots/<model>/<version>/
+
+where the version hashes model id, resolved hub revision (commit hash),
+pipeline, dtype and library versions, so neither a new upload of the model
+nor an upgrade of torch/transformers ever restores a stale snapshot.
+
+Later starts build the model skeleton on the meta device (no allocation, no
+random init) and assign the memory-mapped snapshot tensors straight into it:
+weights are paged in from the file on first use instead of being copied.
+Each restore is logged against the normal load time recorded in the
+manifest; `python -m model.snapshot <task> --benchmark` measures both paths
+in fresh processes.
+"""
+
+import argparse
+import functools
+import hashlib
+import json
+import logging
+import os
+import shutil
+import subprocess
+import sys
+import threading
+import time
+from importlib import metadata
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+from config.settings import BASE_DIR, AppConfig
+
+logger = logging.getLogger("model-snapshot")
+
+WEIGHTS_FILE = "weights.safetensors"
+MANIFEST_FILE = "snapshot.json"
+PREPROCESSORS = {  # pipeline attribute -> transformers Auto class
+    "tokenizer": "AutoTokenizer",
+    "image_processor": "AutoImageProcessor",
+    "feature_extractor": "AutoFeatureExtractor",
+}
+UNSUPPORTED_PIPELINES = {"text-to-image"}  # diffusers pipelines (see model/diffusion.py)
+
+# model key -> {"path": "snapshot" | "normal", "seconds": .., "normal_seconds": ..}
+LOAD_TIMINGS: Dict[str, Dict] = {}
+
+
+def _library_versions() -> dict:
+    versions = {}
+    for lib in ("torch", "transformers", "safetensors", "tokenizers"):
+        try:
+            versions[lib] = metadata.version(lib)
+        except metadata.PackageNotFoundError:
+            versions[lib] = None
+    return versions
+
+
+@functools.lru_cache(maxsize=None)
+def hub_revision(repo_id: str) -> Optional[str]:
+    """
+    Commit hash the hub currently serves for `repo_id`; offline, the one in the
+    local HF cache. None if neither is known (the snapshot is then keyed
+    without it). Resolved once per process.
+    """
+    try:
+        from huggingface_hub import HfApi
+        return HfApi().model_info(repo_id, timeout=5).sha
+    except Exception:
+        pass
+    try:
+        from huggingface_hub import try_to_load_from_cache
+        cached = try_to_load_from_cache(repo_id, "config.json")
+        return Path(cached).parent.name if isinstance(cached, str) else None  # .../snapshots/<sha>/config.json
+    except Exception:
+        return None
+
+
+@functools.lru_cache(maxsize=None)
+def _checkpoint_dtype(source: str):
+    """dtype recorded in the checkpoint's config.json (what torch_dtype="auto" loads), or None."""
+    try:
+        import transformers
+        config = transformers.AutoConfig.from_pretrained(source)
+        return getattr(config, "dtype", None) or getattr(config, "torch_dtype", None)
+    except Exception:
+        return None
+
+
+def resolved_dtype(cfg: dict) -> str:
+    """
+    dtype the build will load the weights in: cfg["torch_dtype"] if set
+    ("auto" being the checkpoint's own), else torch's default dtype.
+    """
+    import torch
+
+    dtype = cfg.get("torch_dtype")
+    if dtype == "auto":
+        dtype = _checkpoint_dtype(cfg.get("path") or cfg["name"])
+    if isinstance(dtype, str):
+        dtype = getattr(torch, dtype.replace("torch.", ""), None)
+    return str(dtype or torch.get_default_dtype())
+
+
+def snapshot_dir(cfg: dict, dtype=None) -> Path:
+    """
+    Snapshot folder keyed by model id and a version hash (source, revision,
+    pipeline, dtype, library versions). Saves pass the loaded model's dtype;
+    lookups use the dtype the build would resolve to, so a mismatch can only
+    miss a snapshot, never restore the wrong one.
+    """
+    fingerprint = json.dumps({
+        "model": cfg["name"],
+        "path": cfg.get("path"),
+        "revision": None if cfg.get("path") else hub_revision(cfg["name"]),
+        "pipeline": cfg["pipeline"],
+        "dtype": str(dtype) if dtype is not None else resolved_dtype(cfg),
+        "versions": _library_versions(),
+    }, sort_keys=True)
+    version = hashlib.sha256(fingerprint.encode()).hexdigest()[:12]
+    return AppConfig.SNAPSHOTS_DIR / cfg["key"] / version
+
+
+def _device():
+    import torch
+    return 0 if torch.cuda.is_available() else -1
+
+
+# ──────────────────────────────────────────────────────────────
+# Save
+# ──────────────────────────────────────────────────────────────
+
+def save_snapshot(cfg: dict, pipe, normal_seconds: Optional[float] = None) -> Path:
+    """
+    Writes `pipe`'s model and preprocessors to snapshot_dir(cfg). Tied weights
+    are stored once; non-persistent buffers (e.g. rotary tables) are stored
+    too, so the restored model needs no initialization at all.
+    """
+    from safetensors.torch import save_file
+
+    target = snapshot_dir(cfg, pipe.model.dtype)
+    staging = target.with_name(f"{target.name}.tmp-{os.getpid()}")
+    shutil.rmtree(staging, ignore_errors=True)
+    staging.mkdir(parents=True)
+
+    model = pipe.model
+    tensors, aliases, kinds, seen = {}, {}, {}, {}
+    named = [(n, t, "parameter") for n, t in model.named_parameters(remove_duplicate=False)]
+    named += [(n, t, "buffer") for n, t in model.named_buffers(remove_duplicate=False)]
+    for name, tensor, kind in named:
+        if tensor is None:
+            continue
+        if id(tensor) in seen:
+            aliases[name] = seen[id(tensor)]
+            continue
+        seen[id(tensor)] = name
+        tensors[name] = tensor.detach().to("cpu").contiguous()
+        kinds[name] = kind
+
+    try:
+        save_file(tensors, str(staging / WEIGHTS_FILE))
+        model.config.save_pretrained(staging)
+        if getattr(model, "generation_config", None) is not None:
+            model.generation_config.save_pretrained(staging)
+        preprocessors = []
+        for attr in PREPROCESSORS:
+            processor = getattr(pipe, attr, None)
+            if processor is not None:
+                processor.save_pretrained(staging)
+                preprocessors.append(attr)
+        manifest = {
+            "model": cfg["name"],
+            "key": cfg["key"],
+            "pipeline": cfg["pipeline"],
+            "revision": None if cfg.get("path") else hub_revision(cfg["name"]),
+            "architecture": type(model).__name__,
+            "dtype": str(model.dtype),
+            "versions": _library_versions(),
+            "kinds": kinds,
+            "aliases": aliases,
+            "preprocessors": preprocessors,
+            "normal_load_seconds": normal_seconds,
+            "created": time.time(),
+        }
+        with open(staging / MANIFEST_FILE, "w", encoding="utf-8") as f:  # written last: marks completeness
+            json.dump(manifest, f, indent=4)
+        if target.exists():
+            shutil.rmtree(target)
+        os.replace(staging, target)
+    except Exception:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    size_mb = (target / WEIGHTS_FILE).stat().st_size / 2**20
+    logger.info(f"[✓] Snapshot of {cfg['key']} saved to {target} ({size_mb:.0f} MB)")
+    return target
+
+
+def save_snapshot_async(cfg: dict, pipe, normal_seconds: Optional[float] = None):
+    """Saves on a background thread so the first start is not delayed by the write."""
+    def run():
+        try:
+            save_snapshot(cfg, pipe, normal_seconds)
+        except Exception as e:
+            logger.warning(f"⚠️ Could not snapshot {cfg['key']}: {e}")
+
+    threading.Thread(target=run, name=f"snapshot-{cfg['key']}", daemon=True).start()
+
+
+# ──────────────────────────────────────────────────────────────
+# Restore
+# ──────────────────────────────────────────────────────────────
+
+def _assign(model, name: str, tensor, kind: str):
+    import torch
+
+    module_path, _, attr = name.rpartition(".")
+    module = model.get_submodule(module_path) if module_path else model
+    if kind == "parameter":
+        module._parameters[attr] = torch.nn.Parameter(tensor, requires_grad=False)
+    else:
+        module._buffers[attr] = tensor
+
+
+def restore_snapshot(cfg: dict, pipe_kwargs: Optional[dict] = None):
+    """Pipeline rebuilt from the snapshot, or None if there is no complete snapshot for this version."""
+    import torch
+    import transformers
+    from safetensors.torch import load_file
+
+    target = snapshot_dir(cfg)
+    manifest_path = target / MANIFEST_FILE
+    if not manifest_path.exists():
+        return None
+    with open(manifest_path, encoding="utf-8") as f:
+        manifest = json.load(f)
+
+    config = transformers.AutoConfig.from_pretrained(target)
+    model_cls = getattr(transformers, manifest["architecture"])
+    with torch.device("meta"):  # skeleton only: no allocation, no random init
+        model = model_cls._from_config(config)
+
+    tensors = load_file(str(target / WEIGHTS_FILE), device="cpu")  # memory-mapped
+    for name, tensor in tensors.items():
+        _assign(model, name, tensor, manifest["kinds"][name])
+    for alias, name in manifest["aliases"].items():  # tied weights share one tensor
+        kind = manifest["kinds"][name]
+        owner_path, _, owner_attr = name.rpartition(".")
+        owner = model.get_submodule(owner_path) if owner_path else model
+        shared = (owner._parameters if kind == "parameter" else owner._buffers)[owner_attr]
+        module_path, _, attr = alias.rpartition(".")
+        module = model.get_submodule(module_path) if module_path else model
+        (module._parameters if kind == "parameter" else module._buffers)[attr] = shared
+
+    leftover = [n for n, t in list(model.named_parameters()) + list(model.named_buffers()) if t.is_meta]
+    if leftover:
+        raise ValueError(f"Snapshot is missing tensors: {leftover[:5]}")
+    model.eval()
+    if (target / "generation_config.json").exists():
+        model.generation_config = transformers.GenerationConfig.from_pretrained(target)
+
+    preprocessors = {
+        attr: getattr(transformers, PREPROCESSORS[attr]).from_pretrained(target)
+        for attr in manifest["preprocessors"]
+    }
+    return transformers.pipeline(cfg["pipeline"], model=model, device=_device(),
+                                 **preprocessors, **(pipe_kwargs or {}))
+
+
+def load_snapshotted(cfg: dict, build: Callable, pipe_kwargs: Optional[dict] = None):
+    """
+    Restores `cfg`'s pipeline from its snapshot if there is one; otherwise
+    calls `build()` and snapshots the result for the next start.
+    """
+    if not AppConfig.MODEL_SNAPSHOTS or cfg["pipeline"] in UNSUPPORTED_PIPELINES:
+        return build()
+
+    started = time.perf_counter()
+    try:
+        pipe = restore_snapshot(cfg, pipe_kwargs)
+    except Exception as e:
+        logger.warning(f"⚠️ Snapshot restore failed for {cfg['key']}, loading normally: {e}")
+        pipe = None
+    if pipe is not None:
+        seconds = time.perf_counter() - started
+        normal = _manifest(cfg).get("normal_load_seconds")
+        LOAD_TIMINGS[cfg["key"]] = {"path": "snapshot", "seconds": seconds, "normal_seconds": normal}
+        speedup = f" vs {normal:.1f}s normal ({normal / max(seconds, 1e-6):.1f}x)" if normal else ""
+        logger.info(f"⚡ Restored {cfg['key']} from snapshot in {seconds:.1f}s{speedup}")
+        return pipe
+
+    started = time.perf_counter()
+    pipe = build()
+    seconds = time.perf_counter() - started
+    LOAD_TIMINGS[cfg["key"]] = {"path": "normal", "seconds": seconds, "normal_seconds": seconds}
+    if getattr(pipe, "model", None) is not None and hasattr(pipe.model, "named_parameters"):
+        save_snapshot_async(cfg, pipe, seconds)
+    return pipe
+
+
+def _manifest(cfg: dict) -> dict:
+    try:
+        with open(snapshot_dir(cfg) / MANIFEST_FILE, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+# ──────────────────────────────────────────────────────────────
+# Benchmark
+# ──────────────────────────────────────────────────────────────
+
+def _timed_load(task: str, path: str) -> float:
+    """Loads `task` in this process by one path ("normal" or "snapshot") and returns the seconds taken."""
+    import model.registry as registry
+    from model.loader import model_loader
+
+    cfg = dict(registry.MODEL_CONFIG[task], backend="eager", draft=None)
+    started = time.perf_counter()
+    if path == "snapshot":
+        if restore_snapshot(cfg, {}) is None:
+            raise SystemExit(f"No snapshot for {cfg['key']} yet (run with --save first)")
+    else:
+        model_loader._build_pipeline(cfg, task, {})
+    return time.perf_counter() - started
+
+
+def benchmark(task: str) -> dict:
+    """Cold-start seconds for both paths, each measured in a fresh interpreter."""
+    results = {}
+    for path in ("normal", "snapshot"):
+        out = subprocess.run([sys.executable, "-m", "model.snapshot", task, "--load", path],
+                             capture_output=True, text=True, check=True, cwd=BASE_DIR)
+        results[path] = json.loads(out.stdout.strip().splitlines()[-1])["seconds"]
+    results["speedup"] = results["normal"] / max(results["snapshot"], 1e-6)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Create or benchmark model snapshots")
+    parser.add_argument("task", help="Task whose registry model to snapshot, e.g. text_to_text")
+    parser.add_argument("--save", action="store_true", help="Load normally and write the snapshot")
+    parser.add_argument("--benchmark", action="store_true", help="Compare cold start of both paths")
+    parser.add_argument("--load", choices=["normal", "snapshot"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, stream=sys.stderr)
+    if args.load:
+        print(json.dumps({"path": args.load, "seconds": _timed_load(args.task, args.load)}))
+    else:
+        import model.registry as registry
+        from model.loader import model_loader
+
+        if args.save:
+            cfg = dict(registry.MODEL_CONFIG[args.task], backend="eager", draft=None)
+            started = time.perf_counter()
+            pipe = model_loader._build_pipeline(cfg, args.task, {})
+            save_snapshot(cfg, pipe, time.perf_counter() - started)
+        if args.benchmark:
+            print(json.dumps(benchmark(args.task), indent=2))
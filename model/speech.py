@@ -0,0 +1,152 @@
+"""
+speech.py
+Sentence-level, pipelined text-to-speech for text_to_audio.
+
+- `split_segments()` cuts text into sentences (long ones at clause/word
+  boundaries), and keeps the first segment short, so time-to-first-audio
+  depends on one short segment, not on the whole text.
+- `synthesize_stream()` synthesizes on a background thread up to
+  TTS_PREFETCH segments ahead of the consumer: segment k+1 is generated
+  while segment k plays.
+- Synthesized segments are cached by a hash of (model, text) in a byte-bounded
+  LRU, so repeated phrases cost nothing.
+"""
+
+import io
+import logging
+import queue
+import re
+import threading
+import wave
+from typing import Iterator, List, Tuple
+
+import numpy as np
+
+from config.settings import AppConfig
+from utils.helpers import hash_string
+from utils.lru import ByteLRU
+
+logger = logging.getLogger("speech")
+
+Audio = Tuple[int, np.ndarray]  # (sample_rate, int16 samples) as taken by gr.Audio
+
+_SENTENCE_END = re.compile(r"(?<=[.!?…])\s+|\n+")
+_CLAUSE_END = re.compile(r"(?<=[,;:—])\s+")
+
+
+# ──────────────────────────────────────────────────────────────
+# Segmentation
+# ──────────────────────────────────────────────────────────────
+
+def _split_long(text: str, max_chars: int) -> List[str]:
+    """Split at clause boundaries, then word boundaries, into pieces of <= max_chars."""
+    if len(text) <= max_chars:
+        return [text]
+    pieces, current = [], ""
+    for clause in _CLAUSE_END.split(text):
+        for word in clause.split(" ") if len(clause) > max_chars else [clause]:
+            candidate = f"{current} {word}".strip()
+            if len(candidate) > max_chars and current:
+                pieces.append(current)
+                candidate = word
+            current = candidate
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def split_segments(text: str, max_chars: int = AppConfig.TTS_MAX_SEGMENT_CHARS,
+                   first_chars: int = AppConfig.TTS_FIRST_SEGMENT_CHARS) -> List[str]:
+    segments = []
+    for sentence in _SENTENCE_END.split(text.strip()):
+        sentence = " ".join(sentence.split())
+        if sentence:
+            segments.extend(_split_long(sentence, first_chars if not segments else max_chars))
+    return segments
+
+
+# ──────────────────────────────────────────────────────────────
+# Segment cache
+# ──────────────────────────────────────────────────────────────
+
+class SegmentCache(ByteLRU):
+    """LRU of synthesized segments, bounded by total sample bytes."""
+
+    def __init__(self, max_mb: float = AppConfig.TTS_CACHE_MAX_MB):
+        super().__init__(max_mb * 2**20, sizeof=lambda audio: audio[1].nbytes)
+
+    @staticmethod
+    def key(model_key: str, text: str, params: dict) -> str:
+        # Whitespace only: case changes prosody ("US" vs "us", shouted capitals)
+        return hash_string(f"{model_key}|{sorted(params.items())}|{' '.join(text.split())}")
+
+
+segment_cache = SegmentCache()
+
+
+# ──────────────────────────────────────────────────────────────
+# Synthesis
+# ──────────────────────────────────────────────────────────────
+
+def to_audio(result) -> Audio:
+    """Normalize a TTS result (HF pipeline dict, WAV path or bytes) to (rate, int16 mono)."""
+    if isinstance(result, list) and result:
+        result = result[0]
+    if isinstance(result, dict):
+        rate, samples = result["sampling_rate"], np.asarray(result["audio"])
+    elif isinstance(result, (str, bytes, bytearray)):
+        with wave.open(result if isinstance(result, str) else io.BytesIO(result), "rb") as wav:
+            rate, width = wav.getframerate(), wav.getsampwidth()
+            samples = np.frombuffer(wav.readframes(wav.getnframes()), dtype={2: np.int16, 4: np.int32}[width])
+            samples = samples.reshape(-1, wav.getnchannels()).mean(axis=1) / float(2 ** (8 * width - 1))
+    else:
+        raise ValueError(f"Unsupported TTS result: {type(result).__name__}")
+    samples = np.squeeze(samples)
+    if samples.ndim > 1:  # (channels, n) or (n, channels) -> mono
+        samples = samples.mean(axis=0 if samples.shape[0] < samples.shape[-1] else -1)
+    if samples.dtype != np.int16:
+        samples = (np.clip(samples, -1.0, 1.0) * 32767).astype(np.int16)
+    return int(rate), samples
+
+
+def synthesize_stream(text: str, synthesize, model_key: str = "", prefetch: int = AppConfig.TTS_PREFETCH,
+                      cache: SegmentCache = segment_cache, **params) -> Iterator[Audio]:
+    """
+    Yields (sample_rate, int16 chunk) per segment, in order. `synthesize(text, **params)`
+    runs on a producer thread at most `prefetch` segments ahead. Closing the
+    generator stops the producer after its current segment.
+    """
+    segments = split_segments(text)
+    ready: queue.Queue = queue.Queue(maxsize=max(1, prefetch))
+    stop = threading.Event()
+
+    def produce():
+        try:
+            for segment in segments:
+                if stop.is_set():
+                    return
+                key = cache.key(model_key, segment, params)
+                audio = cache.get(key)
+                if audio is None:
+                    audio = to_audio(synthesize(segment, **params))
+                    cache.put(key, audio)
+                ready.put(("audio", audio))
+            ready.put(("done", None))
+        except Exception as e:
+            ready.put(("error", e))
+
+    threading.Thread(target=produce, name="tts-producer", daemon=True).start()
+    try:
+        while True:
+            kind, payload = ready.get()
+            if kind == "done":
+                return
+            if kind == "error":
+                raise payload
+            rate, samples = payload
+            pause = np.zeros(int(rate * AppConfig.TTS_SENTENCE_PAUSE), dtype=np.int16)
+            yield rate, np.concatenate([samples, pause])
+    finally:
+        stop.set()
+        while not ready.empty():  # unblock a producer waiting on a full queue
+            ready.get_nowait()
@@ -0,0 +1,280 @@
+"""
+streaming.py
+Streams API responses straight to the output store instead of buffering them.
+
+- Binary bodies (image/*, video/*, octet-stream) are written to disk chunk by chunk.
+- Large JSON bodies are scanned incrementally; an oversized string value that
+  is a base64 data URI, or whose first STREAM_INLINE_STRING_LIMIT characters
+  are strictly valid base64, is decoded on the fly into its own file and
+  replaced by that file's path. Other long strings (e.g. generated text) stay
+  inline.
+- Small JSON bodies and all text/* bodies are returned as usual.
+
+Handlers receive file paths (or a zero-copy memoryview via `as_memoryview`)
+so peak memory per request stays at roughly one chunk.
+"""
+
+import base64
+import binascii
+import codecs
+import json
+import logging
+import mimetypes
+import mmap
+import os
+import re
+import uuid
+from typing import Optional
+
+import requests
+
+from config.settings import AppConfig
+
+logger = logging.getLogger("stream-io")
+
+_STRING_DELIMS = re.compile(r'["\\]')
+_WHITESPACE = re.compile(r"\s+")  # line-wrapped (MIME) base64
+_BASE64_TEXT = re.compile(r"[A-Za-z0-9+/]*={0,2}|[A-Za-z0-9_-]*={0,2}")
+_JSON_ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+
+
+def _looks_base64(text: str) -> bool:
+    """
+    Strict check: only base64 alphabet (one variant) plus line wrapping.
+    Pure letters are rejected; encoded binary data always contains digits or symbols.
+    """
+    compact = _WHITESPACE.sub("", text)
+    return bool(compact) and _BASE64_TEXT.fullmatch(compact) is not None and not compact.isalpha()
+
+
+# ──────────────────────────────────────────────────────────────
+# Output store
+# ──────────────────────────────────────────────────────────────
+
+def new_output_path(content_type: Optional[str] = None, suffix: Optional[str] = None) -> str:
+    """Allocate a unique file path inside the output store."""
+    os.makedirs(AppConfig.OUTPUTS_DIR, exist_ok=True)
+    suffix = suffix or (mimetypes.guess_extension(content_type or "") or ".bin")
+    return str(AppConfig.OUTPUTS_DIR / f"{uuid.uuid4().hex}{suffix}")
+
+
+def as_memoryview(path: str) -> memoryview:
+    """Map an output file read-only and return a memoryview over it (no copy)."""
+    with open(path, "rb") as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return memoryview(mapped)
+
+
+# ──────────────────────────────────────────────────────────────
+# Incremental base64
+# ──────────────────────────────────────────────────────────────
+
+class Base64StreamDecoder:
+    """Decodes base64 text fed in arbitrary slices and writes bytes to a file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "wb")
+        self._pending = ""
+        self._urlsafe = False
+
+    def feed(self, text: str):
+        text = _WHITESPACE.sub("", text)
+        if "-" in text or "_" in text:
+            self._urlsafe = True
+        data = self._pending + text
+        cut = len(data) - (len(data) % 4)
+        self._pending = data[cut:]
+        if cut:
+            self._file.write(self._decode(data[:cut]))
+
+    def close(self) -> str:
+        try:
+            if self._pending:
+                padded = self._pending + "=" * (-len(self._pending) % 4)
+                self._file.write(self._decode(padded))
+        finally:
+            self._file.close()
+        return self.path
+
+    def _decode(self, text: str) -> bytes:
+        try:
+            return base64.b64decode(text, altchars=b"-_" if self._urlsafe else None, validate=True)
+        except binascii.Error as e:
+            raise ValueError(f"Invalid base64 payload: {e}")
+
+
+# ──────────────────────────────────────────────────────────────
+# Incremental JSON with large-string extraction
+# ──────────────────────────────────────────────────────────────
+
+class _JsonBlobExtractor:
+    """
+    Minimal streaming scanner over JSON text. Structure is kept verbatim and
+    string values are unescaped as they arrive. Strings longer than
+    `inline_limit` are streamed to disk if they are base64 (a `data:<mime>;base64,`
+    URI, or strictly valid base64 in their first `inline_limit` characters);
+    any other string stays inline, however long.
+    """
+
+    def __init__(self, inline_limit: int):
+        self.inline_limit = inline_limit
+        self.skeleton = []
+        self._in_string = False
+        self._escape: Optional[str] = None  # partial escape sequence after a backslash
+        self._buffer = []
+        self._buffered = 0
+        self._checked = False  # spill decision already made for the current string
+        self._decoder: Optional[Base64StreamDecoder] = None
+
+    def feed(self, text: str):
+        pos = 0
+        while pos < len(text):
+            if not self._in_string:
+                quote = text.find('"', pos)
+                if quote == -1:
+                    self.skeleton.append(text[pos:])
+                    return
+                self.skeleton.append(text[pos:quote])
+                self._in_string = True
+                pos = quote + 1
+                continue
+
+            if self._escape is not None:
+                self._escape += text[pos]
+                pos += 1
+                char = self._unescape(self._escape)
+                if char is not None:
+                    self._escape = None
+                    self._string_part(char)
+                continue
+
+            match = _STRING_DELIMS.search(text, pos)
+            if match is None:
+                self._string_part(text[pos:])
+                return
+            self._string_part(text[pos:match.start()])
+            if match.group() == "\\":
+                self._escape = ""
+            else:
+                self._end_string()
+            pos = match.end()
+
+    def result(self):
+        if self._in_string:
+            raise ValueError("Truncated JSON response")
+        return json.loads("".join(self.skeleton))
+
+    @staticmethod
+    def _unescape(sequence: str) -> Optional[str]:
+        """The character for a complete escape sequence (without the backslash), None if incomplete."""
+        if sequence[0] == "u":
+            if len(sequence) < 5:
+                return None
+            try:
+                return chr(int(sequence[1:5], 16))  # surrogate halves are re-paired by json.dumps/loads
+            except ValueError:
+                raise ValueError(f"Invalid JSON escape: \\{sequence}")
+        if sequence not in _JSON_ESCAPES:
+            raise ValueError(f"Invalid JSON escape: \\{sequence}")
+        return _JSON_ESCAPES[sequence]
+
+    def _string_part(self, part: str):
+        if not part:
+            return
+        if self._decoder is not None:
+            self._decoder.feed(part)
+            return
+        self._buffer.append(part)
+        self._buffered += len(part)
+        if self._buffered > self.inline_limit and not self._checked:
+            self._checked = True
+            self._maybe_spill()
+
+    def _maybe_spill(self):
+        text = "".join(self._buffer)
+        content_type = None
+        if text.startswith("data:") and "," in text[:256]:
+            header, payload = text.split(",", 1)
+            if not header.endswith(";base64"):
+                return
+            content_type, text = header[5:].split(";")[0], payload
+        elif not _looks_base64(text):
+            return  # long plain text (e.g. generated_text) stays inline
+        self._buffer, self._buffered = [], 0
+        self._decoder = Base64StreamDecoder(new_output_path(content_type))
+        self._decoder.feed(text)
+
+    def _end_string(self):
+        self._in_string = False
+        self._checked = False
+        if self._decoder is not None:
+            path = self._decoder.close()
+            self._decoder = None
+            self.skeleton.append(json.dumps(path))
+        else:
+            self.skeleton.append(json.dumps("".join(self._buffer)))
+            self._buffer, self._buffered = [], 0
+
+
+# ──────────────────────────────────────────────────────────────
+# Public helpers
+# ──────────────────────────────────────────────────────────────
+
+def stream_to_file(response: requests.Response, path: Optional[str] = None) -> str:
+    """Write a binary response body to the output store chunk by chunk."""
+    content_type = response.headers.get("Content-Type", "").split(";")[0].strip()
+    path = path or new_output_path(content_type)
+    with open(path, "wb") as f:
+        for chunk in response.iter_content(chunk_size=AppConfig.STREAM_CHUNK_SIZE):
+            f.write(chunk)
+    logger.info(f"💾 Streamed {content_type or 'binary'} output → {path}")
+    return path
+
+
+def stream_json(response: requests.Response):
+    """Parse a (possibly huge) JSON body, spilling oversized strings to files."""
+    extractor = _JsonBlobExtractor(AppConfig.STREAM_INLINE_STRING_LIMIT)
+    decoder = codecs.getincrementaldecoder(response.encoding or "utf-8")()
+    for chunk in response.iter_content(chunk_size=AppConfig.STREAM_CHUNK_SIZE):
+        extractor.feed(decoder.decode(chunk))
+    extractor.feed(decoder.decode(b"", final=True))
+    return extractor.result()
+
+
+def stream_text(response: requests.Response) -> str:
+    """Decode a text body of unknown length chunk by chunk."""
+    decoder = codecs.getincrementaldecoder(response.encoding or "utf-8")(errors="replace")
+    parts = [decoder.decode(chunk) for chunk in response.iter_content(chunk_size=AppConfig.STREAM_CHUNK_SIZE)]
+    parts.append(decoder.decode(b"", final=True))
+    return "".join(parts)
+
+
+def read_response(response: requests.Response):
+    """
+    Consume a `stream=True` response without buffering large bodies.
+    Returns parsed JSON, text (always, for text/*), or an output file path for binary bodies.
+    """
+    try:
+        response.raise_for_status()
+        content_type = response.headers.get("Content-Type", "").split(";")[0].strip().lower()
+        length = int(response.headers.get("Content-Length") or 0)
+        small = 0 < length <= AppConfig.STREAM_BUFFER_LIMIT
+
+        if content_type == "application/json" or content_type.endswith("+json"):
+            return response.json() if small else stream_json(response)
+        if content_type.startswith("text/"):
+            return response.text if small else stream_text(response)
+        return stream_to_file(response)
+    finally:
+        response.close()
+
+
+def download(url: str, headers: Optional[dict] = None) -> str:
+    """Stream a remote output (e.g. a provider's result URL) into the output store."""
+    response = requests.get(url, headers=headers or {}, stream=True, timeout=60)
+    try:
+        response.raise_for_status()
+        return stream_to_file(response)
+    finally:
+        response.close()
@@ -0,0 +1,179 @@
+"""
+tiling.py
+Tiled, memory-bounded processing of large images for image_to_image.
+
+- The input is split into overlapping, equally sized tiles that are plain
+  NumPy slices of the input array (views, no crop copies). Edge tiles are
+  shifted inwards instead of padded, so every batch has one shape. The
+  engine adapter copies each tile once into a PIL image at the model
+  boundary, so only tiles in flight are ever duplicated.
+- Tiles are processed in batches on a thread pool, one row of tiles at a
+  time, and blended into the output with feathered (linear ramp) weights
+  across the overlap, so seams are invisible.
+- Only one band of float accumulators (a tile row of output) is alive at a
+  time; finished rows are normalized straight into the uint8 result.
+- `choose_tile_size()` picks the largest tile whose estimated peak memory
+  (tiles in flight x per-pixel model cost + band accumulators) fits
+  IMAGE_TILE_MEMORY_BUDGET_MB minus the uint8 output buffer (H·s x W·s x 3,
+  for the model's upscale factor s).
+"""
+
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from config.settings import AppConfig
+
+logger = logging.getLogger("tiling")
+
+TILE_MULTIPLE = 32  # tile sizes stay friendly to window/patch-based models
+
+
+# ──────────────────────────────────────────────────────────────
+# Planning
+# ──────────────────────────────────────────────────────────────
+
+def tile_starts(length: int, tile: int, overlap: int) -> List[int]:
+    """Start offsets covering [0, length) with tiles of `tile` overlapping by >= `overlap`."""
+    if length <= tile:
+        return [0]
+    stride = max(1, tile - overlap)
+    starts = list(range(0, length - tile, stride))
+    starts.append(length - tile)  # last tile flush with the edge
+    return starts
+
+
+def estimate_peak_bytes(tile: int, width: int, scale: int, batch: int, workers: int,
+                        bytes_per_pixel: int = AppConfig.IMAGE_TILE_BYTES_PER_PIXEL) -> int:
+    model = workers * batch * tile * tile * bytes_per_pixel
+    band = (tile * scale) * (width * scale) * (3 + 1) * 4  # float32 RGB sum + weight
+    return model + band
+
+
+def choose_tile_size(height: int, width: int, scale: int = 1,
+                     budget_mb: float = AppConfig.IMAGE_TILE_MEMORY_BUDGET_MB,
+                     batch: int = AppConfig.IMAGE_TILE_BATCH, workers: Optional[int] = None) -> int:
+    """
+    Largest tile (multiple of TILE_MULTIPLE, within limits) whose estimated
+    peak memory fits what the budget leaves after the output buffer.
+    """
+    workers = workers or _default_workers()
+    output = height * scale * width * scale * 3  # uint8 result, allocated up front
+    budget = budget_mb * 2**20 - output
+    if budget <= 0:
+        logger.warning(f"⚠️ The {width * scale}x{height * scale} output alone exceeds the {budget_mb:.0f} MB budget")
+    largest = min(AppConfig.IMAGE_TILE_MAX, max(height, width))
+    tile = max(TILE_MULTIPLE, largest // TILE_MULTIPLE * TILE_MULTIPLE)
+    while tile > AppConfig.IMAGE_TILE_MIN and estimate_peak_bytes(tile, width, scale, batch, workers) > budget:
+        tile -= TILE_MULTIPLE
+    if estimate_peak_bytes(tile, width, scale, batch, workers) > budget:
+        logger.warning(f"⚠️ Smallest tile ({tile}px) still exceeds the {budget_mb:.0f} MB budget")
+    return tile
+
+
+def _default_workers() -> int:
+    return min(AppConfig.IMAGE_TILE_WORKERS, os.cpu_count() or 1)
+
+
+def _ramp(length: int, fade: int, fade_start: bool, fade_end: bool) -> np.ndarray:
+    weights = np.ones(length, dtype=np.float32)
+    fade = min(fade, length // 2)
+    if fade > 0:
+        ramp = (np.arange(fade, dtype=np.float32) + 0.5) / fade
+        if fade_start:
+            weights[:fade] = ramp
+        if fade_end:
+            weights[-fade:] = ramp[::-1]
+    return weights
+
+
+# ──────────────────────────────────────────────────────────────
+# Engine
+# ──────────────────────────────────────────────────────────────
+
+def process_tiled(image: np.ndarray, process_batch: Callable[[List[np.ndarray]], Sequence[np.ndarray]],
+                  tile: Optional[int] = None, overlap: int = AppConfig.IMAGE_TILE_OVERLAP,
+                  batch: int = AppConfig.IMAGE_TILE_BATCH, workers: Optional[int] = None,
+                  scale: Optional[int] = None) -> Iterator[Tuple[int, int, Optional[np.ndarray]]]:
+    """
+    Runs `process_batch(tiles) -> outputs` over overlapping tiles of an HxWx3
+    uint8 image. Output tiles may be upscaled by an integer factor (detected
+    from the first batch). Yields (tile rows done, tile rows total, None) per
+    row and finally (total, total, HsxWsx3 uint8 result).
+    """
+    height, width = image.shape[:2]
+    workers = workers or _default_workers()
+    tile = tile or choose_tile_size(height, width, scale or 1, batch=batch, workers=workers)
+    tile_h, tile_w = min(tile, height), min(tile, width)
+    overlap = min(overlap, tile_h // 2, tile_w // 2)
+    ys, xs = tile_starts(height, tile_h, overlap), tile_starts(width, tile_w, overlap)
+    logger.info(f"🧩 Tiling {width}x{height}: {len(xs)}x{len(ys)} tiles of {tile_w}x{tile_h}, overlap {overlap}")
+
+    output = acc = weights = None
+    acc_origin = 0  # output row of acc[0]
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="tiles") as pool:
+        for row, y in enumerate(ys):
+            views = [image[y:y + tile_h, x:x + tile_w] for x in xs]  # zero-copy views
+            batches = [views[i:i + batch] for i in range(0, len(views), batch)]
+            results = [out for outs in pool.map(process_batch, batches) for out in outs]
+
+            if output is None:
+                scale = scale or max(1, round(np.asarray(results[0]).shape[0] / tile_h))
+                output = np.empty((height * scale, width * scale, 3), dtype=np.uint8)
+                acc = np.zeros((tile_h * scale, width * scale, 3), dtype=np.float32)
+                weights = np.zeros((tile_h * scale, width * scale), dtype=np.float32)
+
+            # Grow the band to cover this tile row
+            band_end = (y + tile_h) * scale
+            if acc_origin + len(acc) < band_end:
+                extra = band_end - acc_origin - len(acc)
+                acc = np.concatenate([acc, np.zeros((extra,) + acc.shape[1:], dtype=np.float32)])
+                weights = np.concatenate([weights, np.zeros((extra, weights.shape[1]), dtype=np.float32)])
+
+            fade = overlap * scale
+            wy = _ramp(tile_h * scale, fade, row > 0, row < len(ys) - 1)
+            top = y * scale - acc_origin
+            for col, (x, out) in enumerate(zip(xs, results)):
+                out = np.asarray(out, dtype=np.float32)[:tile_h * scale, :tile_w * scale, :3]
+                wx = _ramp(tile_w * scale, fade, col > 0, col < len(xs) - 1)
+                window = wy[:, None] * wx[None, :]
+                region = np.s_[top:top + tile_h * scale, x * scale:(x + tile_w) * scale]
+                acc[region] += out * window[..., None]
+                weights[region] += window
+
+            # Rows no later tile touches are final: normalize into the output and drop them
+            done_until = ys[row + 1] * scale if row + 1 < len(ys) else acc_origin + len(acc)
+            ready = done_until - acc_origin
+            np.clip(acc[:ready] / np.maximum(weights[:ready], 1e-6)[..., None] + 0.5, 0, 255,
+                    out=acc[:ready])
+            output[acc_origin:done_until] = acc[:ready]
+            acc, weights = acc[ready:], weights[ready:]
+            acc_origin = done_until
+            yield row + 1, len(ys), None
+
+    yield len(ys), len(ys), output
+
+
+# ──────────────────────────────────────────────────────────────
+# Engine adapter
+# ──────────────────────────────────────────────────────────────
+
+def engine_batch_processor(engine, task: str = "image_to_image", **params):
+    """
+    `process_batch(tiles) -> arrays` through the InferenceEngine. Pipelines
+    take PIL images, so each tile view is copied once into one here.
+    """
+    from PIL import Image
+
+    def process_batch(tiles: List[np.ndarray]) -> List[np.ndarray]:
+        images = [Image.fromarray(np.ascontiguousarray(t)) for t in tiles]  # the one copy per tile
+        results = engine.run_inference(task, images, batch_size=len(images), **params)
+        if not isinstance(results, list):
+            results = [results]
+        return [np.asarray(r.convert("RGB") if hasattr(r, "convert") else r) for r in results]
+
+    return process_batch
@@ -0,0 +1,252 @@
+"""
+traces.py
+Records real traffic as JSONL traces and builds latency-realistic stub models
+from them (see model/loadgen.py for replay).
+
+One line per inference call:
+    {"arrival": 1718000000.12, "task": "text_to_text", "model": "mistral-7b-instruct",
+     "source": "huggingface", "input_size": 812, "output_size": 2310,
+     "params": {"max_new_tokens": 256}, "wait": 0.04, "latency": 1.93, "status": "ok"}
+
+`arrival` is when the request reached the app (the scheduler's enqueue time when
+it went through the queue), `latency` is model service time only.
+Every InferenceEngine.run_inference call is recorded, local diffusion
+included (the text_to_image handler queues previews, galleries and refines
+through the scheduler like any other call). Recording is enabled with
+TRACE_RECORD=true.
+"""
+
+import json
+import logging
+import os
+import random
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+
+from config.settings import AppConfig
+
+logger = logging.getLogger("traces")
+
+MIN_FIT_SAMPLES = 5
+
+
+def _file_roots() -> List[str]:
+    """Folders whose files stand in for payloads: Gradio uploads and our output store."""
+    uploads = os.environ.get("GRADIO_TEMP_DIR") or os.path.join(tempfile.gettempdir(), "gradio")
+    return [os.path.realpath(uploads), os.path.realpath(AppConfig.OUTPUTS_DIR)]
+
+
+def _stored_file(data: str) -> bool:
+    """True for a path to an uploaded or generated file (a prompt like "requirements.txt" is text)."""
+    if len(data) >= 4096 or not os.path.isabs(data):
+        return False
+    path = os.path.realpath(data)
+    return os.path.isfile(path) and any(os.path.commonpath([path, root]) == root for root in _file_roots())
+
+
+def payload_size(data) -> int:
+    """Rough size in bytes (pixels for images) of an inference input or output."""
+    if data is None:
+        return 0
+    if isinstance(data, str):
+        return os.path.getsize(data) if _stored_file(data) else len(data.encode())
+    if isinstance(data, (bytes, bytearray, memoryview)):
+        return len(data)
+    if hasattr(data, "nbytes"):  # numpy / torch
+        return int(data.nbytes)
+    if hasattr(data, "size") and isinstance(getattr(data, "size"), tuple):  # PIL.Image
+        width, height = data.size
+        return width * height * len(data.getbands())
+    if isinstance(data, (list, tuple)):
+        return sum(payload_size(d) for d in data)
+    if isinstance(data, dict):
+        return sum(payload_size(v) for v in data.values())
+    return len(str(data))
+
+
+def _scalar_params(kwargs: Dict) -> Dict:
+    return {k: v for k, v in kwargs.items() if isinstance(v, (str, int, float, bool)) and not k.startswith("_")}
+
+
+# ──────────────────────────────────────────────────────────────
+# Recorder
+# ──────────────────────────────────────────────────────────────
+
+class TraceRecorder:
+    """Appends one JSON line per inference call to runtime/traces/<date>.jsonl."""
+
+    def __init__(self, enabled: bool = AppConfig.TRACE_RECORD, directory: Path = AppConfig.TRACES_DIR):
+        self.enabled = enabled
+        self.directory = Path(directory)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    @property
+    def path(self) -> Path:
+        return self.directory / f"{time.strftime('%Y-%m-%d')}.jsonl"
+
+    @contextmanager
+    def arrived(self, arrival: float):
+        """Marks calls on this thread as having arrived at `arrival` (e.g. scheduler enqueue time)."""
+        self._local.arrival = arrival
+        try:
+            yield
+        finally:
+            self._local.arrival = None
+
+    @contextmanager
+    def record(self, task: str, cfg: Dict, input_data, kwargs: Dict):
+        """
+        Wraps one inference call. The body may set `outcome["result"]`
+        so the output size is recorded as well.
+        """
+        outcome: Dict = {}
+        if not self.enabled:
+            yield outcome
+            return
+
+        started = time.time()
+        arrival = getattr(self._local, "arrival", None) or started
+        status = "ok"
+        try:
+            yield outcome
+        except Exception:
+            status = "error"
+            raise
+        finally:
+            self._write({
+                "arrival": round(arrival, 4),
+                "task": task,
+                "model": cfg.get("key") or cfg.get("name"),
+                "source": cfg.get("source"),
+                "input_size": payload_size(input_data),
+                "output_size": payload_size(outcome.get("result")),
+                "params": _scalar_params(kwargs),
+                "wait": round(started - arrival, 4),
+                "latency": round(time.time() - started, 4),
+                "status": status,
+            })
+
+    def _write(self, record: Dict):
+        line = json.dumps(record, default=str) + "\n"
+        try:
+            with self._lock:
+                self.directory.mkdir(parents=True, exist_ok=True)
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(line)
+        except OSError as e:
+            logger.error(f"[x] Failed to write trace record: {e}")
+
+
+def load_trace(path) -> List[Dict]:
+    """Reads a JSONL trace, skipping malformed lines, sorted by arrival."""
+    records = []
+    with open(path, "r", encoding="utf-8") as f:
+        for number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                logger.warning(f"⚠️ Skipping malformed trace line {number} in {path}")
+    return sorted(records, key=lambda r: r["arrival"])
+
+
+# ──────────────────────────────────────────────────────────────
+# Stub models
+# ──────────────────────────────────────────────────────────────
+
+class LatencyModel:
+    """
+    Service time as `max(0, base + per_byte * input_size) * lognormal(0, sigma)`,
+    fitted per task from a trace's successful calls.
+    """
+
+    def __init__(self, base: float, per_byte: float = 0.0, sigma: float = 0.0):
+        self.base = base
+        self.per_byte = per_byte
+        self.sigma = sigma
+
+    @classmethod
+    def default(cls, task: str) -> "LatencyModel":
+        median, sigma = AppConfig.LOADGEN_STUB_LATENCY.get(task, AppConfig.LOADGEN_STUB_LATENCY["default"])
+        return cls(median, 0.0, sigma)
+
+    @classmethod
+    def fit(cls, task: str, records: List[Dict]) -> "LatencyModel":
+        samples = [(r["input_size"], r["latency"]) for r in records
+                   if r["task"] == task and r.get("status") == "ok" and r.get("latency", 0) > 0]
+        if len(samples) < MIN_FIT_SAMPLES:
+            return cls.default(task)
+
+        sizes, latencies = np.array(samples, dtype=np.float64).T
+        per_byte, base = np.polyfit(sizes, latencies, 1) if np.ptp(sizes) > 0 else (0.0, np.median(latencies))
+        if per_byte < 0:  # Size doesn't explain latency: constant median
+            per_byte, base = 0.0, float(np.median(latencies))
+        predicted = np.maximum(base + per_byte * sizes, 1e-3)
+        sigma = float(np.std(np.log(latencies / predicted)))
+        return cls(float(base), float(per_byte), sigma)
+
+    def sample(self, size: int, rng: random.Random = random) -> float:
+        return max(0.0, self.base + self.per_byte * size) * rng.lognormvariate(0.0, self.sigma)
+
+    def as_dict(self) -> Dict:
+        return {"base": round(self.base, 4), "per_byte": self.per_byte, "sigma": round(self.sigma, 4)}
+
+
+class StubModel:
+    """
+    Callable stand-in for a loaded model: sleeps for a sampled service time and
+    returns a payload of the recorded output size. Thread-safe, holds no weights.
+    """
+
+    def __init__(self, task: str, latency: LatencyModel, error_rate: float = 0.0,
+                 output_size: int = 64, seed: Optional[int] = None):
+        self.task = task
+        self.latency = latency
+        self.error_rate = error_rate
+        self.output_size = output_size
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def __call__(self, input_data, _input_size: Optional[int] = None, _output_size: Optional[int] = None, **kwargs):
+        # Replayed requests carry their recorded sizes; synthetic inputs are capped
+        size = _input_size if _input_size is not None else payload_size(input_data)
+        with self._lock:
+            delay = self.latency.sample(size, self._rng)
+            fail = self._rng.random() < self.error_rate
+        time.sleep(delay)
+        if fail:
+            raise RuntimeError(f"Stub {self.task} model: injected failure")
+        return "x" * min(_output_size or self.output_size, AppConfig.LOADGEN_MAX_PAYLOAD)
+
+
+def build_stub_models(records: List[Dict], seed: Optional[int] = None) -> Dict[str, StubModel]:
+    """One StubModel per task in the trace, with latency and error rate fitted from it."""
+    stubs = {}
+    for task in sorted({r["task"] for r in records}):
+        task_records = [r for r in records if r["task"] == task]
+        errors = sum(r.get("status") == "error" for r in task_records)
+        outputs = [r.get("output_size", 0) for r in task_records if r.get("status") == "ok"]
+        stubs[task] = StubModel(
+            task,
+            LatencyModel.fit(task, records),
+            error_rate=errors / len(task_records),
+            output_size=int(np.median(outputs)) if outputs else 64,
+            seed=seed,
+        )
+    return stubs
+
+
+def iter_trace_files(directory: Path = AppConfig.TRACES_DIR) -> Iterator[Path]:
+    yield from sorted(Path(directory).glob("*.jsonl"))
+
+
+# Singleton recorder instance
+trace_recorder = TraceRecorder()
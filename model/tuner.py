@@ -0,0 +1,206 @@
+"""
+tuner.py
+CPU auto-tuner for local / Hugging Face models.
+
+For every registered local/HF model, runs a short synthetic workload over a
+grid of torch intra/inter-op thread counts, concurrency levels and batch
+sizes, picks the best point for the target ("throughput" or "latency" = p95)
+and saves it to config/tuning.json via `registry.save_tuning`. The loader
+applies it automatically (threads, pipeline batch_size) and the scheduler
+uses the tuned concurrency.
+
+Each thread configuration is measured in a fresh subprocess because torch
+only allows inter-op threads to be set once per process. The base model is
+measured alone (eager, no draft model): assisted decoding is single-sequence
+and batches always run on the plain pipeline. A batch size the model cannot
+run is skipped without discarding the other points.
+
+    python -m model.tuner --target throughput
+    python -m model.tuner --models mistral-7b-instruct --target latency
+"""
+
+import argparse
+import json
+import logging
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from config.settings import AppConfig, BASE_DIR
+from model.registry import get_model_spec, list_models, save_tuning
+
+logger = logging.getLogger("auto-tuner")
+
+TUNABLE_SOURCES = ("huggingface", "local")
+
+
+# ──────────────────────────────────────────────────────────────
+# Synthetic workloads
+# ──────────────────────────────────────────────────────────────
+
+def _text_inputs(n: int) -> List[str]:
+    return [f"Describe scene number {i} of a short film in one sentence." for i in range(n)]
+
+
+def _image_inputs(n: int):
+    from PIL import Image
+    return [Image.new("RGB", (224, 224), (i * 37 % 255, 90, 160)) for i in range(n)]
+
+
+SYNTHETIC_WORKLOADS = {
+    # pipeline tag -> (input factory, call kwargs)
+    "text-generation": (_text_inputs, {"max_new_tokens": 16, "do_sample": False}),
+    "text2text-generation": (_text_inputs, {"max_new_tokens": 16, "do_sample": False}),
+    "summarization": (_text_inputs, {"max_length": 24}),
+    "image-classification": (_image_inputs, {}),
+    "image-to-text": (_image_inputs, {"max_new_tokens": 16}),
+}
+
+
+def _percentile(samples: List[float], pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+# ──────────────────────────────────────────────────────────────
+# Measurement (runs inside a subprocess per thread configuration)
+# ──────────────────────────────────────────────────────────────
+
+def measure(name: str, intra: int, inter: int, concurrency: List[int], batch_sizes: List[int],
+            requests_per_point: int) -> List[Dict]:
+    """Load `name` with the given threads and time every (concurrency, batch) point."""
+    import torch
+    torch.set_num_interop_threads(inter)
+    torch.set_num_threads(intra)
+
+    from model.loader import model_loader
+    from model.registry import worker_load_config
+
+    cfg = dict(worker_load_config(name), tuning=None, backend="eager", draft=None)
+    pipe = model_loader.build(cfg, cfg["task"])  # pads with EOS if the tokenizer has no pad token
+    make_inputs, call_kwargs = SYNTHETIC_WORKLOADS[cfg["pipeline"]]
+
+    results = []
+    for batch in batch_sizes:
+        try:
+            results.extend(_measure_batch(pipe, make_inputs(batch), call_kwargs, intra, inter, batch,
+                                          concurrency, requests_per_point))
+        except Exception as e:
+            logger.warning(f"⚠️ {name}: batch_size={batch} failed, skipping it: {e}")
+    return results
+
+
+def _measure_batch(pipe, inputs, call_kwargs: Dict, intra: int, inter: int, batch: int,
+                   concurrency: List[int], requests_per_point: int) -> List[Dict]:
+    results = []
+    pipe(inputs, batch_size=batch, **call_kwargs)  # warmup
+    for conc in concurrency:
+        latencies: List[float] = []
+
+        def one_request(_):
+            started = time.perf_counter()
+            pipe(inputs, batch_size=batch, **call_kwargs)
+            latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=conc) as pool:
+            list(pool.map(one_request, range(requests_per_point)))
+        elapsed = time.perf_counter() - started
+
+        results.append({
+            "intra_op_threads": intra,
+            "inter_op_threads": inter,
+            "concurrency": conc,
+            "batch_size": batch,
+            "throughput": round(requests_per_point * batch / elapsed, 3),  # items / s
+            "p95_latency": round(_percentile(latencies, 95), 4),
+        })
+    return results
+
+
+# ──────────────────────────────────────────────────────────────
+# Grid search driver
+# ──────────────────────────────────────────────────────────────
+
+def _thread_grid() -> List[int]:
+    cpus = os.cpu_count() or 1
+    return sorted({min(t, cpus) for t in AppConfig.TUNE_THREADS})
+
+
+def tune_model(name: str, target: str = "throughput", quick: bool = False) -> Optional[Dict]:
+    """Grid-search one model and persist the best configuration for `target`."""
+    spec = get_model_spec(name)
+    if spec is None or spec.source not in TUNABLE_SOURCES:
+        raise ValueError(f"Model '{name}' is not a local/Hugging Face model.")
+    if spec.pipeline not in SYNTHETIC_WORKLOADS:
+        logger.warning(f"⚠️ No synthetic workload for pipeline '{spec.pipeline}', skipping {name}")
+        return None
+
+    threads = _thread_grid()
+    interop = AppConfig.TUNE_INTEROP_THREADS[:1] if quick else AppConfig.TUNE_INTEROP_THREADS
+    concurrency = AppConfig.TUNE_CONCURRENCY[:2] if quick else AppConfig.TUNE_CONCURRENCY
+    batches = AppConfig.TUNE_BATCH_SIZES[:2] if quick else AppConfig.TUNE_BATCH_SIZES
+    requests_per_point = max(2, AppConfig.TUNE_REQUESTS // 2) if quick else AppConfig.TUNE_REQUESTS
+
+    points: List[Dict] = []
+    for intra in threads:
+        for inter in interop:
+            cmd = [sys.executable, "-m", "model.tuner", "--measure", name,
+                   "--intra", str(intra), "--inter", str(inter),
+                   "--concurrency", *map(str, concurrency), "--batch", *map(str, batches),
+                   "--requests", str(requests_per_point)]
+            proc = subprocess.run(cmd, cwd=str(BASE_DIR), capture_output=True, text=True)
+            if proc.returncode != 0:
+                logger.error(f"[x] Measurement failed for {name} (intra={intra}, inter={inter}): {proc.stderr[-500:]}")
+                continue
+            points.extend(json.loads(proc.stdout.strip().splitlines()[-1]))
+            logger.info(f"📏 {name}: measured intra={intra} inter={inter}")
+
+    if not points:
+        return None
+
+    if target == "latency":
+        best = min(points, key=lambda p: (p["p95_latency"], -p["throughput"]))
+    else:
+        best = max(points, key=lambda p: (p["throughput"], -p["p95_latency"]))
+
+    tuning = dict(best, target=target, cpu_count=os.cpu_count(), tuned_at=time.strftime("%Y-%m-%dT%H:%M:%S"))
+    save_tuning(name, tuning)
+    return tuning
+
+
+def tune_all(target: str = "throughput", names: Optional[List[str]] = None, quick: bool = False) -> Dict[str, Dict]:
+    specs = [get_model_spec(n) for n in names] if names else [
+        s for s in list_models() if s.source in TUNABLE_SOURCES
+    ]
+    results = {}
+    for spec in specs:
+        try:
+            results[spec.name] = tune_model(spec.name, target=target, quick=quick)
+        except Exception as e:
+            logger.error(f"[x] Tuning failed for {spec.name}: {e}")
+    return results
+
+
+# ───── CLI ───── #
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Auto-tune CPU threads / concurrency / batch size")
+    parser.add_argument("--target", choices=["throughput", "latency"], default="throughput")
+    parser.add_argument("--models", nargs="*", help="Registry model names (default: all local/HF)")
+    parser.add_argument("--quick", action="store_true", help="Smaller grid for a fast pass")
+    # Internal: single-configuration measurement in a fresh process
+    parser.add_argument("--measure")
+    parser.add_argument("--intra", type=int)
+    parser.add_argument("--inter", type=int)
+    parser.add_argument("--concurrency", type=int, nargs="*")
+    parser.add_argument("--batch", type=int, nargs="*")
+    parser.add_argument("--requests", type=int, default=AppConfig.TUNE_REQUESTS)
+    args = parser.parse_args()
+
+    if args.measure:
+        print(json.dumps(measure(args.measure, args.intra, args.inter, args.concurrency, args.batch, args.requests)))
+    else:
+        print(json.dumps(tune_all(args.target, args.models, args.quick), indent=2))
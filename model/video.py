@@ -0,0 +1,258 @@
+"""
+video.py
+Keyframe-sampled, batched captioning for video_to_text.
+
+- `decode_frames()` streams RGB frames at VIDEO_SAMPLE_FPS, already scaled to
+  VIDEO_FRAME_SIZE (ffmpeg pipe; OpenCV fallback that grabs every frame but
+  only converts the sampled ones).
+- `select_keyframes()` scores each frame by mean absolute difference of a
+  tiny color thumbnail (a strided subsample, no resize) against the last
+  keyframe, and keeps scene changes plus one frame per VIDEO_MAX_KEYFRAME_GAP.
+- `describe_stream()` captions keyframes through the image_to_text model in
+  batches and merges consecutive segments whose captions agree.
+
+Only the current frame, the last keyframe's thumbnail and one batch of
+keyframes (VIDEO_FRAME_WINDOW) are held at a time, whatever the video length.
+"""
+
+import base64
+import io
+import json
+import logging
+import re
+import shutil
+import subprocess
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from config.settings import AppConfig
+
+logger = logging.getLogger("video")
+
+THUMB_SIZE = 32  # thumbnail long side for difference scoring
+
+
+# ──────────────────────────────────────────────────────────────
+# Decoding
+# ──────────────────────────────────────────────────────────────
+
+def _scaled_size(width: int, height: int, long_side: int) -> Tuple[int, int]:
+    scale = min(1.0, long_side / max(width, height))
+    return max(2, int(width * scale) // 2 * 2), max(2, int(height * scale) // 2 * 2)
+
+
+def _probe(path: str) -> Tuple[int, int]:
+    out = subprocess.run(
+        ["ffprobe", "-v", "error", "-select_streams", "v:0", "-show_entries", "stream=width,height",
+         "-of", "json", path],
+        capture_output=True, text=True, check=True,
+    ).stdout
+    stream = json.loads(out)["streams"][0]
+    return int(stream["width"]), int(stream["height"])
+
+
+def decode_frames(path: str, fps: float = AppConfig.VIDEO_SAMPLE_FPS,
+                  long_side: int = AppConfig.VIDEO_FRAME_SIZE) -> Iterator[Tuple[float, np.ndarray]]:
+    """Yields (timestamp seconds, HxWx3 uint8 frame) at `fps`."""
+    if shutil.which("ffmpeg") and shutil.which("ffprobe"):
+        yield from _ffmpeg_frames(path, fps, long_side)
+    else:
+        logger.warning("⚠️ ffmpeg not found, decoding with OpenCV")
+        yield from _opencv_frames(path, fps, long_side)
+
+
+def _ffmpeg_frames(path: str, fps: float, long_side: int) -> Iterator[Tuple[float, np.ndarray]]:
+    width, height = _scaled_size(*_probe(path), long_side)
+    cmd = ["ffmpeg", "-nostdin", "-loglevel", "error", "-i", path,
+           "-vf", f"fps={fps},scale={width}:{height}", "-f", "rawvideo", "-pix_fmt", "rgb24", "pipe:1"]
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    frame_bytes = width * height * 3
+    try:
+        index = 0
+        while True:
+            data = proc.stdout.read(frame_bytes)
+            if len(data) < frame_bytes:
+                break
+            yield index / fps, np.frombuffer(data, dtype=np.uint8).reshape(height, width, 3)
+            index += 1
+        if proc.wait() != 0:
+            raise RuntimeError(f"ffmpeg failed to decode {path}: {proc.stderr.read().decode(errors='ignore')[-300:]}")
+    finally:
+        if proc.poll() is None:
+            proc.kill()
+        proc.stdout.close()
+        proc.stderr.close()
+
+
+def _opencv_frames(path: str, fps: float, long_side: int) -> Iterator[Tuple[float, np.ndarray]]:
+    import cv2
+
+    capture = cv2.VideoCapture(path)
+    if not capture.isOpened():
+        raise ValueError(f"Could not open video: {path}")
+    source_fps = capture.get(cv2.CAP_PROP_FPS) or 25.0
+    step = max(1.0, source_fps / fps)
+    try:
+        index, next_sample = 0, 0.0
+        while capture.grab():  # grab() demuxes/decodes without the costly RGB conversion
+            if index >= next_sample:
+                ok, frame = capture.retrieve()
+                if not ok:
+                    break
+                size = _scaled_size(frame.shape[1], frame.shape[0], long_side)
+                frame = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+                yield index / source_fps, cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+                next_sample += step
+            index += 1
+    finally:
+        capture.release()
+
+
+# ──────────────────────────────────────────────────────────────
+# Keyframe selection
+# ──────────────────────────────────────────────────────────────
+
+def thumbnail(frame: np.ndarray, size: int = THUMB_SIZE) -> np.ndarray:
+    """
+    Tiny float32 thumbnail for difference scoring (strided subsample, no resize).
+    Color is kept: scenes of equal brightness but different hue look alike in grayscale.
+    """
+    step = max(1, max(frame.shape[:2]) // size)
+    return frame[::step, ::step].astype(np.float32)
+
+
+def select_keyframes(frames: Iterator[Tuple[float, np.ndarray]],
+                     threshold: float = AppConfig.VIDEO_SCENE_THRESHOLD,
+                     max_gap: float = AppConfig.VIDEO_MAX_KEYFRAME_GAP,
+                     min_gap: float = AppConfig.VIDEO_MIN_KEYFRAME_GAP) -> Iterator[Tuple[float, np.ndarray, float]]:
+    """
+    Yields (timestamp, frame, score) for the first frame, scene changes
+    (mean abs thumbnail difference vs the last keyframe > `threshold`, on 0-255)
+    and at least one frame every `max_gap` seconds.
+    """
+    last_thumb: Optional[np.ndarray] = None
+    last_time = -np.inf
+    for timestamp, frame in frames:
+        thumb = thumbnail(frame)
+        if last_thumb is None or thumb.shape != last_thumb.shape:
+            score = float("inf")
+        else:
+            score = float(np.abs(thumb - last_thumb).mean())
+        elapsed = timestamp - last_time
+        if (score > threshold and elapsed >= min_gap) or elapsed >= max_gap:
+            last_thumb, last_time = thumb, timestamp
+            yield timestamp, frame, score
+
+
+# ──────────────────────────────────────────────────────────────
+# Segment merging
+# ──────────────────────────────────────────────────────────────
+
+def _tokens(text: str) -> set:
+    return set(re.findall(r"[a-z']+", text.lower()))
+
+
+def similar_captions(a: str, b: str, threshold: float = AppConfig.VIDEO_CAPTION_MERGE_SIMILARITY) -> bool:
+    ta, tb = _tokens(a), _tokens(b)
+    if not ta or not tb:
+        return a.strip() == b.strip()
+    return len(ta & tb) / len(ta | tb) >= threshold
+
+
+class SegmentMerger:
+    """Builds [{"start", "end", "caption"}] from in-order keyframe captions."""
+
+    def __init__(self):
+        self.segments: List[Dict] = []
+
+    def add(self, timestamp: float, caption: str):
+        if self.segments:
+            self.segments[-1]["end"] = timestamp
+            if similar_captions(self.segments[-1]["caption"], caption):
+                return
+        self.segments.append({"start": timestamp, "end": timestamp, "caption": caption.strip()})
+
+    def finish(self, end: float):
+        if self.segments:
+            self.segments[-1]["end"] = max(self.segments[-1]["end"], end)
+
+
+def format_segments(segments: List[Dict]) -> str:
+    def clock(seconds: float) -> str:
+        minutes, seconds = divmod(int(seconds), 60)
+        return f"{minutes:02d}:{seconds:02d}"
+    return "\n".join(f"[{clock(s['start'])}–{clock(s['end'])}] {s['caption']}" for s in segments)
+
+
+# ──────────────────────────────────────────────────────────────
+# Captioning
+# ──────────────────────────────────────────────────────────────
+
+def _caption_text(result) -> str:
+    if isinstance(result, list):
+        result = result[0] if result else {}
+    if isinstance(result, dict):
+        return result.get("generated_text") or result.get("text") or ""
+    return str(result or "")
+
+
+def engine_batch_captioner(engine, task: str = "image_to_text", **params):
+    """`caption_batch(frames) -> captions` through the InferenceEngine (one batched call for local pipelines)."""
+    from PIL import Image
+    from model.loader import model_loader
+
+    def caption_batch(frames: List[np.ndarray]) -> List[str]:
+        images = [Image.fromarray(frame) for frame in frames]
+        model_loader.load_model(task)
+        if isinstance(model_loader.models.get(task), str):  # API endpoint: one PNG per request
+            captions = []
+            for image in images:
+                buffer = io.BytesIO()
+                image.save(buffer, format="PNG")
+                payload = base64.b64encode(buffer.getvalue()).decode()
+                captions.append(_caption_text(engine.run_inference(task, payload, **params)))
+            return captions
+        results = engine.run_inference(task, images, batch_size=len(images), **params)
+        return [_caption_text(r) for r in results]
+
+    return caption_batch
+
+
+def describe_stream(path: str, caption_batch, batch_size: int = AppConfig.VIDEO_FRAME_WINDOW) -> Iterator[Dict]:
+    """
+    Yields {"segments": [...], "text": formatted, "keyframes": n, "done": bool}
+    after every captioned batch of keyframes.
+    """
+    merger = SegmentMerger()
+    batch: List[Tuple[float, np.ndarray]] = []
+    keyframes, last_time = 0, 0.0
+
+    def flush():
+        captions = caption_batch([frame for _, frame in batch])
+        for (timestamp, _), caption in zip(batch, captions):
+            merger.add(timestamp, caption)
+        batch.clear()
+
+    def progress(done: bool) -> Dict:
+        return {"segments": merger.segments, "text": format_segments(merger.segments),
+                "keyframes": keyframes, "done": done}
+
+    frames = decode_frames(path)
+
+    def track_time():
+        nonlocal last_time
+        for timestamp, frame in frames:
+            last_time = timestamp
+            yield timestamp, frame
+
+    for timestamp, frame, _ in select_keyframes(track_time()):
+        batch.append((timestamp, frame))
+        keyframes += 1
+        if len(batch) >= batch_size:
+            flush()
+            yield progress(False)
+    if batch:
+        flush()
+    merger.finish(last_time + 1.0 / AppConfig.VIDEO_SAMPLE_FPS)
+    yield progress(True)
@@ -0,0 +1,115 @@
+"""
+vision.py
+Batched image_to_text with a decoded-image cache.
+
+- Uploads are decoded and resized on a thread pool straight into one
+  preallocated (N, S, S, 3) uint8 batch buffer (JPEG draft mode lets the
+  decoder downscale large photos while decoding).
+- Decoded, resized uint8 pixels are kept in a byte-bounded LRU keyed by a
+  hash of the file contents, so re-captioning the same image (e.g. with
+  another prompt) skips decode and resize. The pipeline's processor still
+  normalizes them into tensors on every call.
+- The whole batch goes to the model in a single engine call, through the
+  same captioner video_to_text uses for keyframes.
+"""
+
+import hashlib
+import io
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from config.settings import AppConfig
+from model.video import engine_batch_captioner
+from utils.lru import ByteLRU
+
+logger = logging.getLogger("vision")
+
+
+# ──────────────────────────────────────────────────────────────
+# Decoded image cache
+# ──────────────────────────────────────────────────────────────
+
+class ImageCache(ByteLRU):
+    """LRU of decoded, resized uint8 pixels by content hash, bounded by total array bytes."""
+
+    def __init__(self, max_mb: float = AppConfig.IMAGE_CACHE_MAX_MB):
+        super().__init__(max_mb * 2**20, sizeof=lambda array: array.nbytes)
+
+
+image_cache = ImageCache()
+
+
+# ──────────────────────────────────────────────────────────────
+# Decode + preprocess
+# ──────────────────────────────────────────────────────────────
+
+def _read(source) -> Tuple[str, bytes]:
+    """(content hash, encoded bytes or b'' for in-memory images)."""
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as f:
+            data = f.read()
+        return hashlib.blake2b(data, digest_size=16).hexdigest(), data
+    if isinstance(source, (bytes, bytearray)):
+        return hashlib.blake2b(source, digest_size=16).hexdigest(), bytes(source)
+    array = np.asarray(source)  # PIL.Image or ndarray
+    digest = hashlib.blake2b(np.ascontiguousarray(array).data, digest_size=16)
+    digest.update(str(array.shape).encode())
+    return digest.hexdigest(), b""
+
+
+def _decode_resized(source, data: bytes, size: int) -> np.ndarray:
+    from PIL import Image
+
+    image = Image.open(io.BytesIO(data)) if data else (
+        source if hasattr(source, "convert") else Image.fromarray(np.asarray(source))
+    )
+    if data and image.format == "JPEG":
+        image.draft("RGB", (size, size))  # decoder-side downscale (DCT scaling)
+    return np.asarray(image.convert("RGB").resize((size, size), Image.BICUBIC))
+
+
+def preprocess_batch(sources: Sequence, size: int = AppConfig.IMAGE_TEXT_INPUT_SIZE,
+                     cache: ImageCache = image_cache) -> np.ndarray:
+    """Decode/resize `sources` (paths, bytes, PIL images or arrays) into one (N, size, size, 3) buffer."""
+    batch = np.empty((len(sources), size, size, 3), dtype=np.uint8)
+    hits = 0
+
+    def fill(index: int):
+        nonlocal hits
+        key, data = _read(sources[index])
+        key = f"{key}:{size}"
+        cached = cache.get(key)
+        if cached is None:
+            batch[index] = _decode_resized(sources[index], data, size)
+            cache.put(key, batch[index].copy())
+        else:
+            batch[index] = cached
+            hits += 1
+
+    workers = min(AppConfig.IMAGE_DECODE_WORKERS, len(sources)) or 1
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="decode") as pool:
+        list(pool.map(fill, range(len(sources))))
+    logger.debug(f"Preprocessed {len(sources)} images ({hits} from cache)")
+    return batch
+
+
+# ──────────────────────────────────────────────────────────────
+# Captioning
+# ──────────────────────────────────────────────────────────────
+
+def caption_images(engine, sources: Sequence, prompt: Optional[str] = None, **params) -> List[str]:
+    """
+    Captions all `sources` with one batched engine call (one request per image
+    for API endpoints). `prompt` conditions the caption (e.g. BLIP "a photo of").
+    """
+    if not sources:
+        return []
+    batch = preprocess_batch(sources)
+    if prompt:
+        params["prompt"] = prompt
+    captioner = engine_batch_captioner(engine, **params)
+    return captioner(list(batch))  # per-image views; the captioner copies each into a PIL image
@@ -0,0 +1,298 @@
+"""
+workers.py
+Frontend side of the remote inference worker pool (ModelSpec source="worker").
+
+- Worker processes/hosts (see api/worker.py) register the models they hold.
+- Requests with a route key (session/tenant) use a consistent-hash ring per
+  model over the healthy workers holding it; workers contribute ring points in
+  proportion to their capacity, so joins and leaves only move the keys that
+  hashed to the changed worker. Requests without a key go to the replica with
+  the fewest in-flight requests per unit of capacity.
+- Connection errors, timeouts and 5xx responses fail over to the next replica.
+- Responses are read with the streaming reader: images/bytes arrive as base64
+  data URIs and large ones are decoded into this host's output store.
+- Static seeds (WORKER_URLS) are contacted on first use, not at import.
+- A background health check drops unresponsive workers and re-adds them when
+  they recover.
+- `spawn_local_workers` starts several worker processes on this machine for testing.
+"""
+
+import bisect
+import hashlib
+import logging
+import subprocess
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+import requests
+
+from config.settings import AppConfig, BASE_DIR
+from model.streaming import read_response
+from utils.exceptions import ModelRegistryError
+
+logger = logging.getLogger("worker-pool")
+
+
+def _hash(key: str) -> int:
+    return int.from_bytes(hashlib.md5(key.encode()).digest()[:8], "big")
+
+
+# ──────────────────────────────────────────────────────────────
+# Consistent hash ring
+# ──────────────────────────────────────────────────────────────
+
+class HashRing:
+    """Weighted consistent-hash ring (virtual nodes proportional to weight)."""
+
+    def __init__(self, vnodes: int = AppConfig.WORKER_VNODES):
+        self.vnodes = vnodes
+        self._keys: List[int] = []
+        self._nodes: List[str] = []
+
+    def rebuild(self, weights: Dict[str, float]):
+        points = []
+        for node, weight in weights.items():
+            for i in range(max(1, int(self.vnodes * weight))):
+                points.append((_hash(f"{node}#{i}"), node))
+        points.sort()
+        self._keys = [p[0] for p in points]
+        self._nodes = [p[1] for p in points]
+
+    def lookup(self, key: str, count: int = 1) -> List[str]:
+        """Return up to `count` distinct nodes clockwise from the key's position."""
+        if not self._keys:
+            return []
+        found: List[str] = []
+        start = bisect.bisect(self._keys, _hash(key)) % len(self._keys)
+        for i in range(len(self._keys)):
+            node = self._nodes[(start + i) % len(self._keys)]
+            if node not in found:
+                found.append(node)
+                if len(found) == count:
+                    break
+        return found
+
+
+# ──────────────────────────────────────────────────────────────
+# Worker pool
+# ──────────────────────────────────────────────────────────────
+
+@dataclass
+class WorkerInfo:
+    worker_id: str
+    url: str
+    models: List[str]
+    capacity: float = 1.0
+    healthy: bool = True
+    failures: int = 0
+    inflight: int = 0
+    last_seen: float = field(default_factory=time.time)
+
+
+class WorkerPool:
+    def __init__(self):
+        self._workers: Dict[str, WorkerInfo] = {}
+        self._rings: Dict[str, HashRing] = {}
+        self._lock = threading.Lock()
+        self._health_thread: Optional[threading.Thread] = None
+        self._seeded = False
+
+    def _ensure_seeded(self):
+        """Discover the static WORKER_URLS once, on first use (no network at import)."""
+        with self._lock:
+            if self._seeded:
+                return
+            self._seeded = True
+        for url in AppConfig.WORKER_URLS:
+            self.discover(url)
+
+    # ───── Membership ───── #
+    def register(self, worker_id: str, url: str, models: List[str], capacity: float = 1.0):
+        """Add or refresh a worker. Idempotent, so workers can re-register as a heartbeat."""
+        with self._lock:
+            known = self._workers.get(worker_id)
+            changed = (known is None or not known.healthy or known.url != url
+                       or set(known.models) != set(models) or known.capacity != capacity)
+            self._workers[worker_id] = WorkerInfo(worker_id, url.rstrip("/"), list(models), capacity,
+                                                  inflight=known.inflight if known else 0)
+            if changed:
+                self._rebalance()
+        if changed:
+            logger.info(f"🧩 Worker '{worker_id}' joined with {models} (capacity {capacity})")
+        self._ensure_health_checks()
+
+    def deregister(self, worker_id: str):
+        with self._lock:
+            if self._workers.pop(worker_id, None) is not None:
+                self._rebalance()
+                logger.info(f"🧩 Worker '{worker_id}' left the pool")
+
+    def discover(self, url: str):
+        """Register a worker by asking its /health endpoint what it serves."""
+        try:
+            info = requests.get(f"{url.rstrip('/')}/health", timeout=5).json()
+            self.register(info["worker_id"], url, info["models"], info.get("capacity", 1.0))
+        except Exception as e:
+            logger.warning(f"⚠️ Could not discover worker at {url}: {e}")
+
+    def workers(self) -> List[Dict]:
+        self._ensure_seeded()
+        with self._lock:
+            return [vars(w).copy() for w in self._workers.values()]
+
+    def _rebalance(self):
+        """Rebuild per-model rings from healthy workers (caller holds the lock)."""
+        by_model: Dict[str, Dict[str, float]] = {}
+        for w in self._workers.values():
+            if w.healthy:
+                for model in w.models:
+                    by_model.setdefault(model, {})[w.worker_id] = w.capacity
+        rings = {}
+        for model, weights in by_model.items():
+            ring = HashRing()
+            ring.rebuild(weights)
+            rings[model] = ring
+        self._rings = rings
+
+    # ───── Routing ───── #
+    def route(self, model_id: str, key: Optional[str] = None, count: int = 1) -> List[WorkerInfo]:
+        """
+        Pick workers for a model, best first. With a key (session/tenant) load
+        spreads over replicas by capacity while staying sticky per key; without
+        one the least loaded replicas (in-flight requests / capacity) come first.
+        """
+        self._ensure_seeded()
+        with self._lock:
+            ring = self._rings.get(model_id)
+            if ring is None:
+                return []
+            if key:
+                return [self._workers[i] for i in ring.lookup(f"{model_id}/{key}", count)]
+            replicas = [w for w in self._workers.values() if w.healthy and model_id in w.models]
+            replicas.sort(key=lambda w: (w.inflight / max(w.capacity, 1e-6), -w.capacity))
+            return replicas[:count]
+
+    def run(self, model_id: str, input_data, route_key: Optional[str] = None, **params):
+        """Run inference on the routed worker, failing over to the next replica."""
+        candidates = self.route(model_id, route_key, count=3)
+        if not candidates:
+            raise ModelRegistryError(f"No healthy worker holds model '{model_id}'")
+
+        last_error = None
+        for worker in candidates:
+            self._track(worker.worker_id, 1)
+            try:
+                response = requests.post(
+                    f"{worker.url}/infer/{model_id}",
+                    json={"input": input_data, "params": params},
+                    timeout=AppConfig.WORKER_TIMEOUT,
+                    stream=True,
+                )
+                return read_response(response)["result"]
+            except requests.HTTPError as e:
+                if e.response is None or e.response.status_code < 500:
+                    raise  # 4xx: the request itself is bad, another replica would refuse it too
+                last_error = e
+                self._mark_failed(worker.worker_id)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                last_error = e
+                self._mark_failed(worker.worker_id)
+            finally:
+                self._track(worker.worker_id, -1)
+        raise ModelRegistryError(f"All workers for '{model_id}' failed: {last_error}")
+
+    # ───── Health Checks ───── #
+    def _ensure_health_checks(self):
+        if self._health_thread is not None:
+            return
+        self._health_thread = threading.Thread(target=self._health_loop, name="worker-health", daemon=True)
+        self._health_thread.start()
+
+    def _health_loop(self):
+        while True:
+            time.sleep(AppConfig.WORKER_HEALTH_INTERVAL)
+            with self._lock:
+                snapshot = list(self._workers.values())
+            for worker in snapshot:
+                try:
+                    requests.get(f"{worker.url}/health", timeout=2).raise_for_status()
+                    self._mark_ok(worker.worker_id)
+                except Exception:
+                    self._mark_failed(worker.worker_id)
+
+    def _track(self, worker_id: str, delta: int):
+        with self._lock:
+            worker = self._workers.get(worker_id)
+            if worker:
+                worker.inflight = max(0, worker.inflight + delta)
+
+    def _mark_ok(self, worker_id: str):
+        with self._lock:
+            worker = self._workers.get(worker_id)
+            if not worker:
+                return
+            worker.failures, worker.last_seen = 0, time.time()
+            if not worker.healthy:
+                worker.healthy = True
+                self._rebalance()
+                logger.info(f"✅ Worker '{worker_id}' recovered")
+
+    def _mark_failed(self, worker_id: str):
+        with self._lock:
+            worker = self._workers.get(worker_id)
+            if not worker:
+                return
+            worker.failures += 1
+            if worker.healthy and worker.failures >= AppConfig.WORKER_MAX_FAILURES:
+                worker.healthy = False
+                self._rebalance()
+                logger.warning(f"⚠️ Worker '{worker_id}' marked unhealthy")
+
+
+# ──────────────────────────────────────────────────────────────
+# Loader-facing model handle
+# ──────────────────────────────────────────────────────────────
+
+class RemoteModel:
+    """Callable stand-in for a pipeline served by the worker pool."""
+
+    def __init__(self, model_id: str, pool: Optional[WorkerPool] = None):
+        self.model_id = model_id
+        self.pool = pool or worker_pool
+
+    def __call__(self, input_data, route_key: Optional[str] = None, **params):
+        return self.pool.run(self.model_id, input_data, route_key=route_key, **params)
+
+
+def spawn_local_workers(models: List[List[str]], base_port: int = 9100,
+                        pool: Optional["WorkerPool"] = None) -> List[subprocess.Popen]:
+    """
+    Start one worker process per entry of `models` on localhost and register
+    them with `pool`. Example: spawn_local_workers([["a", "b"], ["b"], ["a"]]).
+    """
+    pool = pool or worker_pool
+    procs = []
+    for i, names in enumerate(models):
+        port = base_port + i
+        procs.append(subprocess.Popen(
+            [sys.executable, "-m", "api.worker", "--port", str(port),
+             "--worker-id", f"local-{i}", "--models", *names],
+            cwd=str(BASE_DIR),
+        ))
+    for i in range(len(models)):
+        url = f"http://127.0.0.1:{base_port + i}"
+        for _ in range(120):  # model loading can take a while
+            try:
+                requests.get(f"{url}/health", timeout=1).raise_for_status()
+                break
+            except Exception:
+                time.sleep(1)
+        pool.discover(url)
+    return procs
+
+
+# Singleton worker pool
+worker_pool = WorkerPool()
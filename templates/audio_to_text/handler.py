@@ -1 +1,29 @@
 ## This file handles template-specific logic, sitting between the UI (layout.py + components.py) and the model/inference layer.
+
+import logging
+
+from model.audio import engine_batch_transcriber, transcribe_stream
+from model.scheduler import scheduler
+
+logger = logging.getLogger("audio-to-text")
+
+
+def transcribe_audio(audio_path: str, tenant: str = "anonymous", **params):
+    """
+    Gradio generator: streams (transcript so far, status) while a long upload
+    is decoded, chunked and transcribed in parallel batches.
+    """
+    if not audio_path:
+        yield "", "⚠️ Please upload an audio file."
+        return
+
+    transcriber = engine_batch_transcriber(scheduler.engine_for(tenant), **params)
+    try:
+        for update in transcribe_stream(audio_path, transcriber):
+            if update["done"]:
+                yield update["text"], f"✅ Done ({update['chunks_total']} chunks)."
+            else:
+                yield update["text"], f"⏳ Transcribed {update['chunks_done']} chunks..."
+    except Exception as e:
+        logger.error(f"Transcription failed for {audio_path}: {e}")
+        yield "", f"❌ Transcription failed: {e}"
@@ -1 +1,43 @@
 ## This file handles template-specific logic, sitting between the UI (layout.py + components.py) and the model/inference layer.
+
+import logging
+from typing import Optional
+
+import numpy as np
+
+from model.loader import model_loader
+from model.scheduler import scheduler
+from model.tiling import engine_batch_processor, process_tiled
+
+logger = logging.getLogger("image-to-image")
+
+
+def model_scale(task: str = "image_to_image") -> Optional[int]:
+    """Upscale factor from the task's model config; None if it does not say (then it is detected from the output)."""
+    model = model_loader.load_model(task)
+    config = getattr(getattr(model, "model", None), "config", None)
+    scale = getattr(config, "upscale", None) or getattr(config, "upscale_factor", None)
+    return int(scale) if scale else None
+
+
+def transform_image(image, tenant: str = "anonymous", **params):
+    """
+    Gradio generator: streams (result image, status) while a large upload is
+    processed tile row by tile row within the memory budget.
+    """
+    if image is None:
+        yield None, "⚠️ Please upload an image."
+        return
+
+    array = np.asarray(image.convert("RGB") if hasattr(image, "convert") else image)
+    processor = engine_batch_processor(scheduler.engine_for(tenant), **params)
+    try:
+        # The real factor sizes tiles and the output budget before the first batch runs
+        for done, total, result in process_tiled(array, processor, scale=model_scale()):
+            if result is not None:
+                yield result, f"✅ Done ({result.shape[1]}x{result.shape[0]})."
+            else:
+                yield None, f"⏳ Processed {done}/{total} tile rows..."
+    except Exception as e:
+        logger.error(f"Image transform failed: {e}")
+        yield None, f"❌ Processing failed: {e}"
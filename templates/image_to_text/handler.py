@@ -1 +1,35 @@
 ## This file handles template-specific logic, sitting between the UI (layout.py + components.py) and the model/inference layer.
+
+import logging
+import os
+
+from model.scheduler import scheduler
+from model.vision import caption_images
+
+logger = logging.getLogger("image-to-text")
+
+
+def caption_uploads(files, prompt: str = "", tenant: str = "anonymous", **params):
+    """
+    Gradio generator: captions every uploaded image in one batch and yields
+    (captions, status). Re-captioning the same uploads with another prompt
+    reuses the decoded images.
+    """
+    paths = [getattr(f, "name", f) for f in (files if isinstance(files, list) else [files]) if f]
+    if not paths:
+        yield "", "⚠️ Please upload at least one image."
+        return
+
+    yield "", f"⏳ Captioning {len(paths)} image(s)..."
+    try:
+        captions = caption_images(scheduler.engine_for(tenant), paths, prompt=prompt.strip() or None, **params)
+    except Exception as e:
+        logger.error(f"Captioning failed: {e}")
+        yield "", f"❌ Captioning failed: {e}"
+        return
+
+    if len(paths) == 1:
+        yield captions[0], "✅ Done."
+    else:
+        text = "\n".join(f"{os.path.basename(p)}: {c}" for p, c in zip(paths, captions))
+        yield text, f"✅ Captioned {len(paths)} images."
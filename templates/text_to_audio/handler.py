@@ -1 +1,31 @@
 ## This file handles template-specific logic, sitting between the UI (layout.py + components.py) and the model/inference layer.
+
+import logging
+
+import model.registry as registry
+from model.scheduler import scheduler
+from model.speech import synthesize_stream
+
+logger = logging.getLogger("text-to-audio")
+
+
+def speak_text(text: str, tenant: str = "anonymous", **params):
+    """
+    Gradio generator for a streaming `gr.Audio(streaming=True)` output:
+    yields (sample_rate, samples) per sentence as soon as it is synthesized.
+    """
+    if not text or not text.strip():
+        return
+
+    model_key = (registry.MODEL_CONFIG.get("text_to_audio") or {}).get("key", "")
+
+    engine = scheduler.engine_for(tenant)
+
+    def synthesize(segment: str, **kwargs):
+        return engine.run_inference("text_to_audio", segment, **kwargs)
+
+    try:
+        yield from synthesize_stream(text, synthesize, model_key=model_key, **params)
+    except Exception as e:
+        logger.error(f"Speech synthesis failed: {e}")
+        raise
@@ -1 +1,89 @@
 ## This file handles template-specific logic, sitting between the UI (layout.py + components.py) and the model/inference layer.
+
+import logging
+import random
+from concurrent.futures import as_completed
+
+from config.settings import AppConfig
+from model.diffusion import DiffusionGenerator, stream_events
+from model.loader import model_loader
+from model.prompt import optimize_prompt
+from model.scheduler import scheduler
+from utils.validators import validate_range
+
+logger = logging.getLogger("text-to-image")
+
+
+def _is_diffusers() -> bool:
+    return isinstance(model_loader.load_model("text_to_image"), DiffusionGenerator)
+
+
+def generate_image(prompt: str, mode: str = "full", preview_every: int = None, seed: int = None,
+                   tenant: str = "anonymous", **params):
+    """
+    Gradio generator: streams (image, status, seed) updates.
+    Diffusers models yield latent previews every K steps; "draft" mode is a
+    fast low-res pass whose seed can be passed to `refine_image`. Every call,
+    local or API, is queued in the tenant's fair share.
+    """
+    if not _is_diffusers():
+        # API / non-diffusers backends: single result, no previews
+        yield scheduler.run("text_to_image", prompt, tenant=tenant, **params), "✅ Done.", seed
+        return
+
+    seed = random.randrange(2**31) if seed is None else seed
+
+    def run(on_preview, stop):
+        return scheduler.submit("text_to_image", prompt, tenant=tenant, mode=mode, seed=seed,
+                                preview_every=preview_every, on_preview=on_preview, stop=stop, **params)
+
+    for kind, payload in stream_events(run, seed, mode):
+        if kind == "preview":
+            yield payload, "⏳ Denoising...", seed
+        else:
+            label = "✏️ Draft ready — refine to finish." if mode == "draft" else "✅ Done."
+            yield payload["images"][0], label, payload["seed"]
+
+
+def refine_image(draft_image, prompt: str, seed: int = None, tenant: str = "anonymous", **params):
+    """Full-quality img2img pass over the chosen draft."""
+    if not _is_diffusers():
+        raise ValueError("Refine is only available for diffusers text_to_image models.")
+    return scheduler.run("text_to_image", prompt, tenant=tenant, mode="refine", image=draft_image,
+                         seed=seed, **params)[0]
+
+
+def generate_images(prompt: str, num_images: int = 1, metadata: dict = None, seed: int = None,
+                    tenant: str = "anonymous", **params):
+    """
+    Gradio generator for the gallery: streams (images, status) as results land.
+    The prompt is optimized once for all images. Diffusers models denoise the
+    set in batched calls of up to DIFFUSION_MAX_BATCH images (one scheduler
+    request each, image i seeded `seed + i`); API backends get N requests.
+    Both go through the fair scheduler.
+    """
+    num_images = validate_range("num_images", int(num_images), 1, AppConfig.MAX_IMAGES_PER_REQUEST)
+    if metadata:
+        prompt = optimize_prompt(prompt, metadata, tenant=tenant)
+
+    gallery = []
+    if _is_diffusers():
+        base = random.randrange(2**31 - num_images) if seed is None else seed
+        for start in range(0, num_images, AppConfig.DIFFUSION_MAX_BATCH):
+            count = min(AppConfig.DIFFUSION_MAX_BATCH, num_images - start)
+            images = scheduler.run("text_to_image", prompt, tenant=tenant, cost=count,
+                                   num_images=count, seed=base + start, **params)
+            gallery.extend((image, f"seed {base + start + i}") for i, image in enumerate(images))
+            yield list(gallery), f"⏳ {len(gallery)}/{num_images} images"
+        yield list(gallery), "✅ Done."
+        return
+
+    # API providers can't batch: queue the requests (fair-shared with other tenants), show each as it finishes
+    futures = [scheduler.submit("text_to_image", prompt, tenant=tenant, **params) for _ in range(num_images)]
+    for future in as_completed(futures):
+        try:
+            gallery.append(future.result())
+        except Exception as e:
+            logger.error(f"Image request failed: {e}")
+        yield list(gallery), f"⏳ {len(gallery)}/{num_images} images"
+    yield list(gallery), "✅ Done." if gallery else "❌ All image requests failed."
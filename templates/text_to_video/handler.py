@@ -1 +1,25 @@
 ## This file handles template-specific logic, sitting between the UI (layout.py + components.py) and the model/inference layer.
+
+import logging
+
+from model.inference import inference_engine
+from model.jobs import job_manager
+
+logger = logging.getLogger("text-to-video")
+
+
+async def generate_video(prompt: str, **params):
+    """
+    Gradio async generator: submits a text_to_video job and streams
+    (status message, video) updates without holding a worker thread.
+    """
+    job_id = inference_engine.submit_job("text_to_video", prompt, **params)
+
+    async for snap in job_manager.stream(job_id):
+        if snap["status"] == "success":
+            yield "✅ Video ready.", snap["result"]
+        elif snap["status"] == "error":
+            logger.error(f"Video job {job_id} failed: {snap['error']}")
+            yield f"❌ Generation failed: {snap['error']}", None
+        else:
+            yield f"⏳ Generating... {snap['progress']}%", None
@@ -1 +1,29 @@
 ## This file handles template-specific logic, sitting between the UI (layout.py + components.py) and the model/inference layer.
+
+import logging
+
+from model.scheduler import scheduler
+from model.video import describe_stream, engine_batch_captioner
+
+logger = logging.getLogger("video-to-text")
+
+
+def describe_video(video_path: str, tenant: str = "anonymous", **params):
+    """
+    Gradio generator: streams (timestamped description so far, status) while
+    keyframes are picked from the video and captioned in batches.
+    """
+    if not video_path:
+        yield "", "⚠️ Please upload a video."
+        return
+
+    captioner = engine_batch_captioner(scheduler.engine_for(tenant), **params)
+    try:
+        for update in describe_stream(video_path, captioner):
+            if update["done"]:
+                yield update["text"], f"✅ Done ({update['keyframes']} keyframes, {len(update['segments'])} segments)."
+            else:
+                yield update["text"], f"⏳ Captioned {update['keyframes']} keyframes..."
+    except Exception as e:
+        logger.error(f"Video description failed for {video_path}: {e}")
+        yield "", f"❌ Description failed: {e}"
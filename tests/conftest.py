@@ -0,0 +1,12 @@
+"""
+conftest.py
+Makes the repository root importable (`config`, `model`, `utils`, ...) when
+pytest is run from any directory.
+"""
+
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
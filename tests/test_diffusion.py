@@ -0,0 +1,74 @@
+"""
+Draft / refine / batched-seed paths of model/diffusion.py on the tiny random
+pipeline (offline, a few KB of random weights).
+"""
+
+import numpy as np
+import pytest
+from PIL import Image
+
+pytest.importorskip("diffusers")
+
+from model.diffusion import tiny_random_pipeline
+
+PROMPT = "a lighthouse at dusk"
+STEPS = 2
+
+
+@pytest.fixture(scope="module")
+def generator():
+    return tiny_random_pipeline()
+
+
+def test_draft_uses_draft_size(generator):
+    images = generator(PROMPT, mode="draft", seed=1, num_inference_steps=STEPS)
+    assert len(images) == 1
+    assert images[0].size == (generator.draft_size(),) * 2
+    assert generator.draft_size() <= generator.native_size
+
+
+def test_refine_upscales_to_native_size(generator):
+    draft = generator(PROMPT, mode="draft", seed=1, num_inference_steps=STEPS)[0]
+    refined = generator.refine(draft.resize((16, 16)), PROMPT, seed=1, strength=0.5, num_inference_steps=STEPS)
+    assert len(refined) == 1
+    assert refined[0].size == (generator.native_size,) * 2
+
+
+@pytest.mark.parametrize("strength", [0, 0.1])
+def test_refine_without_denoising_steps_returns_resized_draft(generator, strength):
+    draft = generator(PROMPT, mode="draft", seed=1, num_inference_steps=STEPS)[0].resize((16, 16))
+    refined = generator.refine(draft, PROMPT, seed=1, strength=strength, num_inference_steps=STEPS)
+    expected = draft.resize((generator.native_size,) * 2, Image.LANCZOS)
+    assert len(refined) == 1
+    assert np.array_equal(np.asarray(refined[0]), np.asarray(expected))
+
+
+def test_batch_seeds_are_consecutive_and_reproducible(generator):
+    pairs = generator.generate_batch(PROMPT, 3, seed=5, num_inference_steps=STEPS)
+    assert [seed for _, seed in pairs] == [5, 6, 7]
+
+    alone = generator(PROMPT, seed=6, num_inference_steps=STEPS)[0]
+    batched = np.asarray(pairs[1][0], dtype=np.int16)
+    assert np.abs(batched - np.asarray(alone, dtype=np.int16)).max() <= 2
+
+
+def test_num_images_returns_one_image_per_seed(generator):
+    images = generator(PROMPT, seed=3, num_images=2, num_inference_steps=STEPS)
+    assert len(images) == 2
+
+
+def test_stream_yields_previews_then_final(generator):
+    events = list(generator.stream(PROMPT, seed=4, preview_every=1, num_inference_steps=3))
+    kinds = [kind for kind, _ in events]
+    assert kinds == ["preview"] * 3 + ["final"]
+    assert events[-1][1]["seed"] == 4
+
+    alone = generator(PROMPT, seed=4, num_inference_steps=3)[0]
+    assert np.array_equal(np.asarray(events[-1][1]["images"][0]), np.asarray(alone))
+
+
+def test_refine_mode_matches_refine(generator):
+    draft = generator(PROMPT, mode="draft", seed=1, num_inference_steps=STEPS)[0]
+    via_call = generator(PROMPT, mode="refine", image=draft, seed=2, strength=0.5, num_inference_steps=STEPS)[0]
+    direct = generator.refine(draft, PROMPT, seed=2, strength=0.5, num_inference_steps=STEPS)[0]
+    assert np.array_equal(np.asarray(via_call), np.asarray(direct))
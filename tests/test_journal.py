@@ -0,0 +1,105 @@
+"""
+Append-only record store of utils/journal.py: lookups, secondary indexes,
+crash recovery, retention and compaction.
+"""
+
+import json
+
+import pytest
+
+from config.settings import AppConfig
+from utils.journal import JournalStore
+
+
+@pytest.fixture
+def path(tmp_path):
+    return tmp_path / "store.jsonl"
+
+
+@pytest.fixture
+def open_store(path):
+    stores = []
+
+    def _open(**kwargs):
+        store = JournalStore(path, **kwargs)
+        stores.append(store)
+        return store
+
+    yield _open
+    for store in stores:
+        store.close()
+
+
+def test_put_get_delete(open_store):
+    store = open_store()
+    store.put("a", {"n": 1})
+    store.put("b", {"n": 2})
+    store.put("a", {"n": 3})
+    store.delete("b")
+    store.delete("missing")
+
+    assert store.get("a") == {"n": 3}
+    assert store.get("b") is None
+    assert "b" not in store and len(store) == 1
+    assert dict(store.items()) == {"a": {"n": 3}}
+
+
+def test_secondary_index_follows_the_latest_record(open_store):
+    store = open_store(index_fields=("session",))
+    store.put("t1", {"session": "s1"})
+    store.put("t2", {"session": "s1"})
+    store.put("t1", {"session": "s2"})
+    store.delete("t2")
+
+    assert store.find("session", "s1") == []
+    assert store.find("session", "s2") == ["t1"]
+
+
+def test_reopen_recovers_and_truncates_a_torn_tail(path, open_store):
+    store = open_store(index_fields=("session",))
+    store.put("a", {"session": "s", "n": 1})
+    store.put("b", {"n": 2})
+    store.delete("b")
+    store.close()
+    with open(path, "ab") as f:
+        f.write(b"not json\n")
+        f.write(b'{"k": "c", "v": {"n"')  # torn write
+
+    store = open_store(index_fields=("session",))
+    assert store.keys() == ["a"]
+    assert store.find("session", "s") == ["a"]
+    assert path.read_bytes().endswith(b"\n")
+
+    store.put("c", {"n": 4})
+    assert store.get("c") == {"n": 4}
+
+
+def test_retention_keeps_the_most_recently_written_keys(path, open_store, monkeypatch):
+    monkeypatch.setattr(AppConfig, "JOURNAL_EXPIRE_EVERY", 4)
+    store = open_store(max_records=3)
+    for i in range(8):
+        store.put(f"k{i}", {"n": i})
+    store.put("k2", {"n": 20})  # rewriting a key makes it the newest
+    store.close()
+
+    store = open_store(max_records=3)
+    assert store.keys() == ["k6", "k7", "k2"]
+
+
+def test_retention_by_age(path, open_store):
+    with open(path, "w") as f:
+        f.write(json.dumps({"k": "old", "v": {}, "t": 1.0}) + "\n")
+    store = open_store(max_age=3600)
+    store.put("new", {})
+    assert store.keys() == ["new"]
+
+
+def test_compaction_drops_superseded_records(path, open_store, monkeypatch):
+    monkeypatch.setattr(AppConfig, "JOURNAL_COMPACT_MIN_RECORDS", 10)
+    store = open_store()
+    for i in range(30):
+        store.put(f"k{i % 3}", {"n": i})
+
+    lines = path.read_bytes().splitlines()
+    assert len(lines) < 10
+    assert {store.get(f"k{i}")["n"] for i in range(3)} == {27, 28, 29}
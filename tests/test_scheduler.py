@@ -0,0 +1,98 @@
+"""
+Fair-share ordering of model/scheduler.py with a recording fake engine:
+weighted fair queuing between tenants, priority classes and cancellation.
+"""
+
+import threading
+
+import pytest
+
+pytest.importorskip("psutil")
+
+import model.registry as registry
+from config.settings import AppConfig
+from model.scheduler import FairScheduler
+
+TASK = "fake_task"
+
+
+class RecordingEngine:
+    """Runs one request at a time in submission order; the first one blocks until released."""
+
+    def __init__(self):
+        self.calls = []
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def run_inference(self, task, input_data, tenant=None, **kwargs):
+        if input_data == "gate":
+            self.started.set()
+            self.release.wait(5)
+        self.calls.append(input_data)
+        return input_data
+
+
+@pytest.fixture
+def engine(monkeypatch):
+    monkeypatch.setitem(registry.MODEL_CONFIG, TASK, {"source": "local"})
+    monkeypatch.setattr(AppConfig, "TASK_CONCURRENCY", {"default": 1})
+    monkeypatch.setattr(AppConfig, "TENANT_WEIGHTS", {"default": 1.0, "gold": 2.0})
+    return RecordingEngine()
+
+
+@pytest.fixture
+def scheduler(engine):
+    scheduler = FairScheduler(engine)
+    yield scheduler
+    scheduler.shutdown()
+
+
+def run_queued(scheduler, engine, submissions):
+    """Holds the single worker on a gate request, queues `submissions`, then lets them run."""
+    scheduler.submit(TASK, "gate", tenant="gate")
+    assert engine.started.wait(5)
+    futures = [scheduler.submit(TASK, name, tenant=tenant, **kwargs) for name, tenant, kwargs in submissions]
+    engine.release.set()
+    for future in futures:
+        if not future.cancelled():
+            future.result(timeout=5)
+    return engine.calls[1:], futures
+
+
+def test_tenants_alternate_instead_of_first_come_first_served(scheduler, engine):
+    burst = [(f"a{i}", "alice", {}) for i in range(4)]
+    calls, _ = run_queued(scheduler, engine, burst + [("b0", "bob", {}), ("b1", "bob", {})])
+    assert calls == ["a0", "b0", "a1", "b1", "a2", "a3"]
+
+
+def test_weights_set_the_share(scheduler, engine):
+    submissions = [(f"g{i}", "gold", {}) for i in range(4)] + [(f"p{i}", "plain", {}) for i in range(2)]
+    calls, _ = run_queued(scheduler, engine, submissions)
+    assert calls == ["g0", "g1", "p0", "g2", "g3", "p1"]
+
+
+def test_interactive_runs_before_batch(scheduler, engine):
+    submissions = [("batch", "alice", {"priority": "batch"}), ("interactive", "bob", {"priority": "interactive"})]
+    calls, _ = run_queued(scheduler, engine, submissions)
+    assert calls == ["interactive", "batch"]
+
+
+def test_cancelled_requests_never_reach_the_engine(scheduler, engine):
+    scheduler.submit(TASK, "gate", tenant="gate")
+    assert engine.started.wait(5)
+    dropped = scheduler.submit(TASK, "dropped", tenant="alice")
+    kept = scheduler.submit(TASK, "kept", tenant="alice")
+    assert dropped.cancel()
+    assert scheduler.queue_depth(TASK) == 1
+    engine.release.set()
+
+    assert kept.result(timeout=5) == "kept"
+    assert engine.calls == ["gate", "kept"]
+    assert scheduler.get_metrics()["alice"]["cancelled"] == 1
+
+
+def test_unknown_task_and_priority_are_rejected(scheduler):
+    with pytest.raises(ValueError):
+        scheduler.submit("no_such_task", "x")
+    with pytest.raises(ValueError):
+        scheduler.submit(TASK, "x", priority="urgent")
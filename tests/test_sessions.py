@@ -0,0 +1,86 @@
+"""
+KV-session reuse of model/sessions.py on a tiny random Llama (built from a
+config, no download): a follow-up turn only prefills what the cached prefix
+does not cover and generates exactly what a full prefill would.
+"""
+
+import pytest
+
+torch = pytest.importorskip("torch")
+transformers = pytest.importorskip("transformers")
+
+from model.sessions import KVSession, SessionKVCache
+
+MAX_NEW = 4
+
+
+class CharTokenizer:
+    """One token per character; just enough of the tokenizer API for sessions.generate()."""
+    pad_token_id = None
+    eos_token_id = 0
+
+    def __call__(self, text, return_tensors=None):
+        return {"input_ids": torch.tensor([[1 + ord(c) % 120 for c in text]])}
+
+    def decode(self, ids, skip_special_tokens=True):
+        return "".join(chr(96 + i % 26) for i in ids)
+
+
+class Pipe:
+    def __init__(self, model, tokenizer):
+        self.model, self.tokenizer = model, tokenizer
+
+
+@pytest.fixture(scope="module")
+def pipe():
+    torch.manual_seed(0)
+    config = transformers.LlamaConfig(vocab_size=128, hidden_size=32, intermediate_size=64,
+                                      num_hidden_layers=2, num_attention_heads=4, num_key_value_heads=2,
+                                      max_position_embeddings=256)
+    model = transformers.LlamaForCausalLM(config).eval()
+    model.generation_config.pad_token_id = 0
+    return Pipe(model, CharTokenizer())
+
+
+def generate(cache, pipe, session_id, prompt):
+    return cache.generate(pipe, {"key": "tiny"}, session_id, prompt, max_new_tokens=MAX_NEW,
+                          do_sample=False, return_full_text=False)[0]["generated_text"]
+
+
+def test_follow_up_turn_reuses_the_cached_prefix(pipe):
+    cache = SessionKVCache(spill=False)
+    first = "User: hello there\nAssistant:"
+    reply = generate(cache, pipe, "s1", first)
+    assert cache.stats()["reused_tokens"] == 0
+
+    follow_up = first + reply + "\nUser: and then?\nAssistant:"
+    with_session = generate(cache, pipe, "s1", follow_up)
+    stats = cache.stats()
+    assert stats["reused_tokens"] >= len(first)
+    assert stats["reused_tokens"] + stats["prefilled_tokens"] == len(first) + len(follow_up)
+
+    assert with_session == generate(SessionKVCache(spill=False), pipe, "fresh", follow_up)
+
+
+def test_edited_history_falls_back_to_partial_prefill(pipe):
+    cache = SessionKVCache(spill=False)
+    generate(cache, pipe, "s1", "User: first version\nAssistant:")
+    generate(cache, pipe, "s1", "User: other text\nAssistant:")
+    assert cache.stats()["reused_tokens"] == len("User: ")
+
+
+def test_evicted_sessions_spill_to_disk_and_restore(tmp_path):
+    layers = [(torch.randn(1, 2, 16, 8), torch.randn(1, 2, 16, 8)) for _ in range(2)]
+    nbytes = sum(k.numel() * 4 * 2 for k, _ in layers)
+    cache = SessionKVCache(max_mb=1.5 * nbytes / 2**20, spill=True, spill_dir=tmp_path, spill_max_mb=1)
+
+    cache.put("old", KVSession("tiny", list(range(16)), layers))
+    cache.put("new", KVSession("tiny", list(range(16)), layers))
+    assert cache.stats()["spills"] == 1
+    assert len(list(tmp_path.iterdir())) == 1
+
+    restored = cache.take("old", "tiny")
+    assert restored.ids == list(range(16))
+    assert torch.equal(restored.layers[1][0], layers[1][0])
+    assert cache.take("new", "other-model") is None
+    assert list(tmp_path.iterdir()) == []
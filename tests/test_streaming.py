@@ -0,0 +1,63 @@
+"""
+Streaming JSON scanner of model/streaming.py: oversized base64 strings are
+spilled to files, everything else stays inline, whatever the chunking.
+"""
+
+import base64
+import json
+from pathlib import Path
+
+import pytest
+
+from config.settings import AppConfig
+from model.streaming import _JsonBlobExtractor
+
+LIMIT = 64
+
+
+@pytest.fixture(autouse=True)
+def outputs_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(AppConfig, "OUTPUTS_DIR", tmp_path)
+    return tmp_path
+
+
+def extract(text: str, chunk: int = 7):
+    extractor = _JsonBlobExtractor(LIMIT)
+    for start in range(0, len(text), chunk):
+        extractor.feed(text[start:start + chunk])
+    return extractor.result()
+
+
+def test_data_uri_is_spilled_with_its_mime_type():
+    payload = bytes(range(256)) * 4
+    uri = "data:image/png;base64," + base64.b64encode(payload).decode()
+    result = extract(json.dumps({"images": [uri], "seed": 3}))
+
+    path = Path(result["images"][0])
+    assert path.suffix == ".png"
+    assert path.read_bytes() == payload
+    assert result["seed"] == 3
+
+
+def test_bare_base64_is_spilled():
+    payload = b"\x00\xffbinary" * 40
+    result = extract(json.dumps([base64.b64encode(payload).decode()]))
+    assert Path(result[0]).read_bytes() == payload
+
+
+def test_short_and_plain_strings_stay_inline(outputs_dir):
+    text = "Once upon a time, " * 20
+    document = {"generated_text": text, "short": "aGVsbG8=", "quote": 'say "hi"\né'}
+    assert extract(json.dumps(document)) == document
+    assert list(outputs_dir.iterdir()) == []
+
+
+@pytest.mark.parametrize("chunk", [1, 5, 4096])
+def test_escapes_split_across_chunks(chunk):
+    document = {"text": "tab\there ☃ \U0001f600 \\ \"q\"", "n": [1, 2.5, None, True]}
+    assert extract(json.dumps(document), chunk=chunk) == document
+
+
+def test_truncated_response_raises():
+    with pytest.raises(ValueError):
+        extract('{"text": "unterminated')
@@ -0,0 +1,69 @@
+"""
+Tiled processing of model/tiling.py: coverage, seamless blending and
+upscaling models.
+"""
+
+import numpy as np
+import pytest
+
+from model.tiling import choose_tile_size, estimate_peak_bytes, process_tiled, tile_starts
+
+
+def run(image, process_batch, **kwargs):
+    *progress, (_, _, result) = list(process_tiled(image, process_batch, **kwargs))
+    return progress, result
+
+
+def random_image(height, width, seed=0):
+    return np.random.default_rng(seed).integers(0, 256, (height, width, 3), dtype=np.uint8)
+
+
+@pytest.mark.parametrize("length,tile,overlap", [(100, 32, 8), (64, 32, 8), (20, 32, 8), (97, 40, 0)])
+def test_tile_starts_cover_the_axis(length, tile, overlap):
+    starts = tile_starts(length, tile, overlap)
+    assert starts[0] == 0
+    assert starts[-1] + min(tile, length) == length
+    for a, b in zip(starts, starts[1:]):
+        assert tile - (b - a) >= overlap
+
+
+def test_identity_model_reproduces_the_image():
+    image = random_image(90, 130)
+    progress, result = run(image, lambda tiles: [t.copy() for t in tiles], tile=32, overlap=8, workers=2)
+    assert np.array_equal(result, image)
+    assert [done for done, _, _ in progress] == list(range(1, progress[-1][1] + 1))
+
+
+def test_overlaps_are_blended_without_seams():
+    # A constant image through a model that tints every tile differently:
+    # blending must keep values between the tints, with no hard jumps.
+    image = np.full((96, 96, 3), 100, dtype=np.uint8)
+    offsets = iter(range(0, 10_000, 10))
+
+    def tint(tiles):
+        return [np.clip(t.astype(np.int16) + next(offsets) % 40, 0, 255).astype(np.uint8) for t in tiles]
+
+    _, result = run(image, tint, tile=32, overlap=16, workers=1, batch=1)
+    values = result[..., 0].astype(np.int16)
+    assert values.min() >= 100 and values.max() <= 139
+    assert np.abs(np.diff(values, axis=0)).max() <= 4
+    assert np.abs(np.diff(values, axis=1)).max() <= 4
+
+
+def test_upscaling_model_is_detected():
+    image = random_image(50, 70, seed=1)
+
+    def upscale(tiles):
+        return [t.repeat(2, axis=0).repeat(2, axis=1) for t in tiles]
+
+    _, result = run(image, upscale, tile=32, overlap=8, workers=2)
+    assert result.shape == (100, 140, 3)
+    assert np.array_equal(result, image.repeat(2, axis=0).repeat(2, axis=1))
+
+
+def test_tile_size_fits_the_budget():
+    tile = choose_tile_size(2048, 2048, scale=2, budget_mb=256, batch=2, workers=2)
+    output = 2048 * 2 * 2048 * 2 * 3
+    assert tile % 32 == 0
+    assert estimate_peak_bytes(tile, 2048, 2, 2, 2) <= 256 * 2**20 - output
+    assert choose_tile_size(2048, 2048, scale=2, budget_mb=1024, batch=2, workers=2) >= tile
@@ -18,3 +18,6 @@ class ThemeError(TrackerError):
     """Raised when theme loading fails."""
     pass
 
+class JobError(TrackerError):
+    """Raised when an async generation job fails or times out."""
+    pass
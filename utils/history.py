@@ -0,0 +1,95 @@
+"""
+history.py
+Per-session request history on top of the append-only journal (utils/journal.py).
+Each request is one O(1) append; session lookups go through the in-memory index.
+Retention (JOURNAL_MAX_RECORDS / JOURNAL_MAX_AGE) keeps the journal and its index bounded.
+"""
+
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+from config.settings import AppConfig
+from utils.journal import JournalStore
+
+_history: Optional[JournalStore] = None
+_history_lock = threading.Lock()
+
+
+def _journal() -> JournalStore:
+    global _history
+    with _history_lock:
+        if _history is None:
+            _history = JournalStore(AppConfig.HISTORY_JOURNAL, index_fields=("session_id",),
+                                    max_records=AppConfig.JOURNAL_MAX_RECORDS, max_age=AppConfig.JOURNAL_MAX_AGE)
+        return _history
+
+
+def use_journal(path) -> Optional[str]:
+    """
+    Record history to `path` from now on (e.g. load-test replays keep out of
+    real history); None goes back to HISTORY_JOURNAL, opened on next use.
+    Returns the path in use before, for restoring it.
+    """
+    global _history
+    with _history_lock:
+        previous = str(_history.path) if _history is not None else None
+        if _history is not None:
+            _history.close()
+        _history = None if path is None else JournalStore(
+            path, index_fields=("session_id",),
+            max_records=AppConfig.JOURNAL_MAX_RECORDS, max_age=AppConfig.JOURNAL_MAX_AGE)
+    return previous
+
+
+def _summarize(value: Any, limit: int = 500) -> Any:
+    """Keep history entries small: long text is clipped, binary payloads are described."""
+    if isinstance(value, str):
+        return value if len(value) <= limit else value[:limit] + "…"
+    if isinstance(value, (int, float, bool)) or value is None:
+        return value
+    if isinstance(value, (list, tuple)):
+        return [_summarize(v, limit) for v in value[:10]]
+    if isinstance(value, dict):
+        return {k: _summarize(v, limit) for k, v in list(value.items())[:20]}
+    return f"<{type(value).__name__}>"
+
+
+def record_request(session_id: str, task: str, input_data: Any, result: Any = None,
+                   status: str = "success", request_id: Optional[str] = None, **extra) -> str:
+    """Append one request to the history journal and return its id."""
+    request_id = request_id or str(uuid.uuid4())
+    _journal().put(request_id, {
+        "session_id": session_id,
+        "task": task,
+        "input": _summarize(input_data),
+        "result": _summarize(result),
+        "status": status,
+        "timestamp": time.time(),
+        **extra,
+    })
+    return request_id
+
+
+def get_request(request_id: str) -> Optional[Dict]:
+    return _journal().get(request_id)
+
+
+def get_history(session_id: str, limit: int = AppConfig.HISTORY_MAX_PER_SESSION) -> List[Dict]:
+    """Newest-first history of a session."""
+    journal = _journal()
+    entries = []
+    for request_id in journal.find("session_id", session_id):
+        entry = journal.get(request_id)
+        if entry is not None:  # Deleted meanwhile
+            entries.append(dict(entry, request_id=request_id))
+    return sorted(entries, key=lambda e: e["timestamp"], reverse=True)[:limit]
+
+
+def delete_history(session_id: str) -> int:
+    journal = _journal()
+    request_ids = journal.find("session_id", session_id)
+    for request_id in request_ids:
+        journal.delete(request_id)
+    return len(request_ids)
@@ -0,0 +1,240 @@
+"""
+journal.py
+Append-only, indexed record store (one JSON line per write).
+
+- put/delete append a single line: O(1), no rewrite of existing data.
+- An in-memory index maps each key to the byte offset of its latest record,
+  plus optional secondary indexes (e.g. session id -> keys), so lookups read
+  one line instead of scanning the file.
+- fsync is batched: every JOURNAL_FSYNC_BATCH writes or JOURNAL_FSYNC_INTERVAL
+  seconds, whichever comes first (`flush()` forces it).
+- Compaction rewrites only live records to a temp file and atomically swaps it
+  in once superseded records dominate the file.
+- Optional retention (`max_records`, `max_age`) forgets the least recently
+  written keys, bounding both the index and, through compaction, the file.
+  It runs every JOURNAL_EXPIRE_EVERY writes and on the fsync timer, so the
+  count bound may be overshot by that many writes in between.
+- Recovery on open replays the file; a torn trailing line from a crash is
+  truncated away, corrupt lines elsewhere are skipped.
+
+Line format: {"k": key, "v": value, "t": written} or {"k": key, "d": true} (delete).
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from config.settings import AppConfig
+
+logger = logging.getLogger("journal")
+
+
+class JournalStore:
+    def __init__(self, path, index_fields: Iterable[str] = (), max_records: Optional[int] = None,
+                 max_age: Optional[float] = None):
+        self.path = Path(path)
+        self.index_fields = tuple(index_fields)
+        self.max_records = max_records                                # retention: live keys kept...
+        self.max_age = max_age                                        # ...and seconds since last write
+        self._offsets: Dict[str, Tuple[int, int, float]] = {}          # key -> (offset, length, written), oldest first
+        self._secondary: Dict[str, Dict[str, Set[str]]] = {f: defaultdict(set) for f in self.index_fields}
+        self._fields: Dict[str, Dict[str, str]] = {}                  # key -> indexed field values
+        self._lock = threading.RLock()
+        self._records = 0                                             # lines in the file
+        self._unsynced = 0
+        self._unexpired = 0                                           # writes since retention last ran
+        self._last_sync = time.monotonic()
+        self._closed = False
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._recover()
+        self._writer = open(self.path, "ab", buffering=0)
+        self._reader = open(self.path, "rb")
+        self._flusher = threading.Thread(target=self._flush_loop, name=f"journal-{self.path.stem}", daemon=True)
+        self._flusher.start()
+
+    # ───── Public API ───── #
+    def put(self, key: str, value: Dict):
+        self._append(key, {"k": key, "v": value, "t": round(time.time(), 3)}, value)
+
+    def delete(self, key: str):
+        with self._lock:
+            if key not in self._offsets:
+                return
+        self._append(key, {"k": key, "d": True}, None)
+
+    def get(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            location = self._offsets.get(key)
+            if location is None:
+                return None
+            offset, length, _ = location
+            self._reader.seek(offset)
+            line = self._reader.read(length)
+        return json.loads(line)["v"]
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._offsets
+
+    def __len__(self) -> int:
+        return len(self._offsets)
+
+    def keys(self) -> List[str]:
+        with self._lock:
+            return list(self._offsets)
+
+    def find(self, field: str, value) -> List[str]:
+        """Keys whose latest record has `field == value` (field must be in `index_fields`)."""
+        with self._lock:
+            return list(self._secondary[field].get(str(value), ()))
+
+    def items(self) -> Iterator[Tuple[str, Dict]]:
+        for key in self.keys():
+            value = self.get(key)
+            if value is not None:
+                yield key, value
+
+    def flush(self):
+        """fsync everything written so far."""
+        with self._lock:
+            if self._unsynced and not self._closed:
+                os.fsync(self._writer.fileno())
+            self._unsynced = 0
+            self._last_sync = time.monotonic()
+
+    def compact(self):
+        """Rewrite live records only, then atomically replace the journal."""
+        with self._lock:
+            tmp_path = self.path.with_suffix(self.path.suffix + ".compact")
+            offsets = {}
+            with open(tmp_path, "wb") as out:
+                for key, (offset, length, written) in self._offsets.items():
+                    self._reader.seek(offset)
+                    offsets[key] = (out.tell(), length, written)
+                    out.write(self._reader.read(length))
+                out.flush()
+                os.fsync(out.fileno())
+            self._writer.close()
+            self._reader.close()
+            os.replace(tmp_path, self.path)
+            self._writer = open(self.path, "ab", buffering=0)
+            self._reader = open(self.path, "rb")
+            dropped = self._records - len(offsets)
+            self._offsets, self._records, self._unsynced = offsets, len(offsets), 0
+        logger.info(f"🗜️ Compacted {self.path.name}: dropped {dropped} superseded record(s)")
+
+    def close(self):
+        with self._lock:
+            if self._closed:
+                return
+            self.flush()
+            self._closed = True
+            self._writer.close()
+            self._reader.close()
+
+    # ───── Internals ───── #
+    def _append(self, key: str, record: Dict, value: Optional[Dict]):
+        line = (json.dumps(record, default=str, separators=(",", ":")) + "\n").encode("utf-8")
+        with self._lock:
+            if self._closed:
+                raise ValueError(f"Journal {self.path} is closed")
+            offset = self._writer.seek(0, os.SEEK_END)
+            self._writer.write(line)
+            self._index(key, value, offset, len(line), record.get("t", 0.0))
+            self._records += 1
+            self._unexpired += 1
+            if self._unexpired >= AppConfig.JOURNAL_EXPIRE_EVERY:
+                self._expire()
+            self._unsynced += 1
+            if self._unsynced >= AppConfig.JOURNAL_FSYNC_BATCH:
+                self.flush()
+            if self._needs_compaction():
+                self.compact()
+
+    def _index(self, key: str, value: Optional[Dict], offset: int, length: int, written: float = 0.0):
+        for field, old in self._fields.pop(key, {}).items():
+            self._secondary[field][old].discard(key)
+            if not self._secondary[field][old]:
+                del self._secondary[field][old]
+        self._offsets.pop(key, None)  # re-inserted at the end: dict order is write order
+        if value is None:
+            return
+        self._offsets[key] = (offset, length, written)
+        indexed = {f: str(value[f]) for f in self.index_fields if value.get(f) is not None}
+        for field, current in indexed.items():
+            self._secondary[field][current].add(key)
+        if indexed:
+            self._fields[key] = indexed
+
+    def _expire(self) -> int:
+        """
+        Forgets the oldest keys beyond the retention bounds (caller holds the
+        lock). Their lines become dead records that the next compaction drops.
+        Walks from the oldest key and stops at the first one still retained.
+        """
+        self._unexpired = 0
+        if self.max_records is None and not self.max_age:
+            return 0
+        cutoff = time.time() - self.max_age if self.max_age else None
+        expired = 0
+        while self._offsets:
+            key, (_, _, written) = next(iter(self._offsets.items()))
+            over_count = self.max_records is not None and len(self._offsets) > self.max_records
+            if not over_count and (cutoff is None or written >= cutoff):
+                break
+            self._index(key, None, 0, 0)
+            expired += 1
+        return expired
+
+    def _needs_compaction(self) -> bool:
+        dead = self._records - len(self._offsets)
+        return (self._records >= AppConfig.JOURNAL_COMPACT_MIN_RECORDS
+                and dead / self._records >= AppConfig.JOURNAL_COMPACT_RATIO)
+
+    def _recover(self):
+        if not self.path.exists():
+            return
+        good_end = 0
+        recovered_at = time.time()
+        with open(self.path, "rb") as f:
+            offset = 0
+            for line in f:
+                length = len(line)
+                if not line.endswith(b"\n"):
+                    break  # Torn write from a crash
+                try:
+                    record = json.loads(line)
+                    key = record["k"]
+                except (ValueError, KeyError, TypeError):
+                    logger.warning(f"⚠️ Skipping corrupt record at byte {offset} in {self.path.name}")
+                else:
+                    self._index(key, None if record.get("d") else record.get("v"), offset, length,
+                                record.get("t", recovered_at))  # older lines carry no write time
+                self._records += 1
+                offset += length
+                good_end = offset
+        if good_end < self.path.stat().st_size:
+            logger.warning(f"⚠️ Truncating torn tail of {self.path.name} at byte {good_end}")
+            with open(self.path, "r+b") as f:
+                f.truncate(good_end)
+        expired = self._expire()
+        if expired:
+            logger.info(f"🧹 Dropped {expired} record(s) past retention from {self.path.name}")
+        if self._offsets:
+            logger.info(f"[✓] Recovered {len(self._offsets)} record(s) from {self.path.name}")
+
+    def _flush_loop(self):
+        while not self._closed:
+            time.sleep(AppConfig.JOURNAL_FSYNC_INTERVAL)
+            with self._lock:
+                if self._closed:
+                    return
+                if self._unexpired or self.max_age:
+                    self._expire()
+                if self._unsynced and time.monotonic() - self._last_sync >= AppConfig.JOURNAL_FSYNC_INTERVAL:
+                    self.flush()
@@ -1,8 +1,11 @@
 import logging
 import threading
 import time
+import uuid
+from typing import Dict, Optional
 import psutil
-from config.settings import HEARTBEAT_INTERVAL, HEARTBEAT_ENABLED
+from config.settings import AppConfig, HEARTBEAT_INTERVAL, HEARTBEAT_ENABLED
+from utils.journal import JournalStore
 
 logger = logging.getLogger("tracker")
 
@@ -76,3 +79,98 @@ class Tracker:
 
 # Singleton tracker
 tracker = Tracker()
+
+
+# ───── Task Progress Store ───── #
+# Active tasks live in memory; every status change is journaled (utils/journal.py),
+# so finished tasks leave memory and stay queryable by id across restarts.
+_task_store: Dict[str, Dict] = {}
+_task_lock = threading.Lock()
+_task_journal: Optional[JournalStore] = None
+_journal_lock = threading.Lock()
+
+
+def _journal() -> JournalStore:
+    global _task_journal
+    with _journal_lock:
+        if _task_journal is None:
+            _task_journal = JournalStore(AppConfig.TASKS_JOURNAL, index_fields=("session_id",),
+                                         max_records=AppConfig.JOURNAL_MAX_RECORDS,
+                                         max_age=AppConfig.JOURNAL_MAX_AGE)
+        return _task_journal
+
+
+def create_task(label: str = "Processing...", task_id: Optional[str] = None,
+                session_id: Optional[str] = None) -> str:
+    """Create a new task and return its unique ID."""
+    task_id = task_id or str(uuid.uuid4())
+    task = {
+        "label": label,
+        "status": "pending",  # "pending", "in_progress", "success", "error"
+        "progress": 0,
+        "message": "",
+        "start_time": time.time(),
+        "session_id": session_id,
+    }
+    with _task_lock:
+        _task_store[task_id] = task
+        snapshot = dict(task)
+    _journal().put(task_id, snapshot)  # disk write outside the store lock
+    return task_id
+
+
+def update_task(task_id: str, progress: int = 0, message: str = "", status: Optional[str] = None):
+    """Update task progress, message, or status."""
+    with _task_lock:
+        task = _task_store.get(task_id)
+        if not task:
+            return
+
+        task["progress"] = min(100, max(0, progress))
+        task["message"] = message or task["message"]
+        if not status or status == task["status"]:
+            return
+        # Journal status transitions only; progress ticks stay in memory
+        task["status"] = status
+        finished = status in ("success", "error")
+        if finished:
+            task["end_time"] = time.time()
+        snapshot = dict(task)
+
+    _journal().put(task_id, snapshot)  # disk write outside the store lock
+    if finished:
+        # Leave memory only once the journal has the final state, so readers never see an older one
+        with _task_lock:
+            _task_store.pop(task_id, None)
+
+
+def complete_task(task_id: str, message: str = "Done!"):
+    update_task(task_id, progress=100, message=message, status="success")
+
+
+def error_task(task_id: str, message: str = "Something went wrong."):
+    update_task(task_id, progress=100, message=message, status="error")
+
+
+def get_task_status(task_id: str) -> Dict:
+    """Get current state of a task."""
+    with _task_lock:
+        task = _task_store.get(task_id)
+        if task:
+            return dict(task)
+    task = _journal().get(task_id)
+    if task:
+        if task["status"] in ("pending", "in_progress"):
+            task["status"] = "interrupted"  # Process restarted before it finished
+        return task
+    return {
+        "label": "Unknown Task",
+        "status": "not_found",
+        "progress": 0,
+        "message": "",
+    }
+
+
+def get_session_tasks(session_id: str) -> Dict[str, Dict]:
+    """All recorded tasks of a session (index lookup, no file scan)."""
+    return {task_id: get_task_status(task_id) for task_id in _journal().find("session_id", session_id)}